@@ -1,22 +1,83 @@
+import time
+_import_started = time.perf_counter()
 
-from fastapi import FastAPI,WebSocket
+from fastapi import FastAPI, Response
+from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
-from utils.db_connection import engine, Base
-from utils.config_env import ConfigEnv
-from utils.logger import logger
-from services.task.agent import agent_app
+from contextlib import asynccontextmanager, AsyncExitStack
+from utils.db_connection import engine, async_engine
+from utils.migrations import run_migrations
+from utils.db_pool import pool_stats, pool_leak_monitor
+from utils.logger import logger, RequestContextMiddleware
 from routes.task import router
-import uuid
-# Initialize the settings
-configEnv = ConfigEnv()
-# Print the settings to verify
-logger.info(f"Settings Loaded: {configEnv.model_dump()}")
+from routes.chat import router as chat_router
+from routes.metrics import router as metrics_router
+from utils.metrics import MetricsMiddleware
+from services.task.task_crud import task_query_cache, task_change_pruner
+from services.task.task_archive import task_archiver
+from services.task.task_events import task_event_hub
+from services.task.agent import get_checkpointer, use_checkpointer, ensure_agent
+from services.chat.memory import open_checkpointer, thread_sweeper, checkpointer_stats
+from services.chat.fast_path import fast_path_stats
+from services.chat.limiter import llm_limiter
+from utils.config_env import config_env
+from utils.startup import startup
+import asyncio
+# Print the settings to verify (passwords and API keys masked)
+logger.info(f"Settings Loaded: {config_env.safe_dump()}")
+
+
+async def _build_agent_in_background():
+    try:
+        with startup.phase("agent"):
+            await ensure_agent()
+    except Exception as e:
+        # /ready reports the failure; the first agent turn tries again
+        logger.error(f"❌ Agent build failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring the schema up to date (tables and indexes are managed by Alembic migrations), unless a
+    # separate `python -m utils.migrations` step does it before the app starts
+    if config_env.db_migrate_on_startup:
+        with startup.phase("migrations"):
+            await asyncio.to_thread(run_migrations)
+    with startup.phase("events"):
+        await task_event_hub.start(config_env.task_events_broker)
+    resources = AsyncExitStack()
+    with startup.phase("checkpointer"):
+        checkpointer = await resources.enter_async_context(open_checkpointer(config_env.chat_checkpointer))
+        use_checkpointer(checkpointer)
+    background = [
+        asyncio.create_task(pool_leak_monitor()),
+        asyncio.create_task(task_change_pruner()),
+        asyncio.create_task(task_archiver()),
+        asyncio.create_task(thread_sweeper(checkpointer)),
+    ]
+    # The agent (model client + graph) is the slowest part of startup; by default it is built
+    # while the server already accepts requests, and /ready turns green once it is done
+    if config_env.chat_agent_startup == "eager":
+        with startup.phase("agent"):
+            await ensure_agent()
+    elif config_env.chat_agent_startup == "background":
+        startup.pending("agent")
+        background.append(asyncio.create_task(_build_agent_in_background()))
+    yield
+    for task in background:
+        task.cancel()
+    await resources.aclose()
+    await task_event_hub.stop()
+    await async_engine.dispose()
+    engine.dispose()
+
 
 app = FastAPI(
     title="c4scale AI-ML-Management App service",
     description="APIs for all c4scale AI-ML-Management application.",
     root_path="/api/v1",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Allow all origins — can be restricted in production
@@ -28,11 +89,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request ID on every log record written while handling a request (and in the X-Request-ID header)
+app.add_middleware(RequestContextMiddleware)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Request latency by route template and open WebSocket count (served with the rest at /metrics)
+if config_env.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(router)
+app.include_router(chat_router)
+app.include_router(metrics_router)
 
 
 @app.get("/health", tags=["Health Check"])
@@ -41,38 +107,56 @@ async def health_check():
     return {"status": "OK", "message": "Service is healthy."}
 
 
-@app.websocket("/chat")
-async def chat_endpoint(ws: WebSocket):
-    await ws.accept()
-    await ws.send_text("🤖 Task Agent connected. You can ask me to create, list, or update your tasks.")
-
-    # Create a unique thread ID for this connection to persist conversation memory
-    thread_id = str(uuid.uuid4())
-    config = {"configurable": {"thread_id": thread_id}}
-
-    while True:
-        try:
-            # Wait for message from frontend
-            msg = await ws.receive_text()
-
-
-            # Use LangGraph's streaming output mode (for multi-turn chat)
-            async for event in agent_app.astream(
-                {"messages": [{"role": "user", "content": msg}]},
-                config,
-                stream_mode="values",
-            ):
-                # Extract last message and forward only AI outputs to avoid echoing the user
-                last = event["messages"][-1]
-                try:
-                    last_type = getattr(last, "type", "")
-                    last_content = getattr(last, "content", None)
-                    if last_type in ("ai", "assistant") and last_content:
-                        await ws.send_text(last_content)
-                except Exception:
-                    # Fallback: do nothing on unknown event shapes
-                    pass
-
-        except Exception as e:
-            print(f"⚠️ WebSocket error: {e}")
-            break
\ No newline at end of file
+@app.get("/ready", tags=["Health Check"])
+async def readiness(response: Response):
+    """Ready to take traffic: startup finished (migrations, agent, ...) and the database answers."""
+    report = startup.report()
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=2)
+        report["database"] = "ok"
+    except Exception as e:
+        report["database"] = f"unavailable: {e.__class__.__name__}"
+        report["ready"] = False
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+
+@app.get("/health/pool", tags=["Health Check"])
+async def pool_health():
+    """Connection pool usage for the sync and async engines."""
+    return pool_stats()
+
+
+@app.get("/health/cache", tags=["Health Check"])
+async def cache_health():
+    """Hit/miss/eviction counters for the task query cache."""
+    return task_query_cache.stats()
+
+
+@app.get("/health/events", tags=["Health Check"])
+async def events_health():
+    """Task change feed broker and subscriber backlog."""
+    return task_event_hub.stats()
+
+
+@app.get("/health/chat", tags=["Health Check"])
+async def chat_health():
+    """Conversation threads held by the chat checkpointer."""
+    return checkpointer_stats(get_checkpointer())
+
+
+@app.get("/health/fast-path", tags=["Health Check"])
+async def fast_path_health():
+    """Share of chat messages answered by each fast-path route instead of the agent."""
+    return fast_path_stats.snapshot()
+
+
+@app.get("/health/llm", tags=["Health Check"])
+async def llm_health():
+    """Agent turns running and queued behind the LLM concurrency limit."""
+    return llm_limiter.stats()
+
+
+startup.done("import", time.perf_counter() - _import_started)
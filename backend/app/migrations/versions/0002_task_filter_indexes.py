@@ -0,0 +1,39 @@
+"""indexes for task filtering and keyset pagination
+
+Revision ID: 0002_task_filter_indexes
+Revises: 0001_create_tasks
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_task_filter_indexes"
+down_revision = "0001_create_tasks"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_tasks_status_due_date", ["status", "due_date", "id"], None),
+    ("ix_tasks_priority_due_date", ["priority", "due_date", "id"], None),
+    ("ix_tasks_pending_due_date", ["due_date"], sa.text("status = 'pending'")),
+    ("ix_tasks_due_date_id", ["due_date", "id"], None),
+    ("ix_tasks_created_at_id", ["created_at", "id"], None),
+    ("ix_tasks_updated_at", ["updated_at"], None),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the table writable while the indexes build; it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name, "tasks", columns,
+                postgresql_where=where, postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name="tasks", postgresql_concurrently=True, if_exists=True)
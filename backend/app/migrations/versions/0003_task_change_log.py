@@ -0,0 +1,60 @@
+"""task change log for ETags and incremental sync
+
+Revision ID: 0003_task_change_log
+Revises: 0002_task_filter_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_task_change_log"
+down_revision = "0002_task_filter_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "task_changes",
+        sa.Column("id", sa.BigInteger(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(8), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_task_changes_changed_at", "task_changes", ["changed_at"])
+
+    # Statement-level triggers with transition tables: a bulk write logs all its rows in one INSERT ... SELECT
+    op.execute("""
+        CREATE FUNCTION log_task_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO task_changes (task_id, op) SELECT id, 'delete' FROM old_rows ORDER BY id;
+            ELSE
+                INSERT INTO task_changes (task_id, op) SELECT id, lower(TG_OP) FROM new_rows ORDER BY id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_log_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION log_task_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_log_update AFTER UPDATE ON tasks
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION log_task_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_log_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION log_task_changes()
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS tasks_log_delete ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_log_update ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_log_insert ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS log_task_changes()")
+    op.drop_index("ix_task_changes_changed_at", table_name="task_changes")
+    op.drop_table("task_changes")
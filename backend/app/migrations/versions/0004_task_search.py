@@ -0,0 +1,48 @@
+"""full-text and trigram search on task titles and descriptions
+
+Revision ID: 0004_task_search
+Revises: 0003_task_change_log
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_task_search"
+down_revision = "0003_task_change_log"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+SEARCH_DOCUMENT_SQL = "(coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade():
+    # Adding a stored generated column rewrites the table once (under an exclusive lock)
+    op.execute(f"ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED")
+
+    # pg_trgm ships with the standard Postgres images but not every install has it; without it the
+    # fuzzy fallback uses an unindexed substring match instead
+    trigram = op.get_bind().execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_search_vector", "tasks", ["search_vector"],
+            postgresql_using="gin", postgresql_concurrently=True, if_not_exists=True,
+        )
+        if trigram:
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            op.create_index(
+                "ix_tasks_search_trgm", "tasks", [sa.text(f"{SEARCH_DOCUMENT_SQL} gin_trgm_ops")],
+                postgresql_using="gin", postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_tasks_search_trgm", table_name="tasks", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_tasks_search_vector", table_name="tasks", postgresql_concurrently=True, if_exists=True)
+    op.drop_column("tasks", "search_vector")
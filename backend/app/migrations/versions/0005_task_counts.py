@@ -0,0 +1,97 @@
+"""incrementally maintained task counts for /tasks/stats
+
+Revision ID: 0005_task_counts
+Revises: 0004_task_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_task_counts"
+down_revision = "0004_task_search"
+branch_labels = None
+depends_on = None
+
+# The key every task is counted under; tasks without a due date count under 'infinity'
+KEY_SQL = "coalesce(status, ''), coalesce(priority, ''), coalesce(due_date::date, 'infinity'::date)"
+
+
+def _apply(select_sql: str) -> str:
+    # Net change per key in one upsert; keys whose net change is zero (e.g. a title edit) are skipped
+    return f"""
+        INSERT INTO task_counts (status, priority, due_day, count)
+        SELECT status, priority, due_day, sum(delta) FROM ({select_sql}) AS changes (status, priority, due_day, delta)
+        GROUP BY status, priority, due_day
+        HAVING sum(delta) <> 0
+        ON CONFLICT (status, priority, due_day) DO UPDATE SET count = task_counts.count + EXCLUDED.count;
+    """
+
+
+def upgrade():
+    op.create_table(
+        "task_counts",
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("priority", sa.String(), nullable=False),
+        sa.Column("due_day", sa.Date(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("status", "priority", "due_day"),
+    )
+
+    old_rows = f"SELECT {KEY_SQL}, -1 FROM old_rows"
+    new_rows = f"SELECT {KEY_SQL}, 1 FROM new_rows"
+    op.execute(f"""
+        CREATE FUNCTION count_task_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_apply(new_rows)}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {_apply(f"{old_rows} UNION ALL {new_rows}")}
+            ELSE
+                {_apply(old_rows)}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION reset_task_counts() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM task_counts;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # Block writes while the triggers go in and the counts are backfilled, so none is missed or counted twice
+    op.execute("LOCK TABLE tasks IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("""
+        CREATE TRIGGER tasks_count_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_count_update AFTER UPDATE ON tasks
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_count_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_task_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER tasks_count_truncate AFTER TRUNCATE ON tasks
+        FOR EACH STATEMENT EXECUTE FUNCTION reset_task_counts()
+    """)
+    op.execute(f"""
+        INSERT INTO task_counts (status, priority, due_day, count)
+        SELECT {KEY_SQL}, count(*) FROM tasks GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_truncate ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_delete ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_update ON tasks")
+    op.execute("DROP TRIGGER IF EXISTS tasks_count_insert ON tasks")
+    op.execute("DROP FUNCTION IF EXISTS reset_task_counts()")
+    op.execute("DROP FUNCTION IF EXISTS count_task_changes()")
+    op.drop_table("task_counts")
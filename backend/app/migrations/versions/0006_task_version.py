@@ -0,0 +1,23 @@
+"""task version column for optimistic concurrency
+
+Revision ID: 0006_task_version
+Revises: 0005_task_counts
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_task_version"
+down_revision = "0005_task_counts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default is stored in the catalog (Postgres 11+): no table rewrite, existing rows read as 1
+    op.add_column("tasks", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    op.drop_column("tasks", "version")
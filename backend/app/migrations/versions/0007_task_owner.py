@@ -0,0 +1,141 @@
+"""per-user task ownership and owner-leading indexes
+
+Revision ID: 0007_task_owner
+Revises: 0006_task_version
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_task_owner"
+down_revision = "0006_task_version"
+branch_labels = None
+depends_on = None
+
+# Existing tasks, change log entries and counts all belong to the default owner (AUTH_DEFAULT_OWNER)
+DEFAULT_OWNER = "default"
+
+# Every task query is scoped to one owner, so every index leads with owner_id
+INDEXES = [
+    ("ix_tasks_owner_id", ["owner_id", "id"], None, True),
+    ("ix_tasks_owner_status_due_date", ["owner_id", "status", "due_date", "id"], None, False),
+    ("ix_tasks_owner_priority_due_date", ["owner_id", "priority", "due_date", "id"], None, False),
+    ("ix_tasks_owner_pending_due_date", ["owner_id", "due_date"], sa.text("status = 'pending'"), False),
+    ("ix_tasks_owner_due_date_id", ["owner_id", "due_date", "id"], None, False),
+    ("ix_tasks_owner_created_at_id", ["owner_id", "created_at", "id"], None, False),
+    ("ix_tasks_owner_updated_at", ["owner_id", "updated_at"], None, False),
+]
+
+# The 0002 indexes they replace
+OLD_INDEXES = [
+    ("ix_tasks_status_due_date", ["status", "due_date", "id"], None),
+    ("ix_tasks_priority_due_date", ["priority", "due_date", "id"], None),
+    ("ix_tasks_pending_due_date", ["due_date"], sa.text("status = 'pending'")),
+    ("ix_tasks_due_date_id", ["due_date", "id"], None),
+    ("ix_tasks_created_at_id", ["created_at", "id"], None),
+    ("ix_tasks_updated_at", ["updated_at"], None),
+]
+
+
+def _log_function(with_owner: bool) -> str:
+    owner_column, owner_value = ("owner_id, ", "owner_id, ") if with_owner else ("", "")
+    return f"""
+        CREATE OR REPLACE FUNCTION log_task_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO task_changes ({owner_column}task_id, op) SELECT {owner_value}id, 'delete' FROM old_rows ORDER BY id;
+            ELSE
+                INSERT INTO task_changes ({owner_column}task_id, op) SELECT {owner_value}id, lower(TG_OP) FROM new_rows ORDER BY id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def _count_function(with_owner: bool) -> str:
+    # Same shape as in 0005, with the owner as the leading part of the key
+    key_columns = ("owner_id, " if with_owner else "") + "status, priority, due_day"
+    key_sql = ("owner_id, " if with_owner else "") + (
+        "coalesce(status, ''), coalesce(priority, ''), coalesce(due_date::date, 'infinity'::date)"
+    )
+
+    def apply(select_sql: str) -> str:
+        return f"""
+            INSERT INTO task_counts ({key_columns}, count)
+            SELECT {key_columns}, sum(delta) FROM ({select_sql}) AS changes ({key_columns}, delta)
+            GROUP BY {key_columns}
+            HAVING sum(delta) <> 0
+            ON CONFLICT ({key_columns}) DO UPDATE SET count = task_counts.count + EXCLUDED.count;
+        """
+
+    old_rows = f"SELECT {key_sql}, -1 FROM old_rows"
+    new_rows = f"SELECT {key_sql}, 1 FROM new_rows"
+    return f"""
+        CREATE OR REPLACE FUNCTION count_task_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {apply(new_rows)}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {apply(f"{old_rows} UNION ALL {new_rows}")}
+            ELSE
+                {apply(old_rows)}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def upgrade():
+    # Constant defaults are catalog-only (no rewrite); dropping them afterwards makes the
+    # application name the owner of every new row
+    for table in ("tasks", "task_changes", "task_counts"):
+        op.add_column(table, sa.Column("owner_id", sa.String(), nullable=False, server_default=DEFAULT_OWNER))
+        op.alter_column(table, "owner_id", server_default=None)
+
+    # Block writes while the key of task_counts and both trigger functions change together
+    op.execute("LOCK TABLE tasks IN SHARE ROW EXCLUSIVE MODE")
+    op.drop_constraint("task_counts_pkey", "task_counts", type_="primary")
+    op.create_primary_key("task_counts_pkey", "task_counts", ["owner_id", "status", "priority", "due_day"])
+    op.execute(_log_function(with_owner=True))
+    op.execute(_count_function(with_owner=True))
+    op.create_index("ix_task_changes_owner_id", "task_changes", ["owner_id", "id"])
+
+    with op.get_context().autocommit_block():
+        for name, columns, where, unique in INDEXES:
+            op.create_index(
+                name, "tasks", columns, unique=unique,
+                postgresql_where=where, postgresql_concurrently=True, if_not_exists=True,
+            )
+        for name, _, _ in OLD_INDEXES:
+            op.drop_index(name, table_name="tasks", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, columns, where in OLD_INDEXES:
+            op.create_index(
+                name, "tasks", columns,
+                postgresql_where=where, postgresql_concurrently=True, if_not_exists=True,
+            )
+        for name, _, _, _ in INDEXES:
+            op.drop_index(name, table_name="tasks", postgresql_concurrently=True, if_exists=True)
+
+    op.execute("LOCK TABLE tasks IN SHARE ROW EXCLUSIVE MODE")
+    op.drop_index("ix_task_changes_owner_id", table_name="task_changes")
+    op.execute(_log_function(with_owner=False))
+    op.execute(_count_function(with_owner=False))
+    # Fold every owner's counts back into one row per key
+    op.execute("""
+        CREATE TEMPORARY TABLE task_counts_merged ON COMMIT DROP AS
+        SELECT status, priority, due_day, sum(count)::bigint AS count FROM task_counts GROUP BY 1, 2, 3
+    """)
+    op.execute("DELETE FROM task_counts")
+    op.drop_constraint("task_counts_pkey", "task_counts", type_="primary")
+    op.drop_column("task_counts", "owner_id")
+    op.execute("INSERT INTO task_counts (status, priority, due_day, count) SELECT * FROM task_counts_merged")
+    op.create_primary_key("task_counts_pkey", "task_counts", ["status", "priority", "due_day"])
+    op.drop_column("task_changes", "owner_id")
+    op.drop_column("tasks", "owner_id")
@@ -0,0 +1,63 @@
+"""archive table for completed and soft-deleted tasks
+
+Revision ID: 0008_task_archive
+Revises: 0007_task_owner
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0008_task_archive"
+down_revision = "0007_task_owner"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    # Same columns as tasks; ids keep the values they had there (no sequence of its own)
+    op.create_table(
+        "tasks_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("owner_id", sa.String(), nullable=False),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("priority", sa.String()),
+        sa.Column("due_date", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True)),
+        sa.Column("archived_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("deleted_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_tasks_archive_owner_id", "tasks_archive", ["owner_id", "id"])
+    op.create_index("ix_tasks_archive_owner_due_date_id", "tasks_archive", ["owner_id", "due_date", "id"])
+    op.create_index("ix_tasks_archive_search_vector", "tasks_archive", ["search_vector"], postgresql_using="gin")
+
+    # The archiver's candidates: only done tasks are indexed, and archiving keeps that set small
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_done_updated_at", "tasks", ["updated_at"], postgresql_where=sa.text("status = 'done'"),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_tasks_done_updated_at", table_name="tasks", postgresql_concurrently=True, if_exists=True)
+    # Archived (not deleted) tasks go back to the live table; the triggers log and count them again
+    op.execute("""
+        INSERT INTO tasks (id, owner_id, title, description, status, priority, due_date, created_at, updated_at, version)
+        SELECT id, owner_id, title, description, status, priority, due_date, created_at, updated_at, version
+        FROM tasks_archive WHERE deleted_at IS NULL
+        ON CONFLICT DO NOTHING
+    """)
+    op.drop_table("tasks_archive")
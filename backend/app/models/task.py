@@ -1,13 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Index, Computed, text, func, select, union_all, true, false
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from datetime import datetime
 from utils.db_connection import Base
 
+# Full-text search: title words rank above description words. The text search configuration is
+# fixed so the generated column and the queries always agree.
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
+# Title and description as one string, for trigram (typo-tolerant / substring) matching
+SEARCH_DOCUMENT_SQL = "(coalesce(title, '') || ' ' || coalesce(description, ''))"
 
 
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
+    # The user the task belongs to; every task query is scoped to one owner
+    owner_id = Column(String, nullable=False)
     title = Column(String)
     description = Column(String)
     status = Column(String, default="pending")
@@ -15,3 +28,117 @@ class Task(Base):
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every update; a write that names the version it read fails if the task changed since
+    version = Column(Integer, nullable=False, server_default="1")
+    # Maintained by Postgres; deferred so ordinary task queries never load it
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    # Indexes are created by migrations (see migrations/versions), listed here so autogenerate stays in sync
+    # Every B-tree index leads with owner_id, so one user's queries only ever touch that user's entries
+    __table_args__ = (
+        # Lookups by id within an owner; also the arbiter of the import upsert
+        Index("ix_tasks_owner_id", "owner_id", "id", unique=True),
+        # status/priority filters, optionally combined with a due_date range or due_date ordering
+        Index("ix_tasks_owner_status_due_date", "owner_id", "status", "due_date", "id"),
+        Index("ix_tasks_owner_priority_due_date", "owner_id", "priority", "due_date", "id"),
+        # Overdue / upcoming lookups only ever look at pending tasks
+        Index("ix_tasks_owner_pending_due_date", "owner_id", "due_date", postgresql_where=text("status = 'pending'")),
+        # Keyset pagination and range filters on the date columns
+        Index("ix_tasks_owner_due_date_id", "owner_id", "due_date", "id"),
+        Index("ix_tasks_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_tasks_owner_updated_at", "owner_id", "updated_at"),
+        # Candidates of the archiver (services/task/task_archive.py): done tasks by last change
+        Index("ix_tasks_done_updated_at", "updated_at", postgresql_where=text("status = 'done'")),
+        # Full-text search, and the pg_trgm fallback for misspelled or partial words (matches are
+        # then filtered by owner)
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_tasks_search_trgm", text(f"{SEARCH_DOCUMENT_SQL} gin_trgm_ops"), postgresql_using="gin"),
+    )
+    # ORM flushes check and bump it too; Core UPDATEs in AsyncCRUDBase set it explicitly
+    __mapper_args__ = {"version_id_col": version}
+
+
+class TaskArchive(Base):
+    """
+    Cold storage for tasks moved out of `tasks`: done tasks past TASK_ARCHIVE_AFTER_DAYS (by the
+    archiver), and deleted tasks when TASK_SOFT_DELETE is on (with deleted_at set). Rows keep their
+    task id. No triggers: the move is logged and counted as a delete from `tasks`.
+    """
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    owner_id = Column(String, nullable=False)
+    title = Column(String)
+    description = Column(String)
+    status = Column(String)
+    priority = Column(String)
+    due_date = Column(DateTime, nullable=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    version = Column(Integer, nullable=False)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+    archived_at = Column(DateTime, nullable=False, server_default=func.now())
+    deleted_at = Column(DateTime, nullable=True)
+
+    # Only read for include_archived queries, so just owner-leading id/due date order and full-text search
+    __table_args__ = (
+        Index("ix_tasks_archive_owner_id", "owner_id", "id"),
+        Index("ix_tasks_archive_owner_due_date_id", "owner_id", "due_date", "id"),
+        Index("ix_tasks_archive_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+# Live and archived (not deleted) tasks as one relation, for include_archived queries. A plain
+# UNION ALL subquery rather than a view: Postgres pushes the owner and filter conditions down into
+# both branches, so each side still uses its own indexes. Not a table, so autogenerate ignores it.
+_SHARED_COLUMNS = [
+    "id", "owner_id", "title", "description", "status", "priority", "due_date", "created_at", "updated_at",
+    "version", "search_vector",
+]
+tasks_with_archive = union_all(
+    select(*[Task.__table__.c[name] for name in _SHARED_COLUMNS], false().label("archived")),
+    select(*[TaskArchive.__table__.c[name] for name in _SHARED_COLUMNS], true().label("archived"))
+    .where(TaskArchive.__table__.c.deleted_at.is_(None)),
+).subquery("tasks_with_archive")
+
+
+class TaskWithArchive(Base):
+    """Read-only mapping of tasks_with_archive; `archived` tells the two sources apart."""
+    __table__ = tasks_with_archive
+    __mapper_args__ = {"primary_key": [tasks_with_archive.c.id]}
+
+    search_vector = deferred(tasks_with_archive.c.search_vector)
+
+
+class TaskChange(Base):
+    """
+    Append-only change log written by database triggers on `tasks` (see migrations).
+    Its id is the table-wide change version used for ETags and /tasks/changes.
+    """
+    __tablename__ = "task_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    owner_id = Column(String, nullable=False)
+    task_id = Column(Integer, nullable=False)
+    op = Column(String(8), nullable=False)  # insert / update / delete
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_task_changes_changed_at", "changed_at"),
+        Index("ix_task_changes_owner_id", "owner_id", "id"),
+    )
+
+
+class TaskCount(Base):
+    """
+    Number of tasks per (owner, status, priority, due day), kept current by statement-level triggers on
+    `tasks` (see migrations). Tasks without a due date are counted under the 'infinity' day.
+    Its size grows with the number of distinct due days, not the number of tasks.
+    """
+    __tablename__ = "task_counts"
+
+    owner_id = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    priority = Column(String, primary_key=True)
+    due_day = Column(Date, primary_key=True)
+    count = Column(BigInteger, nullable=False, server_default="0")
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.task.agent import get_checkpointer
+from services.chat.memory import hold_thread, release_thread
+from services.chat.session import ChatSession
+from utils.config_env import config_env
+from utils.logger import log_context
+from utils.auth import resolve_owner, owner_context, AuthError
+import uuid
+
+router = APIRouter(tags=["Chat"])
+
+
+def _resume_thread_id(value: str | None) -> str | None:
+    # Thread IDs are server-issued UUIDs; anything else starts a fresh conversation
+    try:
+        return str(uuid.UUID(value)) if value else None
+    except ValueError:
+        return None
+
+
+def _checkpoint_thread_id(owner_id: str, thread_id: str) -> str:
+    # Threads are stored per owner, so a thread ID cannot resume someone else's conversation;
+    # the default owner keeps the bare IDs of threads saved before ownership
+    return thread_id if owner_id == config_env.auth_default_owner else f"{owner_id}/{thread_id}"
+
+
+# Connect with ?stream=tokens for typed JSON frames (session, token, tool_start, tool_end, final,
+# error, busy, cancelled); without it each AI message is sent as plain text, as before.
+# Pass ?thread_id=<id from the session frame> to resume a conversation after reconnecting.
+# Send {"type": "stop"} to cancel the reply in progress; with ?mode=latest a new message does the same.
+# The connection acts for the owner from the Authorization/owner header or ?token= (see utils/auth.py).
+@router.websocket("/chat")
+async def chat_endpoint(ws: WebSocket):
+    try:
+        owner_id = resolve_owner(ws.headers, ws.query_params)
+    except AuthError as e:
+        await ws.close(code=1008, reason=str(e))
+        return
+    await ws.accept()
+    token_mode = ws.query_params.get("stream") == "tokens"
+    latest_wins = ws.query_params.get("mode", "latest" if config_env.chat_latest_message_wins else "queue") == "latest"
+
+    # Resume the requested thread, or create a unique thread ID for this connection
+    thread_id = _resume_thread_id(ws.query_params.get("thread_id")) or str(uuid.uuid4())
+    checkpoint_thread_id = _checkpoint_thread_id(owner_id, thread_id)
+    config = {"configurable": {"thread_id": checkpoint_thread_id}}
+    checkpointer = get_checkpointer()
+    hold_thread(checkpointer, checkpoint_thread_id)
+    try:
+        # Tool calls of this connection's turns (tasks started inside inherit the context) act for owner_id
+        with log_context(thread_id=thread_id), owner_context(owner_id):
+            await _chat_loop(ws, token_mode, thread_id, config, latest_wins)
+    finally:
+        # The thread stays resumable until it has been idle for the TTL (memory) or indefinitely (postgres)
+        release_thread(checkpointer, checkpoint_thread_id)
+
+
+async def _chat_loop(ws: WebSocket, token_mode: bool, thread_id: str, config: dict, latest_wins: bool):
+    greeting = "🤖 Task Agent connected. You can ask me to create, list, or update your tasks."
+    try:
+        if token_mode:
+            await ws.send_json({"type": "session", "thread_id": thread_id})
+            await ws.send_json({"type": "final", "text": greeting})
+        else:
+            await ws.send_text(greeting)
+    except WebSocketDisconnect:
+        return
+
+    await ChatSession(ws, token_mode, thread_id, config, latest_wins).run()
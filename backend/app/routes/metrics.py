@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from services.chat.fast_path import fast_path_stats
+from services.chat.limiter import llm_limiter
+from services.chat.memory import checkpointer_stats
+from services.task.agent import get_checkpointer
+from services.task.task_crud import task_query_cache
+from services.task.task_events import task_event_hub
+from utils.config_env import config_env
+from utils.db_pool import pool_stats
+from utils.metrics import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- Collectors: the /health/* stats, exposed as gauges at scrape time ---
+def _numeric(stats: dict) -> dict:
+    return {
+        key: float(value) for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+def _stats_collector(name: str, documentation: str, stats, label: str = None):
+    """One gauge per numeric stats key, e.g. llm_limiter_queue_depth; `label` names nested sections."""
+    def collect():
+        current = stats()
+        sections = current.items() if label else [(None, current)]
+        gauges: dict = {}
+        for section, values in sections:
+            labels = {label: section} if label else {}
+            for key, value in _numeric(values).items():
+                gauges.setdefault(key, []).append((labels, value))
+        return [(f"{name}_{key}", f"{documentation} ({key})", samples) for key, samples in gauges.items()]
+    return collect
+
+
+metrics.add_collector(_stats_collector("db_pool", "Connection pool usage", pool_stats, label="pool"))
+metrics.add_collector(_stats_collector("task_cache", "Task query cache", task_query_cache.stats))
+metrics.add_collector(_stats_collector("task_events", "Task change feed", task_event_hub.stats))
+metrics.add_collector(_stats_collector("llm_limiter", "LLM concurrency limit", llm_limiter.stats))
+metrics.add_collector(_stats_collector("chat_threads", "Chat checkpointer", lambda: checkpointer_stats(get_checkpointer())))
+metrics.add_collector(_stats_collector("fast_path", "Chat fast path", fast_path_stats.snapshot))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, DB, LLM and tool metrics for this worker."""
+    if not config_env.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
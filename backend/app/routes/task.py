@@ -1,25 +1,166 @@
-from fastapi import APIRouter
-from schemas.task import CreateTaskInput, UpdateTaskInput, DeleteTaskInput, FilterTasksInput
-from services.task.task_crud import create_task, list_tasks, update_task, delete_task, filter_tasks
+from fastapi import APIRouter, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+import asyncio
+from datetime import datetime
+from typing import Annotated, List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.db_connection import get_async_db
+from utils.auth import get_owner, resolve_owner, AuthError
+from utils.config_env import config_env
+from schemas.task import (
+    CreateTaskInput, UpdateTaskInput, DeleteTaskInput, FilterTasksInput, TaskSortBy, SearchMatch, TransferFormat, ExportTasksInput,
+    BulkCreateTasksInput, BulkUpdateTasksInput, BulkDeleteTasksInput,
+    TaskOut, TaskPageOut, TaskSearchOut, TaskChangesOut, ErrorOut,
+)
+from services.task.task_events import task_event_hub
+from services.task.task_crud import (
+    create_task, list_tasks, update_task, delete_task, filter_tasks, search_tasks, task_stats,
+    bulk_create_tasks, bulk_update_tasks, bulk_delete_tasks,
+    list_etag, list_changes, get_change_version,
+)
+from services.task.task_transfer import prepare_export, export_tasks, import_tasks, MEDIA_TYPES
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+# Every endpoint acts for the owner resolved by get_owner (see utils/auth.py) and only sees that owner's tasks
+
 @router.post("/create")
-def create_task_api(task: CreateTaskInput):
-    return create_task(task)
+async def create_task_api(task: CreateTaskInput, db: AsyncSession = Depends(get_async_db),
+                          owner_id: str = Depends(get_owner)):
+    return await create_task(db, owner_id, task)
+
+# Pass sort_by (first page) or cursor (next pages) for keyset pagination; page/page_size remain for older clients
+# Responses carry an ETag of the owner's change version; a matching If-None-Match gets a 304.
+# The owner comes from the token or owner header, so caches must key on those (Vary)
+@router.get("/list", response_model=Union[TaskPageOut, List[TaskOut], ErrorOut])
+async def list_tasks_api(request: Request, response: Response, page: int = 1, page_size: int = 100,
+                         cursor: Optional[str] = None, sort_by: Optional[TaskSortBy] = None, descending: bool = False,
+                         db: AsyncSession = Depends(get_async_db), owner_id: str = Depends(get_owner)):
+    version = await get_change_version(db, owner_id)
+    etag = list_etag(owner_id, version, request.url.query)
+    vary = f"Authorization, {config_env.auth_owner_header}"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": vary})
 
-@router.get("/list")
-def list_tasks_api(page: int = 1, page_size: int = 100):
-    return list_tasks(page, page_size)
+    response.headers["ETag"] = etag
+    response.headers["Vary"] = vary
+    # Let browsers keep the body but revalidate with If-None-Match on every fetch
+    response.headers["Cache-Control"] = "no-cache"
+    # The body is cached per change version, so it always matches the ETag
+    return await list_tasks(db, owner_id, page, page_size, cursor=cursor, sort_by=sort_by, descending=descending,
+                            change_version=version)
 
+# With "version" in the body the update only applies if the task is still at that version;
+# otherwise the reply is a 409 carrying the current version
 @router.put("/update")
-def update_task_api(task: UpdateTaskInput):
-    return update_task(task)
+async def update_task_api(task: UpdateTaskInput, response: Response, db: AsyncSession = Depends(get_async_db),
+                          owner_id: str = Depends(get_owner)):
+    result = await update_task(db, owner_id, task)
+    if result.get("conflict"):
+        response.status_code = 409
+    return result
 
 @router.delete("/delete")
-def delete_task_api(task: DeleteTaskInput):
-    return delete_task(task)
+async def delete_task_api(task: DeleteTaskInput, db: AsyncSession = Depends(get_async_db),
+                          owner_id: str = Depends(get_owner)):
+    return await delete_task(db, owner_id, task)
+
+@router.post("/filter", response_model=Union[TaskPageOut, List[TaskOut], ErrorOut])
+async def filter_tasks_api(filters: FilterTasksInput, page: int = 1, page_size: int = 100, cursor: Optional[str] = None,
+                           sort_by: Optional[TaskSortBy] = None, descending: bool = False,
+                           db: AsyncSession = Depends(get_async_db), owner_id: str = Depends(get_owner)):
+    return await filter_tasks(db, owner_id, filters, page, page_size, cursor=cursor, sort_by=sort_by, descending=descending)
+
+# Ranked search over titles and descriptions (best match first); continue with next_cursor
+@router.get("/search", response_model=Union[TaskSearchOut, ErrorOut])
+async def search_tasks_api(q: str, status: Optional[str] = None, priority: Optional[str] = None,
+                           include_archived: bool = False, match: SearchMatch = "auto", cursor: Optional[str] = None,
+                           page_size: int = 20, db: AsyncSession = Depends(get_async_db), owner_id: str = Depends(get_owner)):
+    filters = (FilterTasksInput(status=status, priority=priority, include_archived=include_archived)
+               if status or priority or include_archived else None)
+    return await search_tasks(db, owner_id, q, filters, cursor=cursor, page_size=min(max(page_size, 1), 100), match=match)
+
+# Dashboard counts (by status/priority, overdue, due this week) from trigger-maintained counters;
+# exact=true recounts from the tasks table instead
+@router.get("/stats")
+async def task_stats_api(exact: bool = False, db: AsyncSession = Depends(get_async_db),
+                         owner_id: str = Depends(get_owner)):
+    return await task_stats(db, owner_id, exact=exact)
+
+# Tasks created/updated since a change version, plus tombstones for deleted IDs
+@router.get("/changes", response_model=TaskChangesOut)
+async def list_changes_api(since: int = 0, limit: int = 500, db: AsyncSession = Depends(get_async_db),
+                           owner_id: str = Depends(get_owner)):
+    return await list_changes(db, owner_id, since, min(max(limit, 1), 1000))
+
+# Every task matching the filters (the /filter body fields, as query parameters), streamed as
+# NDJSON or CSV straight from a server-side cursor
+@router.get("/export")
+async def export_tasks_api(params: Annotated[ExportTasksInput, Query()], owner_id: str = Depends(get_owner)):
+    filter_dict, conditions, error = prepare_export(params)
+    if error:
+        return error
+    filename = f"tasks-{datetime.utcnow():%Y%m%d-%H%M%S}.{params.format}"
+    return StreamingResponse(
+        export_tasks(owner_id, filter_dict, conditions, params.format, params.include_archived), media_type=MEDIA_TYPES[params.format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# Upsert tasks from an NDJSON or CSV request body (as produced by /export), streamed into COPY.
+# The format defaults to CSV for a text/csv Content-Type, NDJSON otherwise.
+@router.post("/import")
+async def import_tasks_api(request: Request, format: Optional[TransferFormat] = None,
+                           db: AsyncSession = Depends(get_async_db), owner_id: str = Depends(get_owner)):
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    return await import_tasks(db, owner_id, request.stream(), format)
+
+# Bulk endpoints: one transaction per request, with a result per item
+@router.post("/bulk_create")
+async def bulk_create_tasks_api(data: BulkCreateTasksInput, db: AsyncSession = Depends(get_async_db),
+                                owner_id: str = Depends(get_owner)):
+    return await bulk_create_tasks(db, owner_id, data)
+
+@router.put("/bulk_update")
+async def bulk_update_tasks_api(data: BulkUpdateTasksInput, db: AsyncSession = Depends(get_async_db),
+                                owner_id: str = Depends(get_owner)):
+    return await bulk_update_tasks(db, owner_id, data)
+
+@router.delete("/bulk_delete")
+async def bulk_delete_tasks_api(data: BulkDeleteTasksInput, db: AsyncSession = Depends(get_async_db),
+                                owner_id: str = Depends(get_owner)):
+    return await bulk_delete_tasks(db, owner_id, data)
+
+# Push channel for task changes: coalesced {"type": "task_delta", "created", "updated", "deleted"} frames.
+# A {"type": "resync"} frame means this client fell behind and should reload the list.
+# Browsers cannot set headers on a WebSocket, so a bearer token may also come as ?token=.
+@router.websocket("/stream")
+async def task_stream(ws: WebSocket):
+    try:
+        owner_id = resolve_owner(ws.headers, ws.query_params)
+    except AuthError as e:
+        await ws.close(code=1008, reason=str(e))
+        return
+    await ws.accept()
+    subscriber = task_event_hub.subscribe(owner_id)
+
+    async def drain_client():
+        # Nothing is expected from the client; reading just surfaces the disconnect
+        while True:
+            await ws.receive_text()
 
-@router.post("/filter")
-def filter_tasks_api(filters: FilterTasksInput, page: int = 1, page_size: int = 100):
-    return filter_tasks(filters, page, page_size)
+    client = asyncio.create_task(drain_client())
+    try:
+        while not client.done():
+            next_frame = asyncio.create_task(subscriber.queue.get())
+            done, _ = await asyncio.wait({next_frame, client}, return_when=asyncio.FIRST_COMPLETED)
+            if next_frame not in done:
+                next_frame.cancel()
+                break
+            await ws.send_json(next_frame.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        task_event_hub.unsubscribe(subscriber)
+        client.cancel()
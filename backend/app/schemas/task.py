@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Literal, List
+from datetime import datetime
 # Schema for create_task
 class CreateTaskInput(BaseModel):
     title: str = Field(description="The short, descriptive title of the task.")
@@ -15,14 +16,132 @@ class UpdateTaskInput(BaseModel):
     priority: Optional[str] = Field(default=None, description="The new priority level.")
     due_date: Optional[str] = Field(default=None, description="The new due date for the task.")
     status: Optional[str] = Field(default=None, description="The new status of the task, e.g., 'pending' or 'done'.")
+    version: Optional[int] = Field(default=None, description="The task's version as last read. If given, the update fails instead of overwriting a change made since.")
 
 # Schema for delete_task
 class DeleteTaskInput(BaseModel):
     task_id: int = Field(description="The unique ID of the task to delete.")
 
 
+# Upper bound on the number of items in one bulk request
+MAX_BULK_ITEMS = 1000
+
+# Schema for bulk_create
+class BulkCreateTasksInput(BaseModel):
+    tasks: List[CreateTaskInput] = Field(max_length=MAX_BULK_ITEMS, description="The tasks to create.")
+
+# Schema for bulk_update
+class BulkUpdateTasksInput(BaseModel):
+    task_ids: List[int] = Field(default_factory=list, max_length=MAX_BULK_ITEMS, description="IDs of tasks that all receive the same changes given below.")
+    title: Optional[str] = Field(default=None, description="New title for every task in task_ids.")
+    description: Optional[str] = Field(default=None, description="New description for every task in task_ids.")
+    priority: Optional[str] = Field(default=None, description="New priority for every task in task_ids.")
+    due_date: Optional[str] = Field(default=None, description="New due date (YYYY-MM-DD) for every task in task_ids.")
+    status: Optional[str] = Field(default=None, description="New status for every task in task_ids, e.g., 'pending' or 'done'.")
+    tasks: List[UpdateTaskInput] = Field(default_factory=list, max_length=MAX_BULK_ITEMS, description="Individual updates, each with its own task_id and changes.")
+
+# Schema for bulk_delete
+class BulkDeleteTasksInput(BaseModel):
+    task_ids: List[int] = Field(max_length=MAX_BULK_ITEMS, description="IDs of the tasks to delete.")
+
 class FilterTasksInput(BaseModel):
     status: Optional[str] = Field(default=None, description="Filter by status, e.g., 'pending' or 'done'.")
     priority: Optional[str] = Field(default=None, description="Filter by priority, e.g., 'high', 'medium', 'low'.")
-    # For simplicity of this challenge, due_date filter is equality; ranges can be added later
-    due_date: Optional[str] = Field(default=None, description="Filter by due date (YYYY-MM-DD).")
\ No newline at end of file
+    due_date: Optional[str] = Field(default=None, description="Filter by exact due date (YYYY-MM-DD).")
+    statuses: Optional[List[str]] = Field(default=None, description="Match any of these statuses, e.g., ['pending', 'done'].")
+    priorities: Optional[List[str]] = Field(default=None, description="Match any of these priorities, e.g., ['high', 'medium'].")
+    due_after: Optional[str] = Field(default=None, description="Only tasks due on or after this date (YYYY-MM-DD).")
+    due_before: Optional[str] = Field(default=None, description="Only tasks due on or before this date (YYYY-MM-DD).")
+    overdue: Optional[bool] = Field(default=None, description="True for pending tasks whose due date has passed, False to exclude them.")
+    created_since: Optional[str] = Field(default=None, description="Only tasks created at or after this date/time (YYYY-MM-DD or ISO 8601).")
+    updated_since: Optional[str] = Field(default=None, description="Only tasks updated at or after this date/time (YYYY-MM-DD or ISO 8601).")
+    include_archived: bool = Field(default=False, description="Also match archived tasks (done tasks archived after a while); they come back with archived=true.")
+
+
+# Sort orders available to cursor pagination
+TaskSortBy = Literal["id", "due_date", "priority", "created_at"]
+
+# Task fields the list/filter tools can project
+TaskField = Literal["id", "title", "description", "priority", "status", "due_date", "version", "archived"]
+
+# Cursor pagination options for the list/filter tools
+class PageInput(BaseModel):
+    cursor: Optional[str] = Field(default=None, description="The next_cursor returned by the previous page. Omit it to get the first page.")
+    sort_by: TaskSortBy = Field(default="id", description="Sort order: 'id', 'due_date', 'priority' (high first) or 'created_at'. Ignored when a cursor is given.")
+    descending: bool = Field(default=False, description="Reverse the sort order. Ignored when a cursor is given.")
+    page_size: int = Field(default=20, ge=1, le=100, description="Maximum number of tasks to return.")
+    fields: Optional[List[TaskField]] = Field(default=None, description="Fields to return for each task. Defaults to all of them with the description shortened; ask only for what you need, e.g. ['id', 'title'].")
+
+
+class ListTasksInput(PageInput):
+    pass
+
+
+# Search strategy: whole words first, typo-tolerant matching if that finds nothing
+SearchMatch = Literal["auto", "fulltext", "fuzzy"]
+
+class SearchTasksInput(BaseModel):
+    query: str = Field(min_length=1, max_length=200, description="Words to look for in task titles and descriptions, e.g. 'invoices' or 'dentist appointment'.")
+    status: Optional[str] = Field(default=None, description="Only tasks with this status, e.g., 'pending' or 'done'.")
+    priority: Optional[str] = Field(default=None, description="Only tasks with this priority, e.g., 'high', 'medium', 'low'.")
+    include_archived: bool = Field(default=False, description="Also search archived tasks (done tasks archived after a while).")
+    match: SearchMatch = Field(default="auto", description="'fulltext' for whole words, 'fuzzy' for misspelled or partial words, 'auto' to try fulltext first.")
+    cursor: Optional[str] = Field(default=None, description="The next_cursor returned by the previous page. Omit it to get the first page.")
+    page_size: int = Field(default=10, ge=1, le=100, description="Maximum number of tasks to return (best matches first).")
+    fields: Optional[List[TaskField]] = Field(default=None, description="Fields to return for each task. Defaults to all of them with the description shortened.")
+
+
+class FilterTasksPageInput(FilterTasksInput, PageInput):
+    pass
+
+
+# File formats for /tasks/export and /tasks/import
+TransferFormat = Literal["ndjson", "csv"]
+
+class ExportTasksInput(FilterTasksInput):
+    format: TransferFormat = Field(default="ndjson", description="'ndjson' (one JSON object per line) or 'csv' (with a header row).")
+
+
+# task_stats takes no arguments
+class TaskStatsInput(BaseModel):
+    pass
+
+
+
+# --- Responses ---
+# Declared as response_model on the list endpoints: FastAPI then validates and serializes pages
+# straight to JSON bytes in pydantic-core instead of jsonable_encoder + json.dumps
+class TaskOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[str] = None
+    status: Optional[str] = None
+    due_date: Optional[datetime] = None
+    version: Optional[int] = None
+    # Only include_archived results can be archived
+    archived: bool = False
+
+
+class TaskPageOut(BaseModel):
+    items: List[TaskOut]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
+class TaskSearchOut(TaskPageOut):
+    match: Literal["fulltext", "fuzzy"]
+
+
+class TaskChangesOut(BaseModel):
+    version: int
+    reset: bool
+    changed: List[TaskOut]
+    deleted: List[int]
+    has_more: bool
+
+
+class ErrorOut(BaseModel):
+    error: str
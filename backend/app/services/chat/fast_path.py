@@ -0,0 +1,253 @@
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from services.task import tools
+from services.chat.streaming import TOOL_PREVIEW_CHARS
+from services.chat.telemetry import tool_duration
+from utils.config_env import config_env
+from utils.logger import logger
+
+# Fast path: unambiguous one-line commands ("mark task 12 done", "delete task 7",
+# "show pending high priority tasks") are answered by calling the task tools directly,
+# skipping the model round trips. A message must match a rule in full; anything else
+# (extra words, several statuses, unknown wording) falls through to the agent.
+
+STATUS_WORDS = {
+    "done": "done", "complete": "done", "completed": "done", "finished": "done",
+    "pending": "pending", "todo": "pending", "not done": "pending", "open": "pending",
+}
+PRIORITIES = ("high", "medium", "low")
+LIST_PAGE_SIZE = 20
+
+_TASK = r"task\s+(?:#|no\.?\s*|number\s+)?(?P<id>\d+)"
+_STATUS = r"(?P<status>not done|done|complete|completed|finished|pending|todo|open)"
+_PRIORITY = r"(?P<priority>high|medium|low)"
+
+
+# --- Rules: each returns (tool name, tool args), or None to fall through ---
+def _set_status(m: re.Match):
+    return "update_task", {"task_id": int(m["id"]), "status": STATUS_WORDS[m["status"]]}
+
+
+def _complete(m: re.Match):
+    return "update_task", {"task_id": int(m["id"]), "status": "done"}
+
+
+def _reopen(m: re.Match):
+    return "update_task", {"task_id": int(m["id"]), "status": "pending"}
+
+
+def _set_priority(m: re.Match):
+    return "update_task", {"task_id": int(m["id"]), "priority": m["priority"]}
+
+
+def _delete(m: re.Match):
+    return "delete_task", {"task_id": int(m["id"])}
+
+
+def _delete_many(m: re.Match):
+    ids = sorted({int(i) for i in re.findall(r"\d+", m["ids"])})
+    return "bulk_delete_tasks", {"task_ids": ids}
+
+
+def _show(m: re.Match):
+    statuses, priorities, overdue = set(), set(), False
+    for word in (m["quals"] or "").replace("not done", "pending").split():
+        if word == "priority":
+            continue
+        if word == "overdue":
+            overdue = True
+        elif word in PRIORITIES:
+            priorities.add(word)
+        elif word in STATUS_WORDS:
+            statuses.add(STATUS_WORDS[word])
+    # "pending done tasks" or "high low tasks" is not a clear request
+    if len(statuses) > 1 or len(priorities) > 1:
+        return None
+    if not (statuses or priorities or overdue):
+        return "list_tasks", {"page_size": LIST_PAGE_SIZE}
+    args = {"page_size": LIST_PAGE_SIZE}
+    if statuses:
+        args["status"] = statuses.pop()
+    if priorities:
+        args["priority"] = priorities.pop()
+    if overdue:
+        args["overdue"] = True
+    return "filter_tasks", args
+
+
+def _search(m: re.Match):
+    return "search_tasks", {"query": m["query"].strip("'\"“”"), "page_size": LIST_PAGE_SIZE}
+
+
+def _stats(m: re.Match):
+    return "task_stats", {}
+
+
+_QUALIFIER = r"(?:not done|done|complete|completed|finished|pending|todo|open|overdue|high|medium|low|priority)"
+
+ROUTES: list[tuple[str, re.Pattern, Callable]] = [
+    ("set_status", re.compile(rf"(?:mark|set) {_TASK} (?:as )?{_STATUS}"), _set_status),
+    ("set_status", re.compile(rf"{_TASK} (?:is )?{_STATUS}"), _set_status),
+    ("complete", re.compile(rf"(?:complete|finish|close) {_TASK}"), _complete),
+    ("reopen", re.compile(rf"reopen {_TASK}"), _reopen),
+    ("set_priority", re.compile(rf"(?:set|change|make) (?:the )?priority of {_TASK} (?:to )?{_PRIORITY}"), _set_priority),
+    ("set_priority", re.compile(rf"(?:set|change|make) {_TASK} (?:priority )?(?:to )?{_PRIORITY}(?: priority)?"), _set_priority),
+    ("delete", re.compile(rf"(?:delete|remove) {_TASK}"), _delete),
+    ("delete_many", re.compile(r"(?:delete|remove) tasks (?P<ids>#?\d+(?:(?:\s*,\s*|\s*,?\s+and\s+|\s+)#?\d+)+)"), _delete_many),
+    ("stats", re.compile(r"(?:how many tasks(?: do i have)?(?: in total)?|(?:show |get )?(?:me )?(?:my )?task (?:stats|statistics|counts|summary))"), _stats),
+    ("search", re.compile(r"(?:find|search(?: for)?|look for)(?: me)?(?: my| the| all)?(?: all)? tasks? (?:about|mentioning|containing|regarding|related to) (?P<query>.+)"), _search),
+    ("show", re.compile(rf"(?:show|list|get|display)(?: me)?(?: all)?(?: my| the)?(?: all)? (?P<quals>(?:{_QUALIFIER} )*)tasks"), _show),
+]
+
+TOOLS = {
+    "update_task": tools.update_task,
+    "delete_task": tools.delete_task,
+    "bulk_delete_tasks": tools.bulk_delete_tasks,
+    "list_tasks": tools.list_tasks,
+    "filter_tasks": tools.filter_tasks,
+    "search_tasks": tools.search_tasks,
+    "task_stats": tools.task_stats,
+}
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    text = re.sub(r"^(?:please|pls|can you|could you)\s+", "", text)
+    text = re.sub(r"(?:\s+please)?[\s.!?]*$", "", text)
+    return text
+
+
+def match_command(text: str) -> Optional[tuple[str, str, dict]]:
+    """(route, tool name, tool args) for an unambiguous command, else None."""
+    normalized = _normalize(text)
+    if len(normalized) > 200:
+        return None
+    for route, pattern, rule in ROUTES:
+        m = pattern.fullmatch(normalized)
+        if m:
+            planned = rule(m)
+            return (route, *planned) if planned else None
+    return None
+
+
+# --- Replies ---
+def _format_task(task: dict) -> str:
+    # Tool results are compacted (tool_output.compact_task), which drops empty fields
+    details = [value for value in (task.get("priority"), task.get("status")) if value]
+    due = task.get("due_date")
+    if due:
+        details.append(f"due {str(due)[:10]}")
+    title = task.get("title") or "(untitled)"
+    return f"#{task.get('id')} {title}" + (f" ({', '.join(details)})" if details else "")
+
+
+def format_reply(tool_name: str, result: dict) -> str:
+    if "error" in result:
+        return result["error"]
+    if "by_status" in result:
+        by_status = ", ".join(f"{count} {status}" for status, count in sorted(result["by_status"].items(), key=str))
+        by_priority = ", ".join(f"{count} {priority}" for priority, count in sorted(result["by_priority"].items(), key=str))
+        lines = [f"You have {result['total']} task(s)" + (f": {by_status}." if by_status else ".")]
+        if by_priority:
+            lines.append(f"By priority: {by_priority}.")
+        lines.append(f"{result['overdue']} overdue, {result['due_this_week']} pending due this week.")
+        return "\n".join(lines)
+    if "items" in result:
+        if not result["items"]:
+            return "No matching tasks."
+        lines = [_format_task(t) for t in result["items"]]
+        if result.get("has_more"):
+            total = result.get("summary", {}).get("total")
+            of_total = f" of {total}" if total else ""
+            lines.append(f"…showing the first {len(result['items'])}{of_total}. Ask me for more.")
+        return "\n".join(lines)
+    return result.get("message", "✅ Done.")
+
+
+# --- Metrics ---
+class FastPathStats:
+    def __init__(self):
+        self.messages = 0
+        self.hits: Counter = Counter()
+        self.errors = 0
+
+    def record(self, route: Optional[str]):
+        self.messages += 1
+        if route:
+            self.hits[route] += 1
+
+    def snapshot(self) -> dict:
+        total = self.messages or 1
+        handled = sum(self.hits.values())
+        return {
+            "enabled": config_env.chat_fast_path_enabled,
+            "messages": self.messages,
+            "fast_path": handled,
+            "fallthrough": self.messages - handled,
+            "hit_rate": round(handled / total, 4),
+            "errors": self.errors,
+            "routes": {
+                route: {"hits": hits, "hit_rate": round(hits / total, 4)}
+                for route, hits in sorted(self.hits.items())
+            },
+        }
+
+
+fast_path_stats = FastPathStats()
+
+
+async def run_fast_path(text: str) -> Optional[dict]:
+    """Answer a chat message without the agent, or return None to hand it to the agent."""
+    if not config_env.chat_fast_path_enabled:
+        return None
+    planned = match_command(text)
+    if not planned:
+        fast_path_stats.record(None)
+        return None
+
+    route, tool_name, args = planned
+    started = time.perf_counter()
+    try:
+        result = await TOOLS[tool_name](**args)
+        reply = format_reply(tool_name, result)
+    except Exception as e:
+        tool_duration.observe(time.perf_counter() - started, tool=tool_name, source="fast_path", status="error")
+        # Let the agent deal with it (and report it) rather than failing the turn here
+        fast_path_stats.errors += 1
+        fast_path_stats.record(None)
+        logger.error(f"⚠️ Fast path '{route}' failed, falling back to the agent: {e}")
+        return None
+    tool_duration.observe(time.perf_counter() - started, tool=tool_name, source="fast_path", status="ok")
+    fast_path_stats.record(route)
+    return {
+        "route": route,
+        "tool": tool_name,
+        "args": args,
+        "call_id": f"fast-{uuid.uuid4().hex[:12]}",
+        "result": result,
+        "reply": reply,
+    }
+
+
+def fast_path_frames(hit: dict) -> list[dict]:
+    """The same frame sequence an agent turn with one tool call produces in token mode."""
+    status = "error" if "error" in hit["result"] else "success"
+    return [
+        {"type": "tool_start", "id": hit["call_id"], "name": hit["tool"], "args": hit["args"]},
+        {"type": "tool_end", "id": hit["call_id"], "name": hit["tool"], "status": status, "preview": hit["reply"][:TOOL_PREVIEW_CHARS]},
+        {"type": "final", "text": hit["reply"]},
+    ]
+
+
+async def record_exchange(agent, config: dict, text: str, hit: dict):
+    """Append the exchange to the thread so later agent turns can refer back to it."""
+    await agent.aupdate_state(
+        config,
+        {"messages": [HumanMessage(content=text), AIMessage(content=hit["reply"])]},
+        as_node="agent",
+    )
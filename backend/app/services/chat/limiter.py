@@ -0,0 +1,76 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from utils.config_env import config_env
+
+# Caps how many agent turns (each one or more LLM calls) a worker runs at once. Turns beyond
+# the cap wait in a bounded queue; when the queue is full or the wait is too long the caller
+# gets LLMBusy right away and can tell the client to retry, instead of piling up timeouts.
+
+
+class LLMBusy(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent: int, max_waiting: int, wait_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise LLMBusy("The assistant is busy right now. Please try again in a moment.", retry_after=self.wait_timeout / 2)
+
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise LLMBusy("The assistant is busy right now. Please try again in a moment.", retry_after=self.wait_timeout / 2)
+        finally:
+            self.waiting -= 1
+
+        self.total_wait += time.monotonic() - started
+        self.admitted += 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "max_queue_depth": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+        }
+
+
+llm_limiter = ConcurrencyLimiter(
+    max_concurrent=config_env.chat_llm_max_concurrency,
+    max_waiting=config_env.chat_llm_max_waiting,
+    wait_timeout=config_env.chat_llm_wait_timeout,
+)
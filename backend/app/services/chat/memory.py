@@ -0,0 +1,200 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from langchain_core.messages import HumanMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import InMemorySaver
+from utils.config_env import config_env
+from utils.logger import logger
+
+# Conversation memory for the chat agent:
+#   "memory"   - per-worker, bounded: idle threads are evicted after a TTL or when too many are kept
+#   "postgres" - durable (langgraph-checkpoint-postgres); a client can resume its thread on any worker
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-process checkpointer with a cap on threads and on checkpoints kept per thread.
+    Pruning edits InMemorySaver's internal storage, writes and blobs dicts as laid out in
+    langgraph-checkpoint 2.1, which requirements.txt pins for that reason.
+    """
+
+    def __init__(self, max_threads: int, idle_ttl: float, max_checkpoints: int):
+        super().__init__()
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+        self.max_checkpoints = max_checkpoints
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()  # LRU order, oldest first
+        self._active: Counter = Counter()  # open connections per thread
+        self._versions: dict = {}  # (thread_id, ns, checkpoint_id) -> channel versions
+        self.evictions = 0
+
+    # --- Connection tracking ---
+    def acquire(self, thread_id: str):
+        self._active[thread_id] += 1
+        self._touch(thread_id)
+
+    def release(self, thread_id: str):
+        self._active[thread_id] -= 1
+        if self._active[thread_id] <= 0:
+            del self._active[thread_id]
+        self._touch(thread_id)
+
+    def _touch(self, thread_id: str):
+        self._last_used[thread_id] = time.monotonic()
+        self._last_used.move_to_end(thread_id)
+
+    # --- Checkpoint storage ---
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"]["checkpoint_ns"]
+        self._versions[(thread_id, ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+        self._touch(thread_id)
+        self._prune_checkpoints(thread_id, ns)
+        self._evict_lru()
+        return result
+
+    def _prune_checkpoints(self, thread_id: str, ns: str):
+        # Only the latest checkpoint is needed to continue a conversation; older ones
+        # (and the message-list blobs they alone reference) would otherwise pile up every turn
+        checkpoints = self.storage[thread_id][ns]
+        excess = len(checkpoints) - self.max_checkpoints
+        if excess <= 0:
+            return
+        for checkpoint_id in list(checkpoints)[:excess]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, ns, checkpoint_id), None)
+            self._versions.pop((thread_id, ns, checkpoint_id), None)
+
+        referenced = {
+            (channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in self._versions.get((thread_id, ns, checkpoint_id), {}).items()
+        }
+        for key in [k for k in self.blobs if k[0] == thread_id and k[1] == ns]:
+            if (key[2], key[3]) not in referenced:
+                del self.blobs[key]
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._last_used.pop(thread_id, None)
+        for key in [k for k in self._versions if k[0] == thread_id]:
+            del self._versions[key]
+
+    # --- Eviction ---
+    def _evict_lru(self):
+        excess = len(self._last_used) - self.max_threads
+        if excess <= 0:
+            return
+        # Threads with an open connection are never evicted, even if that leaves us over the cap
+        idle = [t for t in self._last_used if t not in self._active][:excess]
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+            self.evictions += 1
+
+    def evict_idle(self) -> int:
+        """Drop threads with no open connection that have not been used for idle_ttl seconds."""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = [t for t, used in self._last_used.items() if used < cutoff and t not in self._active]
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        self.evictions += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "threads": len(self._last_used),
+            "active_threads": len(self._active),
+            "max_threads": self.max_threads,
+            "evictions": self.evictions,
+        }
+
+
+def hold_thread(checkpointer: Any, thread_id: str):
+    """Mark a thread as in use by a connection (no-op for durable checkpointers)."""
+    if isinstance(checkpointer, BoundedMemorySaver):
+        checkpointer.acquire(thread_id)
+
+
+def release_thread(checkpointer: Any, thread_id: str):
+    """Connection closed: the thread becomes evictable once it has been idle for the TTL."""
+    if isinstance(checkpointer, BoundedMemorySaver):
+        checkpointer.release(thread_id)
+
+
+def checkpointer_stats(checkpointer: Any) -> dict:
+    if isinstance(checkpointer, BoundedMemorySaver):
+        return checkpointer.stats()
+    return {"backend": type(checkpointer).__name__}
+
+
+def new_memory_saver() -> BoundedMemorySaver:
+    return BoundedMemorySaver(
+        max_threads=config_env.chat_max_threads,
+        idle_ttl=config_env.chat_thread_idle_ttl,
+        max_checkpoints=config_env.chat_max_checkpoints,
+    )
+
+
+@asynccontextmanager
+async def open_checkpointer(kind: str) -> AsyncIterator[Any]:
+    if kind == "memory":
+        yield new_memory_saver()
+        return
+    if kind != "postgres":
+        raise ValueError(f"❌ Unknown chat checkpointer '{kind}' (expected 'memory' or 'postgres')")
+
+    try:
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    except ImportError as e:
+        raise RuntimeError("❌ chat_checkpointer=postgres requires the langgraph-checkpoint-postgres package") from e
+    from utils.db_connection import async_engine
+
+    dsn = async_engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    async with AsyncPostgresSaver.from_conn_string(dsn) as saver:
+        await saver.setup()
+        logger.info("✅ Chat threads are stored in Postgres")
+        yield saver
+
+
+async def thread_sweeper(checkpointer: Any, interval: float | None = None):
+    """Background task that evicts idle in-memory conversation threads."""
+    if not isinstance(checkpointer, BoundedMemorySaver):
+        return
+    interval = interval or max(checkpointer.idle_ttl / 4, 1)
+    while True:
+        await asyncio.sleep(interval)
+        evicted = checkpointer.evict_idle()
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} idle chat thread(s)")
+
+
+# --- History trimming ---
+def trim_history(state: dict) -> dict:
+    """pre_model_hook: send only the recent part of the conversation to the model.
+
+    The full history stays in the checkpoint; only the model input is trimmed. Trimming
+    starts on a human message so tool results are never separated from their tool calls.
+    """
+    messages = state["messages"]
+    trimmed = messages
+    if config_env.chat_history_max_messages:
+        trimmed = trim_messages(
+            trimmed, strategy="last", token_counter=len,
+            max_tokens=config_env.chat_history_max_messages, start_on="human",
+        )
+    if config_env.chat_history_max_tokens:
+        trimmed = trim_messages(
+            trimmed, strategy="last", token_counter=count_tokens_approximately,
+            max_tokens=config_env.chat_history_max_tokens, start_on="human",
+        )
+    if not trimmed:
+        # The current turn alone is over budget: keep it whole rather than send nothing
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        trimmed = messages[last_human:]
+    return {"llm_input_messages": trimmed}
@@ -0,0 +1,203 @@
+import asyncio
+import json
+from collections import deque
+from typing import Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from langchain_core.messages import AIMessage, ToolMessage
+from services.task.agent import ensure_agent, get_agent
+from services.chat.fast_path import run_fast_path, fast_path_frames, record_exchange
+from services.chat.limiter import llm_limiter, LLMBusy
+from services.chat.streaming import stream_text_replies, stream_token_frames
+from utils.config_env import config_env
+from utils.logger import logger
+
+# One chat connection: a reader that takes messages and control frames off the socket, and a
+# worker that answers messages one at a time. Keeping them apart lets a "stop" frame, a newer
+# message ("latest message wins") or a disconnect cancel the turn that is being generated.
+
+STOP_FRAME = "stop"
+# Fast-path exchanges kept until the agent exists to record them (lazy agent startup); oldest dropped first
+MAX_UNRECORDED_EXCHANGES = 20
+
+
+def _control_frame(raw: str) -> Optional[str]:
+    # Control frames are JSON objects such as {"type": "stop"}; anything else is a chat message
+    if not raw.startswith("{"):
+        return None
+    try:
+        frame = json.loads(raw)
+    except ValueError:
+        return None
+    return frame.get("type") if isinstance(frame, dict) else None
+
+
+async def repair_interrupted_turn(agent, config: dict):
+    """
+    A turn cancelled while tools were running leaves tool calls without results in the thread,
+    which the model rejects on the next turn. Answer them as cancelled and close the turn.
+    """
+    state = await agent.aget_state(config)
+    messages = (state.values or {}).get("messages", [])
+    if not messages or not isinstance(messages[-1], (AIMessage, ToolMessage)):
+        return
+    last_ai = next((m for m in reversed(messages) if isinstance(m, AIMessage)), None)
+    if last_ai is None or not last_ai.tool_calls:
+        return
+
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    missing = [
+        ToolMessage(content="Cancelled before completion.", tool_call_id=call["id"], name=call["name"], status="error")
+        for call in last_ai.tool_calls if call["id"] not in answered
+    ]
+    await agent.aupdate_state(
+        config,
+        {"messages": missing + [AIMessage(content="(Stopped before finishing.)")]},
+        as_node="agent",
+    )
+
+
+class ChatSession:
+    def __init__(self, ws: WebSocket, token_mode: bool, thread_id: str, config: dict, latest_wins: bool):
+        self.ws = ws
+        self.token_mode = token_mode
+        self.thread_id = thread_id
+        self.config = config
+        self.latest_wins = latest_wins
+        self.pending: asyncio.Queue = asyncio.Queue(maxsize=config_env.chat_max_pending_messages)
+        self.current: Optional[asyncio.Task] = None
+        self.unrecorded: deque = deque(maxlen=MAX_UNRECORDED_EXCHANGES)
+
+    async def run(self):
+        worker = asyncio.create_task(self._worker())
+        try:
+            await self._reader()
+        finally:
+            # Socket closed: stop generating (and paying for) a reply nobody will read
+            self._cancel_current()
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+
+    # --- Reader ---
+    async def _reader(self):
+        while True:
+            try:
+                raw = await self.ws.receive_text()
+            except WebSocketDisconnect:
+                return
+
+            if _control_frame(raw) == STOP_FRAME:
+                self._drop_pending()
+                if self._cancel_current():
+                    await self._send_frame({"type": "cancelled"}, "⏹️ Stopped.")
+                continue
+
+            if self.latest_wins:
+                # A newer message supersedes whatever is waiting or being answered
+                self._drop_pending()
+                if self._cancel_current():
+                    await self._send_frame({"type": "cancelled", "reason": "superseded"}, "⏹️ Stopped.")
+
+            try:
+                self.pending.put_nowait(raw)
+            except asyncio.QueueFull:
+                await self._send_busy("Please wait for the current reply before sending more messages.", retry_after=1.0)
+
+    def _drop_pending(self):
+        while not self.pending.empty():
+            self.pending.get_nowait()
+
+    def _cancel_current(self) -> bool:
+        if self.current and not self.current.done():
+            self.current.cancel()
+            return True
+        return False
+
+    # --- Worker ---
+    async def _worker(self):
+        while True:
+            msg = await self.pending.get()
+            turn = asyncio.create_task(self._turn(msg))
+            self.current = turn
+            try:
+                # wait() rather than await: a cancelled turn must not cancel the worker
+                await asyncio.wait({turn})
+            finally:
+                if not turn.done():
+                    turn.cancel()
+                    await asyncio.gather(turn, return_exceptions=True)
+                self.current = None
+
+    async def _turn(self, msg: str):
+        try:
+            # Simple commands are answered directly, without waiting for the agent (or its build);
+            # everything else goes through the agent
+            hit = await run_fast_path(msg)
+            if hit:
+                if self.token_mode:
+                    for frame in fast_path_frames(hit):
+                        await self.ws.send_json(frame)
+                else:
+                    await self.ws.send_text(hit["reply"])
+                await self._record_fast_path(msg, hit)
+                return
+
+            # A failed build is reported like any other agent failure below
+            agent_app = await ensure_agent()
+            if self.unrecorded:
+                await self._record_exchanges(agent_app)
+            inputs = {"messages": [{"role": "user", "content": msg}]}
+            async with llm_limiter.slot():
+                try:
+                    if self.token_mode:
+                        async for frame in stream_token_frames(agent_app, inputs, self.config):
+                            await self.ws.send_json(frame)
+                    else:
+                        async for text in stream_text_replies(agent_app, inputs, self.config):
+                            await self.ws.send_text(text)
+                except asyncio.CancelledError:
+                    # Keep the thread consistent so the next turn (or a resumed session) still works
+                    await asyncio.shield(repair_interrupted_turn(agent_app, self.config))
+                    raise
+        except LLMBusy as busy:
+            await self._send_busy(busy.message, busy.retry_after)
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"⚠️ Chat error on thread {self.thread_id}: {e}")
+            await self._send_frame(
+                {"type": "error", "message": "The agent failed to answer. Please try again."},
+                "⚠️ The agent failed to answer. Please try again.",
+            )
+
+    async def _record_fast_path(self, msg: str, hit: dict):
+        # Recording goes through the agent, but a fast-path hit never builds it (CHAT_AGENT_STARTUP=lazy
+        # stays lazy): until it exists the exchange waits here for the first agent turn
+        self.unrecorded.append((msg, hit))
+        agent_app = get_agent()
+        if agent_app is not None:
+            await self._record_exchanges(agent_app)
+
+    async def _record_exchanges(self, agent_app):
+        # The replies are already sent; if the thread cannot be updated, later turns only miss these exchanges
+        exchanges = list(self.unrecorded)
+        self.unrecorded.clear()
+        try:
+            for msg, hit in exchanges:
+                await record_exchange(agent_app, self.config, msg, hit)
+        except Exception as e:
+            logger.warning(f"Fast-path exchange not recorded on thread {self.thread_id}: {e}")
+
+    # --- Sending ---
+    async def _send_busy(self, message: str, retry_after: float):
+        await self._send_frame({"type": "busy", "message": message, "retry_after": retry_after}, f"⏳ {message}")
+
+    async def _send_frame(self, frame: dict, text: str):
+        try:
+            if self.token_mode:
+                await self.ws.send_json(frame)
+            else:
+                await self.ws.send_text(text)
+        except Exception:
+            # The socket is gone; the reader will see the disconnect
+            pass
@@ -0,0 +1,67 @@
+from typing import Any, AsyncIterator
+from langchain_core.messages import AIMessage, ToolMessage
+
+# Chat output modes:
+#   "text"   - legacy: one plain-text frame per AI message, sent once the message is complete
+#   "tokens" - typed JSON frames: session, token, tool_start, tool_end, final, error (plus busy and
+#              cancelled, sent by the chat session)
+
+# Tool outputs are echoed in tool_end frames only as a short preview
+TOOL_PREVIEW_CHARS = 200
+
+
+def message_text(message: Any) -> str:
+    """Text of a message whose content is a string or a list of content parts (Gemini)."""
+    content = getattr(message, "content", None)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+
+async def stream_text_replies(agent, inputs: dict, config: dict) -> AsyncIterator[str]:
+    # "updates" yields only what each graph step added, instead of the whole message list ("values")
+    async for update in agent.astream(inputs, config, stream_mode="updates"):
+        for node_output in update.values():
+            for message in (node_output or {}).get("messages", []):
+                if isinstance(message, AIMessage):
+                    text = message_text(message)
+                    if text:
+                        yield text
+
+
+async def stream_token_frames(agent, inputs: dict, config: dict) -> AsyncIterator[dict]:
+    final_text = ""
+    async for mode, payload in agent.astream(inputs, config, stream_mode=["messages", "updates"]):
+        if mode == "messages":
+            chunk, _metadata = payload
+            # Streaming models yield AIMessageChunks; others yield the whole AIMessage once
+            if isinstance(chunk, AIMessage):
+                text = message_text(chunk)
+                if text:
+                    yield {"type": "token", "text": text}
+            continue
+
+        for node_output in payload.values():
+            for message in (node_output or {}).get("messages", []):
+                if isinstance(message, AIMessage):
+                    for call in message.tool_calls:
+                        yield {"type": "tool_start", "id": call.get("id"), "name": call["name"], "args": call.get("args", {})}
+                    if not message.tool_calls:
+                        final_text = message_text(message)
+                elif isinstance(message, ToolMessage):
+                    output = message_text(message)
+                    yield {
+                        "type": "tool_end",
+                        "id": message.tool_call_id,
+                        "name": message.name,
+                        "status": getattr(message, "status", "success"),
+                        "preview": output[:TOOL_PREVIEW_CHARS],
+                    }
+
+    yield {"type": "final", "text": final_text}
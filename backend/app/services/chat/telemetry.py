@@ -0,0 +1,94 @@
+import time
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from utils.metrics import metrics
+from utils.tracing import start_span
+
+# Model latency/token usage and tool timings for agent turns, recorded through LangChain
+# callbacks so every model and tool call is covered without touching the tools themselves.
+
+llm_request_duration = metrics.histogram(
+    "llm_request_duration_seconds", "Chat model call latency (first request to last token).", ["model", "status"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+llm_tokens = metrics.counter("llm_tokens_total", "Tokens reported by the chat model.", ["model", "type"])
+tool_duration = metrics.histogram(
+    "tool_duration_seconds", "Task tool execution time.", ["tool", "source", "status"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+
+def _model_name(serialized: Optional[dict], kwargs: dict) -> str:
+    params = kwargs.get("invocation_params") or {}
+    name = params.get("model") or params.get("model_name") or (serialized or {}).get("kwargs", {}).get("model")
+    return str(name or (serialized or {}).get("name") or "unknown")
+
+
+def _usage(response: LLMResult) -> dict:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage
+    return {}
+
+
+class TelemetryCallback(AsyncCallbackHandler):
+    """Times model and tool runs by run_id; shared by all turns (state is per run, not per handler)."""
+
+    def __init__(self):
+        self._runs: dict[UUID, tuple[str, float, Any]] = {}
+
+    def _start(self, run_id: UUID, label: str, span_name: str, **attributes):
+        self._runs[run_id] = (label, time.perf_counter(), start_span(span_name, **attributes))
+
+    def _finish(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[tuple[str, float]]:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        label, started, span = run
+        if span is not None:
+            if error is not None:
+                span.record_exception(error)
+            span.end()
+        return label, time.perf_counter() - started
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        model = _model_name(serialized, kwargs)
+        self._start(run_id, model, "llm.call", **{"llm.model": model})
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        model, elapsed = finished
+        llm_request_duration.observe(elapsed, model=model, status="ok")
+        usage = _usage(response)
+        for kind in ("input_tokens", "output_tokens"):
+            if usage.get(kind):
+                llm_tokens.inc(usage[kind], model=model, type=kind.removesuffix("_tokens"))
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id, error)
+        if finished is not None:
+            llm_request_duration.observe(finished[1], model=finished[0], status="error")
+
+    async def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._start(run_id, name, "tool.call", **{"tool.name": name})
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id)
+        if finished is not None:
+            tool_duration.observe(finished[1], tool=finished[0], source="agent", status="ok")
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        finished = self._finish(run_id, error)
+        if finished is not None:
+            tool_duration.observe(finished[1], tool=finished[0], source="agent", status="error")
+
+
+telemetry_callback = TelemetryCallback()
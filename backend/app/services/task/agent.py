@@ -1,14 +1,19 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from services.task.tools import create_task, list_tasks, update_task, delete_task, filter_tasks
-from schemas.task import CreateTaskInput,DeleteTaskInput,UpdateTaskInput,FilterTasksInput
-from langchain.tools import StructuredTool
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
+import asyncio
+import time
+from services.task.tools import (
+    create_task, list_tasks, update_task, delete_task, filter_tasks, search_tasks, task_stats,
+    bulk_create_tasks, bulk_update_tasks, bulk_delete_tasks,
+)
+from schemas.task import CreateTaskInput,DeleteTaskInput,UpdateTaskInput,ListTasksInput,FilterTasksPageInput,SearchTasksInput,TaskStatsInput
+from schemas.task import BulkCreateTasksInput,BulkUpdateTasksInput,BulkDeleteTasksInput
+from langchain_core.tools import StructuredTool
+from services.chat.telemetry import telemetry_callback
+from services.chat.memory import new_memory_saver, trim_history
 from utils.config_env import config_env
-# Initialize Memory
+from utils.logger import logger
 
-memory = MemorySaver()
+# The Gemini client and the agent graph are built on first use (or in the background at startup),
+# not at import: langchain_google_genai alone takes about a second to import.
 
 # 1. Define the System Prompt (Instructions)
 system_prompt_text = (
@@ -17,70 +22,164 @@ system_prompt_text = (
     
     "**Strict Rules:**\n"
     "1. You MUST call a tool for any request involving task creation, listing, updating, or deletion.\n"
+    "   When several tasks are affected, use a single bulk_* tool call instead of one call per task.\n"
     "2. Be concise and professional in your final response.\n"
     "3. Only use the `task_id` for tasks that have been successfully created or listed. Never guess an ID.\n"
     "4. If a user asks a general question (e.g., 'How are you?'), answer directly without using a tool."
 )
 
-# 2. Define the Prompt Template
-# This structure is standard for tool-calling agents in LangChain.
-prompt = ChatPromptTemplate.from_messages(
-    [
-        # System Message: Sets the persona and rules
-        ("system", system_prompt_text),
-        
-        # Chat History Placeholder: Required for conversationownal memory (even if you don't use it yet)
-        MessagesPlaceholder(variable_name="chat_history"),
-        
-        # Human Input: The current user query
-        ("human", "{input}"),
-        
-        # Agent Scratchpad: Required for the agent's internal thought process and tool execution history
-        MessagesPlaceholder(variable_name="agent_scratchpad"),
-    ]
-)
-# configure Gemini API
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.3,google_api_key=config_env.google_api_key)
+# configure Gemini API (assign another chat model here before the agent is built to replace it)
+llm = None
+
+
+def get_llm():
+    global llm
+    if llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.3,google_api_key=config_env.google_api_key)
+    return llm
 
 # Update Tool definitions
 tools = [
     StructuredTool.from_function( # <-- CHANGE 1
         name="create_task",
-        func=create_task,
+        coroutine=create_task,
         description="Create a new task with a title, description, priority, and optional due date.",
         args_schema=CreateTaskInput
     ),
     StructuredTool.from_function( # <-- CHANGE 2
         name="update_task", 
-        func=update_task, 
-        description="Update task fields", 
+        coroutine=update_task,
+        description=(
+            "Update task fields. Pass the task's version from the list/search result so a change made in the "
+            "meantime is not overwritten; on a conflict, look the task up again before retrying."
+        ),
         args_schema=UpdateTaskInput
     ),
     StructuredTool.from_function( # <-- CHANGE 3
         name="delete_task", 
-        func=delete_task, 
+        coroutine=delete_task,
         description="Delete a task by ID", 
         args_schema=DeleteTaskInput
     ),
-    # For list_tasks, which takes no arguments, you can still use StructuredTool for consistency, 
-    # but the simple Tool might also work. StructuredTool.from_function is safer.
     StructuredTool.from_function( # <-- CHANGE 4
         name="list_tasks", 
-        func=list_tasks, 
-        description="List all existing tasks"
-        # No args_schema needed if list_tasks() takes no arguments
+        coroutine=list_tasks,
+        description=(
+            "List existing tasks one page at a time. If has_more is true, call again with next_cursor to get the next page. "
+            "When there are more tasks than fit in one page, the first page also has a summary with counts by status and "
+            "priority; use it for 'how many' questions instead of paging through everything."
+        ),
+        args_schema=ListTasksInput
     ),
     StructuredTool.from_function(
         name="filter_tasks",
-        func=filter_tasks,
-        description="Filter tasks by status, priority, or due_date (YYYY-MM-DD)",
-        args_schema=FilterTasksInput
+        coroutine=filter_tasks,
+        description=(
+            "Filter tasks by status/priority (single value or lists), exact due_date, due date range "
+            "(due_after/due_before, YYYY-MM-DD), overdue, or created/updated since a date. "
+            "Paged like list_tasks (next_cursor, summary on the first page). Old done tasks are archived and only "
+            "found with include_archived=true."
+        ),
+        args_schema=FilterTasksPageInput
+    ),
+    StructuredTool.from_function(
+        name="search_tasks",
+        coroutine=search_tasks,
+        description=(
+            "Find tasks by what they are about: searches titles and descriptions and returns the best matches first "
+            "(tolerates typos). Use this instead of listing tasks when the user describes a task by its content. "
+            "Paged with next_cursor. Set include_archived=true to also search old, archived done tasks."
+        ),
+        args_schema=SearchTasksInput
+    ),
+    StructuredTool.from_function(
+        name="task_stats",
+        coroutine=task_stats,
+        description=(
+            "Count tasks: totals by status and by priority, overdue tasks and pending tasks due this week. "
+            "Use it for any 'how many' question instead of listing tasks."
+        ),
+        args_schema=TaskStatsInput
+    ),
+    # Bulk tools: prefer these over repeated single calls when several tasks change at once
+    StructuredTool.from_function(
+        name="bulk_create_tasks",
+        coroutine=bulk_create_tasks,
+        description="Create several tasks in one call.",
+        args_schema=BulkCreateTasksInput
+    ),
+    StructuredTool.from_function(
+        name="bulk_update_tasks",
+        coroutine=bulk_update_tasks,
+        description=(
+            "Update several tasks in one call. Give task_ids plus the fields to set on all of them "
+            "(e.g. status='done'), and/or a list of individual updates in tasks."
+        ),
+        args_schema=BulkUpdateTasksInput
+    ),
+    StructuredTool.from_function(
+        name="bulk_delete_tasks",
+        coroutine=bulk_delete_tasks,
+        description="Delete several tasks by ID in one call.",
+        args_schema=BulkDeleteTasksInput
     ),
 ]
 
-agent_app = create_react_agent(
-    llm,
-    tools=tools,
-    prompt=prompt,
-    checkpointer=memory,
-)
\ No newline at end of file
+def build_agent(checkpointer):
+    from langgraph.prebuilt import create_react_agent
+    from services.task.tool_executor import TaskToolNode
+
+    # The system prompt is prepended to the (trimmed) history on every model call.
+    # "v1" hands all tool calls of a step to one TaskToolNode, which runs them concurrently
+    # and returns their results in call order (v2 would fan them out as separate graph tasks).
+    graph = create_react_agent(
+        get_llm(),
+        tools=TaskToolNode(tools),
+        prompt=system_prompt_text,
+        pre_model_hook=trim_history,
+        checkpointer=checkpointer,
+        version="v1",
+    )
+    # Model latency/tokens and tool timings for /metrics
+    return graph.with_config({"callbacks": [telemetry_callback]})
+
+
+# Memory (bounded, per worker) until the configured checkpointer is opened at startup
+memory = None
+agent_app = None
+agent_build_seconds: float | None = None
+_build_lock = asyncio.Lock()
+
+
+async def ensure_agent():
+    """Return the agent, building it on first use; concurrent callers wait for the same build."""
+    global memory, agent_app, agent_build_seconds
+    if agent_app is not None:
+        return agent_app
+    async with _build_lock:
+        if agent_app is None:
+            if memory is None:
+                memory = new_memory_saver()
+            started = time.perf_counter()
+            # Importing the model client and compiling the graph is blocking work; keep the loop free
+            agent_app = await asyncio.to_thread(build_agent, memory)
+            agent_build_seconds = time.perf_counter() - started
+            logger.info(f"🤖 Agent ready in {agent_build_seconds:.2f}s")
+    return agent_app
+
+
+def use_checkpointer(checkpointer):
+    """Put the agent on top of another checkpointer (e.g. the durable Postgres one); rebuilt on next use."""
+    global memory, agent_app
+    memory = checkpointer
+    agent_app = None
+
+
+def get_agent():
+    """The built agent, or None if it has not been built yet (see ensure_agent)."""
+    return agent_app
+
+
+def get_checkpointer():
+    return memory
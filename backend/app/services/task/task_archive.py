@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.task import Task
+from services.task.task_crud import crud_task, task_query_cache
+from services.task.task_events import task_event_hub
+from utils.db_connection import async_session_scope
+from utils.db_pool import pool_stats
+from utils.config_env import config_env
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Hot/cold split of the task table: done tasks untouched for TASK_ARCHIVE_AFTER_DAYS move from
+# `tasks` to `tasks_archive`, so the live table and its indexes only hold pending and recently
+# finished work. A move is a real DELETE from `tasks` (see AsyncCRUDBase.archive): the triggers log
+# it and take it out of the counters, and clients drop the tasks from their lists. Archived tasks
+# are still found by filter/search/export with include_archived.
+#
+# Throttled so archiving never competes with foreground traffic:
+#   - at most TASK_ARCHIVE_BATCH_SIZE tasks per (short) transaction; tasks locked by a request are skipped
+#   - a batch that would wait on a lock gives up (lock_timeout) and is retried on the next run
+#   - TASK_ARCHIVE_BATCH_PAUSE seconds between batches, and no batch while the connection pool is fully in use
+#
+# Runs every TASK_ARCHIVE_INTERVAL seconds in the app, or once by hand (e.g. for the first backlog):
+#
+#   python -m services.task.task_archive --older-than-days 30
+
+LOCK_TIMEOUT = "500ms"
+# Deleted ids are published in chunks that fit a NOTIFY payload
+PUBLISH_CHUNK = 500
+
+archived_tasks = metrics.counter("task_archived_total", "Done tasks moved to tasks_archive.")
+archive_batch_duration = metrics.histogram(
+    "task_archive_batch_duration_seconds", "Duration of one archiving transaction.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def _pool_busy() -> bool:
+    stats = pool_stats().get("async")
+    return stats is not None and stats["checked_out"] >= stats["size"]
+
+
+async def archive_done_tasks(db: AsyncSession, older_than: timedelta, batch_size: int) -> list:
+    """Move one batch of done tasks last changed before now - `older_than`; returns their (owner_id, id)."""
+    await db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    # Inline 'done' so the predicate matches the partial index ix_tasks_done_updated_at
+    done = literal("done", literal_execute=True)
+    return await crud_task.archive(
+        db, [Task.status == done, Task.updated_at < datetime.utcnow() - older_than], limit=batch_size,
+        order_by=Task.updated_at, keys=[Task.owner_id, Task.id], returning=[Task.owner_id, Task.id],
+    )
+
+
+async def _announce(rows: list):
+    await task_query_cache.invalidate()
+    by_owner: dict[str, list[int]] = {}
+    for owner_id, task_id in rows:
+        by_owner.setdefault(owner_id, []).append(task_id)
+    for owner_id, ids in by_owner.items():
+        for start in range(0, len(ids), PUBLISH_CHUNK):
+            await task_event_hub.publish("delete", owner_id, ids=ids[start:start + PUBLISH_CHUNK])
+
+
+async def archive_run(older_than: Optional[timedelta] = None, batch_size: Optional[int] = None,
+                      pause: Optional[float] = None) -> int:
+    """Archive every eligible task, one batch at a time; returns how many were moved."""
+    older_than = timedelta(days=config_env.task_archive_after_days) if older_than is None else older_than
+    batch_size = batch_size or config_env.task_archive_batch_size
+    pause = config_env.task_archive_batch_pause if pause is None else pause
+    moved = 0
+    while True:
+        while _pool_busy():
+            await asyncio.sleep(max(pause, 0.1))
+        started = time.perf_counter()
+        async with async_session_scope() as db:
+            rows = await archive_done_tasks(db, older_than, batch_size)
+        archive_batch_duration.observe(time.perf_counter() - started)
+        if rows:
+            archived_tasks.inc(len(rows))
+            await _announce(rows)
+            moved += len(rows)
+        if len(rows) < batch_size:
+            return moved
+        await asyncio.sleep(pause)
+
+
+async def task_archiver():
+    """Background task that archives done tasks every TASK_ARCHIVE_INTERVAL seconds (off when TASK_ARCHIVE_AFTER_DAYS is 0)."""
+    if config_env.task_archive_after_days <= 0:
+        return
+    while True:
+        await asyncio.sleep(config_env.task_archive_interval)
+        try:
+            moved = await archive_run()
+            if moved:
+                logger.info(f"🗄️ Archived {moved} done task(s) older than {config_env.task_archive_after_days} days.")
+        except Exception as e:
+            # Includes a lock_timeout: whatever is left is picked up on the next run
+            logger.warning(f"Task archiving stopped early: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move done tasks older than the given age to tasks_archive.")
+    parser.add_argument("--older-than-days", type=float, help="default: TASK_ARCHIVE_AFTER_DAYS")
+    parser.add_argument("--batch-size", type=int, help="default: TASK_ARCHIVE_BATCH_SIZE")
+    parser.add_argument("--pause", type=float, help="seconds between batches (default: TASK_ARCHIVE_BATCH_PAUSE)")
+    args = parser.parse_args()
+    older_than = timedelta(days=args.older_than_days) if args.older_than_days is not None else None
+    moved = asyncio.run(archive_run(older_than, args.batch_size, args.pause))
+    logger.info(f"✅ Archived {moved} done task(s).")
@@ -1,124 +1,638 @@
-from models.task import Task
-from utils.db_connection import SessionLocal as get_db
-from utils.crud import CRUDBase
-from schemas.task import CreateTaskInput, UpdateTaskInput, DeleteTaskInput, FilterTasksInput
-from datetime import datetime
+from models.task import Task, TaskArchive, TaskWithArchive, TaskChange, TaskCount, SEARCH_CONFIG, SEARCH_DOCUMENT_SQL
+from sqlalchemy import case, and_, or_, literal, literal_column, select, func, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.crud import AsyncCRUDBase, VersionConflict
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+from utils.cache import make_query_cache, cached
+from services.task.task_events import task_event_hub
+from utils.db_connection import async_session_scope
+from utils.config_env import config_env
+from utils.logger import logger
+import asyncio
+import hashlib
+from schemas.task import (
+    CreateTaskInput, UpdateTaskInput, DeleteTaskInput, FilterTasksInput, TaskSortBy, SearchMatch,
+    BulkCreateTasksInput, BulkUpdateTasksInput, BulkDeleteTasksInput,
+)
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
 
-# Initialize CRUD instance
-crud_task = CRUDBase(Task)
+# Initialize CRUD instance. Services act for one owner at a time and only ever use crud_task.scoped(owner_id=...)
+crud_task = AsyncCRUDBase(Task, archive_model=TaskArchive)
+# Read-only: live and archived tasks together, for filters/searches with include_archived
+crud_task_with_archive = AsyncCRUDBase(TaskWithArchive)
 
-# --- Create a new task ---
-def create_task(task_data: CreateTaskInput):
-    db = get_db()
+# list/filter results are cached until the next write; every write path below calls invalidate()
+task_query_cache = make_query_cache("tasks")
+
+
+def _is_cacheable(result) -> bool:
+    return not (isinstance(result, dict) and "error" in result)
+
+
+async def _invalidate_on_remote_change(delta: dict):
+    await task_query_cache.invalidate()
+
+# Writes made by other workers arrive through the event broker
+task_event_hub.add_listener(_invalidate_on_remote_change)
+
+
+# Sort expressions for cursor pagination; priority sorts by rank (high first), not alphabetically
+def _sort_columns(model) -> dict:
+    return {
+        "id": model.id,
+        "due_date": model.due_date,
+        "priority": case({"high": 0, "medium": 1, "low": 2}, value=model.priority, else_=3),
+        "created_at": model.created_at,
+    }
+
+
+SORT_COLUMNS = _sort_columns(Task)
+ARCHIVE_SORT_COLUMNS = _sort_columns(TaskWithArchive)
+
+
+# Columns read by list/filter/search (projection queries: plain rows, no ORM instances) and
+# returned by every write (INSERT/UPDATE ... RETURNING) so change-feed deltas carry the row data
+TASK_DICT_COLUMNS = [Task.id, Task.title, Task.description, Task.priority, Task.status, Task.due_date, Task.version]
+# The same for include_archived reads, plus whether each row came from the archive
+ARCHIVE_DICT_COLUMNS = [getattr(TaskWithArchive, column.key) for column in TASK_DICT_COLUMNS] + [TaskWithArchive.archived]
+
+
+def _task_source(include_archived: bool):
+    """(model, crud, sort columns, dict columns) to read live tasks, or live and archived ones."""
+    if include_archived:
+        return TaskWithArchive, crud_task_with_archive, ARCHIVE_SORT_COLUMNS, ARCHIVE_DICT_COLUMNS
+    return Task, crud_task, SORT_COLUMNS, TASK_DICT_COLUMNS
 
+
+def _task_to_dict(t) -> dict:
+    # A Task instance or a row of TASK_DICT_COLUMNS (or ARCHIVE_DICT_COLUMNS)
+    task = {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description,
+        "priority": t.priority,
+        "status": t.status,
+        "due_date": t.due_date,
+        "version": t.version,
+    }
+    # Only archived tasks carry the flag
+    if getattr(t, "archived", False):
+        task["archived"] = True
+    return task
+
+
+def _normalize_status(value: str) -> Optional[str]:
+    normalized = value.strip().lower()
+    if normalized in {"done", "completed", "complete"}:
+        return "done"
+    if normalized in {"pending", "todo", "to-do", "not done"}:
+        return "pending"
+    return None
+
+
+def _prepare_new_task(task_data: CreateTaskInput):
+    """Validate a CreateTaskInput and return (column values, error)."""
     parsed_due_date = None
     if task_data.due_date:
         try:
             parsed_due_date = datetime.strptime(task_data.due_date, "%Y-%m-%d")
         except ValueError:
-            return {"error": f"❌ Invalid date format '{task_data.due_date}'. Use YYYY-MM-DD."}
+            return None, {"error": f"❌ Invalid date format '{task_data.due_date}'. Use YYYY-MM-DD."}
 
     task_dict = task_data.model_dump()
     task_dict["due_date"] = parsed_due_date
+    return task_dict, None
 
-    db_obj = crud_task.create(db, obj_in=CreateTaskInput(**task_dict))
-    return {"message": f"✅ Task '{db_obj.title}' created successfully.", "task_id": db_obj.id}
-
-
-# --- List all tasks ---
-def list_tasks(page: int = 1, page_size: int = 100):
-    db = get_db()
-    tasks = crud_task.get_all(db, page=page, pagesize=page_size)
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "priority": t.priority,
-            "status": t.status,
-            "due_date": t.due_date,
-        }
-        for t in tasks
-    ]
-
-
-# --- Update a task ---
-def update_task(task_data: UpdateTaskInput):
-    db = get_db()
-    task_id = task_data.task_id
 
+def _prepare_task_changes(task_data: UpdateTaskInput):
+    """Validate an UpdateTaskInput and return (changed column values, error)."""
     update_dict = task_data.model_dump(exclude_unset=True)
     update_dict.pop("task_id", None)
+    update_dict.pop("version", None)
 
     # Normalize status if provided (accepts 'done'/'pending' as strings; could be extended)
     if "status" in update_dict and update_dict["status"] is not None:
-        normalized = str(update_dict["status"]).strip().lower()
-        if normalized in {"done", "completed", "complete"}:
-            update_dict["status"] = "done"
-        elif normalized in {"pending", "todo", "to-do", "not done"}:
-            update_dict["status"] = "pending"
-        else:
-            return {"error": f"❌ Invalid status '{update_dict['status']}'. Use 'pending' or 'done'."}
+        normalized = _normalize_status(str(update_dict["status"]))
+        if normalized is None:
+            return None, {"error": f"❌ Invalid status '{update_dict['status']}'. Use 'pending' or 'done'."}
+        update_dict["status"] = normalized
 
     if "due_date" in update_dict and update_dict["due_date"]:
         try:
             update_dict["due_date"] = datetime.strptime(update_dict["due_date"], "%Y-%m-%d")
         except ValueError:
-            return {"error": f"❌ Invalid date format '{update_dict['due_date']}'. Use YYYY-MM-DD."}
+            return None, {"error": f"❌ Invalid date format '{update_dict['due_date']}'. Use YYYY-MM-DD."}
 
-    updated_task = crud_task.update(db, id=task_id, obj_in=UpdateTaskInput(**update_dict))
-    if not updated_task:
+    # None means "leave unchanged", matching AsyncCRUDBase.update
+    return {key: value for key, value in update_dict.items() if value is not None}, None
+
+
+async def _get_task_page(db: AsyncSession, owner_id: str, filters: Optional[dict], cursor: Optional[str],
+                         sort_by: TaskSortBy, descending: bool, page_size: int, conditions: Optional[list] = None,
+                         include_archived: bool = False):
+    _, crud, sort_columns, columns = _task_source(include_archived)
+    after = None
+    if cursor:
+        # The cursor carries its own sort order, so a page can be continued with the cursor alone
+        try:
+            sort_by, descending, after = decode_cursor(cursor)
+        except InvalidCursor:
+            return {"error": "❌ Invalid cursor. Start again without a cursor."}
+        if sort_by not in SORT_COLUMNS:
+            return {"error": "❌ Invalid cursor. Start again without a cursor."}
+
+    tasks, last = await crud.scoped(owner_id=owner_id).get_page(
+        db, sort_column=sort_columns[sort_by], after=after, limit=page_size, filters=filters,
+        descending=descending, conditions=conditions, columns=columns,
+    )
+    return {
+        "items": [_task_to_dict(t) for t in tasks],
+        "next_cursor": encode_cursor(sort_by, descending, last) if last else None,
+        "has_more": last is not None,
+    }
+
+
+# --- Create a new task ---
+async def create_task(db: AsyncSession, owner_id: str, task_data: CreateTaskInput):
+    task_dict, error = _prepare_new_task(task_data)
+    if error:
+        return error
+
+    # One INSERT ... RETURNING round trip; nothing is refreshed after the commit
+    row = await crud_task.scoped(owner_id=owner_id).create(db, obj_in=task_dict, returning=TASK_DICT_COLUMNS)
+    await task_query_cache.invalidate()
+    await task_event_hub.publish("create", owner_id, tasks=[_task_to_dict(row)])
+    return {"message": f"✅ Task '{row.title}' created successfully.", "task_id": row.id, "version": row.version}
+
+
+# --- List all tasks ---
+# Passing a cursor or sort_by switches to keyset pagination and returns {"items", "next_cursor", "has_more"};
+# otherwise page/page_size keep the original offset behaviour and return a plain list.
+# `change_version` is only part of the cache key: /tasks/list passes the version its ETag names, so
+# a body cached before another worker's write (not yet invalidated here) is never served under the
+# newer ETag.
+@cached(task_query_cache, should_cache=_is_cacheable)
+async def list_tasks(db: AsyncSession, owner_id: str, page: int = 1, page_size: int = 100, cursor: Optional[str] = None,
+                     sort_by: Optional[TaskSortBy] = None, descending: bool = False, change_version: Optional[int] = None):
+    if cursor or sort_by:
+        return await _get_task_page(db, owner_id, None, cursor, sort_by or "id", descending, page_size)
+    tasks = await crud_task.scoped(owner_id=owner_id).get_all(db, page=page, pagesize=page_size, columns=TASK_DICT_COLUMNS)
+    return [_task_to_dict(t) for t in tasks]
+
+
+# --- Update a task ---
+def _conflict(task_id: int, current_version: int) -> dict:
+    return {
+        "error": f"❌ Task {task_id} was changed by someone else (now version {current_version}). Reload it and try again.",
+        "conflict": True,
+        "version": current_version,
+    }
+
+
+async def update_task(db: AsyncSession, owner_id: str, task_data: UpdateTaskInput):
+    update_dict, error = _prepare_task_changes(task_data)
+    if error:
+        return error
+
+    if not update_dict:
+        return {"error": "❌ Nothing to update."}
+
+    # One UPDATE ... RETURNING round trip, conditional on the version the caller read (if given)
+    try:
+        row = await crud_task.scoped(owner_id=owner_id).update(db, id=task_data.task_id, obj_in=update_dict, returning=TASK_DICT_COLUMNS,
+                                     expected_version=task_data.version)
+    except VersionConflict as e:
+        return _conflict(task_data.task_id, e.current_version)
+    if not row:
         return {"error": "❌ Task not found."}
+    await task_query_cache.invalidate()
+    await task_event_hub.publish("update", owner_id, tasks=[_task_to_dict(row)])
 
-    return {"message": f"✅ Task '{updated_task.title}' updated successfully."}
+    return {"message": f"✅ Task '{row.title}' updated successfully.", "version": row.version}
 
 
 # --- Delete a task ---
-def delete_task(task_data: DeleteTaskInput):
-    db = get_db()
+async def delete_task(db: AsyncSession, owner_id: str, task_data: DeleteTaskInput):
     task_id = task_data.task_id
 
-    deleted_task = crud_task.delete(db, id=task_id)
+    deleted_task = await crud_task.scoped(owner_id=owner_id).delete(db, id=task_id, returning=[Task.title],
+                                                                   soft=config_env.task_soft_delete)
     if not deleted_task:
         return {"error": "❌ Task not found."}
+    await task_query_cache.invalidate()
+    await task_event_hub.publish("delete", owner_id, ids=[task_id])
 
     return {"message": f"🗑️ Task '{deleted_task.title}' deleted successfully."}
 
 
+# --- Bulk create tasks ---
+# Bulk operations validate every item first, run the valid ones in one transaction,
+# and report a result per item: {"index", "task_id"} or {"index", "error"}.
+async def bulk_create_tasks(db: AsyncSession, owner_id: str, data: BulkCreateTasksInput):
+    results = []
+    valid = []
+    for index, task_data in enumerate(data.tasks):
+        task_dict, error = _prepare_new_task(task_data)
+        if error:
+            results.append({"index": index, **error})
+        else:
+            valid.append((index, task_dict))
+
+    rows = await crud_task.scoped(owner_id=owner_id).bulk_create(db, [task_dict for _, task_dict in valid], returning=TASK_DICT_COLUMNS)
+    await task_query_cache.invalidate()
+    await task_event_hub.publish("create", owner_id, tasks=[_task_to_dict(row) for row in rows])
+    results.extend({"index": index, "task_id": row.id} for (index, _), row in zip(valid, rows))
+    results.sort(key=lambda r: r["index"])
+
+    created = len(rows)
+    return {
+        "message": f"✅ {created} task(s) created." + (f" {len(results) - created} failed." if len(results) > created else ""),
+        "created": created,
+        "results": results,
+    }
+
+
+# --- Bulk update tasks ---
+async def bulk_update_tasks(db: AsyncSession, owner_id: str, data: BulkUpdateTasksInput):
+    shared = data.model_dump(include={"title", "description", "priority", "due_date", "status"}, exclude_none=True)
+    items = [UpdateTaskInput(task_id=task_id, **shared) for task_id in data.task_ids] + list(data.tasks)
+
+    results = []
+    # Items with identical changes (and expected version) share one UPDATE ... WHERE id IN (...) statement
+    groups: dict[tuple, list[int]] = {}
+    pending = []  # (index, item, group key)
+    for index, task_data in enumerate(items):
+        changes, error = _prepare_task_changes(task_data)
+        if not error and not changes:
+            error = {"error": "❌ Nothing to update."}
+        if error:
+            results.append({"index": index, "task_id": task_data.task_id, **error})
+            continue
+        key = (tuple(sorted(changes.items())), task_data.version)
+        groups.setdefault(key, []).append(task_data.task_id)
+        pending.append((index, task_data, key))
+
+    tasks = crud_task.scoped(owner_id=owner_id)
+    group_rows = await tasks.bulk_update(
+        db, [(ids, dict(changes), version) for (changes, version), ids in groups.items()], returning=TASK_DICT_COLUMNS
+    )
+    await task_query_cache.invalidate()
+    updated_by_group = {key: {row.id for row in group} for key, group in zip(groups, group_rows)}
+    rows = [row for group in group_rows for row in group]
+    # A task touched by several change groups keeps its last returned row
+    await task_event_hub.publish("update", owner_id, tasks=list({row.id: _task_to_dict(row) for row in rows}.values()))
+    # Versioned items that were not updated either changed meanwhile or do not exist
+    missed = [task_data.task_id for _, task_data, key in pending
+              if task_data.task_id not in updated_by_group[key] and task_data.version is not None]
+    current = dict((await tasks.get_all(db, pagesize=len(missed), filters={"id": missed},
+                                            columns=[Task.id, Task.version])) if missed else [])
+    for index, task_data, key in pending:
+        task_id = task_data.task_id
+        if task_id in updated_by_group[key]:
+            results.append({"index": index, "task_id": task_id})
+        elif task_id in current:
+            results.append({"index": index, "task_id": task_id, **_conflict(task_id, current[task_id])})
+        else:
+            results.append({"index": index, "task_id": task_id, "error": "❌ Task not found."})
+    results.sort(key=lambda r: r["index"])
+
+    updated = sum(1 for r in results if "error" not in r)
+    return {
+        "message": f"✅ {updated} task(s) updated." + (f" {len(results) - updated} failed." if len(results) > updated else ""),
+        "updated": updated,
+        "results": results,
+    }
+
+
+# --- Bulk delete tasks ---
+async def bulk_delete_tasks(db: AsyncSession, owner_id: str, data: BulkDeleteTasksInput):
+    rows = await crud_task.scoped(owner_id=owner_id).bulk_delete(db, list(dict.fromkeys(data.task_ids)),
+                                                                 soft=config_env.task_soft_delete)
+    await task_query_cache.invalidate()
+    deleted_ids = {row.id for row in rows}
+    await task_event_hub.publish("delete", owner_id, ids=sorted(deleted_ids))
+    results = [
+        {"index": index, "task_id": task_id} if task_id in deleted_ids
+        else {"index": index, "task_id": task_id, "error": "❌ Task not found."}
+        for index, task_id in enumerate(data.task_ids)
+    ]
+
+    deleted = len(deleted_ids)
+    return {
+        "message": f"🗑️ {deleted} task(s) deleted." + (f" {len(data.task_ids) - deleted} not found." if len(data.task_ids) > deleted else ""),
+        "deleted": deleted,
+        "results": results,
+    }
+
+
 # --- Filter tasks ---
-def filter_tasks(filters: FilterTasksInput, page: int = 1, page_size: int = 100):
-    db = get_db()
+def _parse_since(value: str) -> datetime:
+    # Accepts YYYY-MM-DD or a full ISO 8601 timestamp; timestamps are stored as naive UTC
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _build_task_filters(filters: FilterTasksInput):
+    """
+    Compile FilterTasksInput into equality/IN filters plus range conditions, all applied in one query,
+    on Task or (include_archived) TaskWithArchive. Returns (filter_dict, conditions, error).
+    """
+    model, _, _, _ = _task_source(filters.include_archived)
     filter_dict = {}
+    conditions = []
 
     if filters.status:
-        normalized = filters.status.strip().lower()
-        if normalized in {"done", "completed", "complete"}:
-            filter_dict["status"] = "done"
-        elif normalized in {"pending", "todo", "to-do", "not done"}:
-            filter_dict["status"] = "pending"
-        else:
-            return {"error": f"❌ Invalid status '{filters.status}'. Use 'pending' or 'done'."}
+        filter_dict["status"] = _normalize_status(filters.status)
+        if filter_dict["status"] is None:
+            return None, None, {"error": f"❌ Invalid status '{filters.status}'. Use 'pending' or 'done'."}
+
+    if filters.statuses:
+        statuses = {_normalize_status(s) for s in filters.statuses}
+        if None in statuses:
+            return None, None, {"error": f"❌ Invalid status in {filters.statuses}. Use 'pending' or 'done'."}
+        conditions.append(model.status.in_(sorted(statuses)))
 
+    # Priorities are matched case-insensitively, the single value and the list alike
     if filters.priority:
-        filter_dict["priority"] = filters.priority
+        filter_dict["priority"] = filters.priority.strip().lower()
+
+    if filters.priorities:
+        conditions.append(model.priority.in_([p.strip().lower() for p in filters.priorities]))
+
+    try:
+        if filters.due_date:
+            filter_dict["due_date"] = datetime.strptime(filters.due_date, "%Y-%m-%d")
+        if filters.due_after:
+            conditions.append(model.due_date >= datetime.strptime(filters.due_after, "%Y-%m-%d"))
+        if filters.due_before:
+            # Inclusive of the whole day
+            day_after = datetime.strptime(filters.due_before, "%Y-%m-%d") + timedelta(days=1)
+            conditions.append(model.due_date < day_after)
+    except ValueError:
+        return None, None, {"error": "❌ Invalid date format. Use YYYY-MM-DD for due dates."}
+
+    try:
+        if filters.created_since:
+            conditions.append(model.created_at >= _parse_since(filters.created_since))
+        if filters.updated_since:
+            conditions.append(model.updated_at >= _parse_since(filters.updated_since))
+    except ValueError:
+        return None, None, {"error": "❌ Invalid date format. Use YYYY-MM-DD or an ISO 8601 timestamp."}
+
+    if filters.overdue is not None:
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Inline 'pending' so the predicate matches the partial index ix_tasks_owner_pending_due_date
+        # even under a generic prepared-statement plan
+        pending = literal("pending", literal_execute=True)
+        if filters.overdue:
+            conditions.append(and_(model.status == pending, model.due_date < today))
+        else:
+            conditions.append(or_(model.status != pending, model.due_date.is_(None), model.due_date >= today))
+
+    return filter_dict, conditions, None
+
+
+@cached(task_query_cache, should_cache=_is_cacheable)
+async def filter_tasks(db: AsyncSession, owner_id: str, filters: FilterTasksInput, page: int = 1, page_size: int = 100,
+                       cursor: Optional[str] = None, sort_by: Optional[TaskSortBy] = None, descending: bool = False):
+    filter_dict, conditions, error = _build_task_filters(filters)
+    if error:
+        return error
+
+    if cursor or sort_by:
+        return await _get_task_page(db, owner_id, filter_dict or None, cursor, sort_by or "id", descending, page_size, conditions,
+                                    include_archived=filters.include_archived)
+    _, crud, _, columns = _task_source(filters.include_archived)
+    tasks = await crud.scoped(owner_id=owner_id).get_all(db, page=page, pagesize=page_size, filters=filter_dict or None, conditions=conditions,
+                                                         columns=columns)
+    return [_task_to_dict(t) for t in tasks]
+
+
+# --- Summaries ---
+# Counts by status and priority over everything a list/filter call matches, so a caller that
+# only sees one page still knows the size and shape of the whole result set
+@cached(task_query_cache, should_cache=_is_cacheable)
+async def summarize_tasks(db: AsyncSession, owner_id: str, filters: Optional[FilterTasksInput] = None):
+    if filters is None:
+        # Unfiltered: read the maintained counters instead of scanning the table
+        stats = await task_stats(db, owner_id)
+        return {key: stats[key] for key in ("total", "by_status", "by_priority")}
+
+    filter_dict, conditions, error = _build_task_filters(filters)
+    if error:
+        return error
+
+    _, crud, _, _ = _task_source(filters.include_archived)
+    rows = await crud.scoped(owner_id=owner_id).get_grouped_counts(db, ["status", "priority"], filters=filter_dict or None, conditions=conditions)
+    by_status, by_priority = {}, {}
+    for status, priority, count in rows:
+        by_status[status] = by_status.get(status, 0) + count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+    return {"total": sum(by_status.values()), "by_status": by_status, "by_priority": by_priority}
+
+
+# --- Statistics ---
+# Dashboard counts from the task_counts table, which triggers keep current on every write; the
+# query reads one row per (status, priority, due day) of the owner however many tasks there are. Overdue and
+# due-this-week are pending tasks due before today / from today through Sunday (UTC days).
+def _week_end(today: date) -> date:
+    return today + timedelta(days=6 - today.weekday())
+
+
+def _stats_from_rows(rows, today: date) -> dict:
+    week_end = _week_end(today)
+    stats = {"total": 0, "by_status": {}, "by_priority": {}, "overdue": 0, "due_this_week": 0}
+    for status, priority, due_day, count in rows:
+        if not count:
+            continue
+        status, priority = status or None, priority or None
+        stats["total"] += count
+        stats["by_status"][status] = stats["by_status"].get(status, 0) + count
+        stats["by_priority"][priority] = stats["by_priority"].get(priority, 0) + count
+        if status == "pending" and due_day is not None:
+            if due_day < today:
+                stats["overdue"] += count
+            elif due_day <= week_end:
+                stats["due_this_week"] += count
+    return stats
+
+
+@cached(task_query_cache, should_cache=_is_cacheable)
+async def task_stats(db: AsyncSession, owner_id: str, today: Optional[date] = None, exact: bool = False):
+    """
+    Counts by status and priority, plus overdue and due-this-week. `exact` recomputes them from
+    the tasks table with one grouped query (O(tasks)); use it to check the counters.
+    """
+    today = today or datetime.utcnow().date()
+    week_end = _week_end(today)
+    # Bucket the due days in SQL so at most three rows come back per status/priority
+    if exact:
+        day = func.coalesce(func.date(Task.due_date), literal(date.max))
+        source, key_columns = Task, [Task.status, Task.priority]
+        count = func.count()
+        owned = Task.owner_id == owner_id
+    else:
+        day = TaskCount.due_day
+        source, key_columns = TaskCount, [TaskCount.status, TaskCount.priority]
+        count = func.sum(TaskCount.count)
+        owned = TaskCount.owner_id == owner_id
+    bucket = case((day < today, literal(today - timedelta(days=1))), (day <= week_end, literal(today)), else_=literal(date.max))
+    rows = (await db.execute(
+        select(*key_columns, bucket.label("bucket"), count.label("count")).select_from(source)
+        .where(owned).group_by(*key_columns, bucket)
+    )).all()
+    # Days with 'infinity' (no due date) and days after this week are not counted as upcoming
+    rows = [(status, priority, None if bucket == date.max else bucket, int(n)) for status, priority, bucket, n in rows]
+    return {**_stats_from_rows(rows, today), "as_of": today.isoformat(), "source": "tasks" if exact else "counters"}
 
-    if filters.due_date:
+
+# --- Search ---
+# "fulltext" matches whole words (stemmed) against the search_vector GIN index, ranked with title
+# hits first; "fuzzy" matches misspelled or partial words through the pg_trgm index. "auto" tries
+# fulltext and falls back to fuzzy when the first page finds nothing. The cursor records which
+# one produced the page, so later pages continue the same ranking.
+SEARCH_MODES = ("fulltext", "fuzzy")
+_search_document = literal_column(SEARCH_DOCUMENT_SQL)
+_trigram_available: Optional[bool] = None
+
+
+async def _has_trigram(db: AsyncSession) -> bool:
+    global _trigram_available
+    if _trigram_available is None:
+        found = await db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+        _trigram_available = found.first() is not None
+    return _trigram_available
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def _search_expressions(db: AsyncSession, mode: str, query: str, model=Task):
+    """(rank expression, match condition) for one search mode, on Task or TaskWithArchive."""
+    if mode == "fulltext":
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), query)
+        return func.ts_rank_cd(model.search_vector, ts_query), model.search_vector.op("@@")(ts_query)
+    substring = _search_document.ilike(_like_pattern(query), escape="\\")
+    if await _has_trigram(db):
+        # word_similarity: how closely the query matches some run of words in the title/description
+        return func.word_similarity(query, _search_document), or_(_search_document.op("%>")(query), substring)
+    # Without pg_trgm: unindexed substring match, earliest match first
+    return -func.strpos(func.lower(_search_document), query.lower()), substring
+
+
+@cached(task_query_cache, should_cache=_is_cacheable)
+async def search_tasks(db: AsyncSession, owner_id: str, query: str, filters: Optional[FilterTasksInput] = None,
+                       cursor: Optional[str] = None, page_size: int = 20, match: SearchMatch = "auto"):
+    query = " ".join(query.split())
+    if not query:
+        return {"error": "❌ Search query is empty."}
+
+    filter_dict, conditions = None, []
+    if filters is not None:
+        filter_dict, conditions, error = _build_task_filters(filters)
+        if error:
+            return error
+    model, crud, _, columns = _task_source(filters is not None and filters.include_archived)
+
+    after = None
+    modes = list(SEARCH_MODES) if match == "auto" else [match]
+    if cursor:
         try:
-            # Equality filter in this minimal version
-            datetime.strptime(filters.due_date, "%Y-%m-%d")
-            filter_dict["due_date"] = filters.due_date
-        except ValueError:
-            return {"error": f"❌ Invalid date format '{filters.due_date}'. Use YYYY-MM-DD."}
-
-    tasks = crud_task.get_all(db, page=page, pagesize=page_size, filters=filter_dict or None)
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "priority": t.priority,
-            "status": t.status,
-            "due_date": t.due_date,
-        }
-        for t in tasks
-    ]
+            mode, _, after = decode_cursor(cursor)
+        except InvalidCursor:
+            return {"error": "❌ Invalid cursor. Start again without a cursor."}
+        if mode not in SEARCH_MODES:
+            return {"error": "❌ Invalid cursor. Start again without a cursor."}
+        modes = [mode]
+
+    for mode in modes:
+        rank, condition = await _search_expressions(db, mode, query, model)
+        tasks, last = await crud.scoped(owner_id=owner_id).get_page(
+            db, sort_column=rank, after=after, limit=page_size, filters=filter_dict or None,
+            descending=True, conditions=[condition, *conditions], columns=columns,
+        )
+        if tasks:
+            break
+    return {
+        "items": [_task_to_dict(t) for t in tasks],
+        "next_cursor": encode_cursor(mode, True, last) if last else None,
+        "has_more": last is not None,
+        "match": mode,
+    }
+
+
+# --- Change feed ---
+# Every write to `tasks` is logged to task_changes by triggers; the latest change id is the
+# version behind the /tasks/list ETag and the /tasks/changes delta endpoint. Change ids are shared
+# by all owners, so an owner's versions increase but are not consecutive.
+async def get_change_version(db: AsyncSession, owner_id: str) -> int:
+    result = await db.execute(select(func.coalesce(func.max(TaskChange.id), 0)).where(TaskChange.owner_id == owner_id))
+    return result.scalar_one()
+
+
+def list_etag(owner_id: str, version: int, query_string: str) -> str:
+    # The same version serves different bodies for different pages/sorts, so the query is part of the tag;
+    # so is the owner: owners with no retained changes all share version 0
+    query_hash = hashlib.sha1(f"{owner_id}\n{query_string}".encode()).hexdigest()[:12]
+    return f'W/"{version}-{query_hash}"'
+
+
+async def list_changes(db: AsyncSession, owner_id: str, since: int = 0, limit: int = 500):
+    """
+    Tasks created or updated after version `since`, plus the IDs of tasks deleted since then.
+    Pass the returned `version` as `since` on the next call. `reset` means `since` is older than
+    the retained log and the client must reload the full list.
+    """
+    latest = await get_change_version(db, owner_id)
+    # Pruning is by age across all owners, so the retained log starts at the global oldest entry
+    oldest = (await db.execute(select(func.min(TaskChange.id)))).scalar_one()
+    if oldest is not None and since < oldest - 1:
+        return {"version": latest, "reset": True, "changed": [], "deleted": [], "has_more": False}
+
+    # One entry per task, ordered by its latest change, bounded by `latest` so the page and version agree
+    last_change = func.max(TaskChange.id).label("version")
+    rows = (await db.execute(
+        select(TaskChange.task_id, last_change)
+        .where(TaskChange.owner_id == owner_id, TaskChange.id > since, TaskChange.id <= latest)
+        .group_by(TaskChange.task_id)
+        .order_by(last_change)
+        .limit(limit + 1)
+    )).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    task_ids = [row.task_id for row in rows]
+    tasks = await crud_task.scoped(owner_id=owner_id).get_all(db, pagesize=len(task_ids), filters={"id": task_ids}, columns=TASK_DICT_COLUMNS) if task_ids else []
+    found = {t.id for t in tasks}
+    return {
+        "version": rows[-1].version if has_more else max(latest, since),
+        "reset": False,
+        "changed": [_task_to_dict(t) for t in tasks],
+        # A task that appears in the log but no longer exists was deleted
+        "deleted": [task_id for task_id in task_ids if task_id not in found],
+        "has_more": has_more,
+    }
+
+
+async def prune_task_changes(db: AsyncSession, older_than: timedelta) -> int:
+    result = await db.execute(delete(TaskChange).where(TaskChange.changed_at < datetime.utcnow() - older_than))
+    await db.commit()
+    return result.rowcount
+
+
+async def task_change_pruner(interval: float = 3600):
+    """Background task that trims the change log to the configured retention window."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session_scope() as db:
+                pruned = await prune_task_changes(db, timedelta(days=config_env.task_change_retention_days))
+            if pruned:
+                logger.info(f"Pruned {pruned} task change log entries.")
+        except Exception as e:
+            logger.warning(f"Task change log pruning failed: {e}")
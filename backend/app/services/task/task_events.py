@@ -0,0 +1,268 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+from utils.config_env import config_env
+from utils.db_connection import async_engine
+from utils.logger import logger
+
+# Task change feed: services publish deltas after each write, a broker fans them out to every
+# worker (Postgres LISTEN/NOTIFY, or in-process for a single worker), and the hub coalesces
+# them into frames for each /tasks/stream subscriber. Every delta names the owner of its tasks, and
+# subscribers only receive their own owner's frames.
+
+CHANNEL = "task_events"
+# NOTIFY payloads must stay under 8000 bytes; larger deltas are sent as IDs only
+MAX_NOTIFY_PAYLOAD = 7500
+# Deltas waiting for the Postgres publisher, and how many it sends per round trip
+MAX_QUEUED_EVENTS = 1000
+PUBLISH_BATCH = 100
+
+
+def _dumps(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"), default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+
+
+class LocalBroker:
+    """In-process stand-in broker: delivers to this worker only."""
+
+    async def start(self, on_message: Callable[[dict], None]):
+        self._on_message = on_message
+
+    async def publish(self, payload: dict):
+        self._on_message(json.loads(_dumps(payload)))
+
+    async def stop(self):
+        pass
+
+
+class PostgresBroker:
+    """
+    Fans deltas out to every worker via LISTEN/NOTIFY on a dedicated asyncpg connection.
+    Writes only queue their delta; a background publisher sends the queue in batches (one round
+    trip each), so request handlers never wait on the shared connection.
+    """
+
+    def __init__(self, reconnect_delay: float = 2.0, max_queued: int = MAX_QUEUED_EVENTS):
+        self.dsn = async_engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self.reconnect_delay = reconnect_delay
+        self._conn = None
+        self._closing = False
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        # Owners whose deltas did not fit in the queue; their clients are told to reload instead
+        self._overflow: set[str] = set()
+        self._publisher: Optional[asyncio.Task] = None
+
+    async def start(self, on_message: Callable[[dict], None]):
+        self._on_message = on_message
+        await self._connect()
+        self._publisher = asyncio.get_running_loop().create_task(self._publish_loop())
+
+    async def _connect(self):
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(CHANNEL, self._on_notify)
+        self._conn.add_termination_listener(self._on_terminated)
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            self._on_message(json.loads(payload))
+        except ValueError:
+            logger.warning(f"Ignoring malformed task event payload: {payload[:200]}")
+
+    def _on_terminated(self, connection):
+        if not self._closing:
+            logger.warning("Task event listener connection lost; reconnecting.")
+            asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closing:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect()
+                return
+            except Exception as e:
+                logger.warning(f"Task event listener reconnect failed: {e}")
+
+    async def publish(self, payload: dict):
+        try:
+            self._outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            self._overflow.add(payload["owner"])
+
+    async def _publish_loop(self):
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < PUBLISH_BATCH and not self._outbox.empty():
+                batch.append(self._outbox.get_nowait())
+            overflow, self._overflow = self._overflow, set()
+            batch.extend({"op": "resync", "owner": owner_id, "ids": []} for owner_id in overflow)
+            try:
+                await self._send(batch)
+            except Exception as e:
+                # The writes already committed; a lost delta only delays clients until their next resync
+                logger.warning(f"Failed to publish {len(batch)} task event(s): {e}")
+
+    async def _send(self, payloads: list[dict]):
+        messages = []
+        for payload in payloads:
+            data = _dumps(payload)
+            if len(data.encode()) > MAX_NOTIFY_PAYLOAD:
+                data = _dumps({key: value for key, value in payload.items() if key != "tasks"})
+            messages.append((CHANNEL, data))
+        # Only the publisher uses the connection for queries (the listener just receives), so no lock
+        await self._conn.executemany("SELECT pg_notify($1, $2)", messages)
+
+    async def stop(self):
+        self._closing = True
+        if self._publisher is not None:
+            self._publisher.cancel()
+            await asyncio.gather(self._publisher, return_exceptions=True)
+        remaining = []
+        while not self._outbox.empty():
+            remaining.append(self._outbox.get_nowait())
+        if self._conn is not None:
+            if remaining:
+                try:
+                    await self._send(remaining)
+                except Exception as e:
+                    logger.warning(f"Failed to publish {len(remaining)} task event(s) at shutdown: {e}")
+            await self._conn.close()
+
+
+BROKERS = {
+    "local": LocalBroker,
+    "postgres": PostgresBroker,
+}
+
+
+class Subscriber:
+    """A bounded per-client queue. Overflow drops the backlog and asks the client to resync."""
+
+    def __init__(self, owner_id: str, max_frames: int):
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_frames)
+        self.dropped = 0
+
+    def offer(self, frame: dict):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Never block the publisher on a slow consumer: replace the backlog with one resync frame
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait({"type": "resync"})
+
+
+class TaskEventHub:
+    def __init__(self, coalesce_window: float, max_frames: int):
+        self.coalesce_window = coalesce_window
+        self.max_frames = max_frames
+        self.broker = None
+        self.subscribers: set[Subscriber] = set()
+        self._listeners: list[Callable[[dict], Awaitable[Any]]] = []
+        # owner -> id -> (op, task dict or None) accumulated during the current coalescing window
+        self._pending: dict[str, dict[int, tuple[str, Optional[dict]]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Owners whose subscribers reload instead of applying this window's deltas
+        self._resync: set[str] = set()
+
+    async def start(self, broker_name: str):
+        self.broker = BROKERS[broker_name]()
+        await self.broker.start(self._dispatch)
+
+    async def stop(self):
+        if self.broker is not None:
+            await self.broker.stop()
+            self.broker = None
+
+    def add_listener(self, listener: Callable[[dict], Awaitable[Any]]):
+        """Run `listener(delta)` for every delta received from the broker, from any worker."""
+        self._listeners.append(listener)
+
+    def subscribe(self, owner_id: str) -> Subscriber:
+        subscriber = Subscriber(owner_id, self.max_frames)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    # --- Publish hook used by the task services ---
+    async def publish(self, op: str, owner_id: str, tasks: Optional[list[dict]] = None, ids: Optional[list[int]] = None):
+        if self.broker is None:
+            return
+        ids = ids if ids is not None else [t["id"] for t in tasks or []]
+        # "resync" carries no IDs: too many tasks changed (e.g. an import) for a delta to be useful
+        if not ids and op != "resync":
+            return
+        payload = {"op": op, "owner": owner_id, "ids": ids}
+        if tasks:
+            payload["tasks"] = tasks
+        try:
+            # Queued, not sent, by the Postgres broker: the write path never waits on NOTIFY
+            await self.broker.publish(payload)
+        except Exception as e:
+            # The write already committed; a lost delta only delays clients until their next resync
+            logger.warning(f"Failed to publish task event: {e}")
+
+    def _dispatch(self, delta: dict):
+        for listener in self._listeners:
+            asyncio.get_running_loop().create_task(listener(delta))
+
+        tasks = {t["id"]: t for t in delta.get("tasks", [])}
+        op, owner_id = delta.get("op"), delta.get("owner")
+        if op == "resync":
+            self._resync.add(owner_id)
+        pending = self._pending.setdefault(owner_id, {})
+        for task_id in delta.get("ids", []):
+            previous = pending.get(task_id)
+            if op == "update" and previous and previous[0] == "create":
+                # create + update inside one window is still a create, with the latest data
+                pending[task_id] = ("create", tasks.get(task_id) or previous[1])
+            else:
+                pending[task_id] = (op, tasks.get(task_id))
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.coalesce_window, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        resync, self._resync = self._resync, set()
+        if not self.subscribers:
+            return
+        frames = {}
+        for owner_id in resync:
+            # Clients reload the list anyway, which covers every delta of this window
+            frames[owner_id] = {"type": "resync"}
+        for owner_id, changes in pending.items():
+            if owner_id in frames or not changes:
+                continue
+            frame = frames[owner_id] = {"type": "task_delta", "created": [], "updated": [], "deleted": []}
+            for task_id, (op, task) in changes.items():
+                if op == "delete":
+                    frame["deleted"].append(task_id)
+                elif op in ("create", "update"):
+                    # Without row data (large bulk writes) clients fetch the task themselves
+                    frame["created" if op == "create" else "updated"].append(task or {"id": task_id})
+        for subscriber in list(self.subscribers):
+            frame = frames.get(subscriber.owner_id)
+            if frame is not None:
+                subscriber.offer(frame)
+
+    def stats(self) -> dict:
+        return {
+            "broker": type(self.broker).__name__ if self.broker else None,
+            "subscribers": len(self.subscribers),
+            "queued_frames": sum(s.queue.qsize() for s in self.subscribers),
+            "dropped_frames": sum(s.dropped for s in self.subscribers),
+        }
+
+
+task_event_hub = TaskEventHub(
+    coalesce_window=config_env.task_events_coalesce_ms / 1000,
+    max_frames=config_env.task_events_queue_size,
+)
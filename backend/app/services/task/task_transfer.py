@@ -0,0 +1,296 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from asyncpg.exceptions import PostgresError
+from models.task import Task
+from schemas.task import FilterTasksInput, TransferFormat
+from services.task.task_crud import task_query_cache, _build_task_filters, _task_source, TASK_DICT_COLUMNS
+from services.task.task_events import task_event_hub
+from utils.db_connection import async_session_scope
+from utils.config_env import config_env
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Bulk export/import of one owner's tasks. Both directions stream: an export reads through a
+# server-side cursor one batch at a time, an import pipes the request body into Postgres COPY.
+# Neither ever holds the whole data set in memory.
+
+# Columns of an export, and the columns an import accepts (any subset, in any order, with a title;
+# version is ignored, an imported update bumps it like any other)
+TRANSFER_COLUMNS = TASK_DICT_COLUMNS + [Task.created_at, Task.updated_at]
+TRANSFER_FIELDS = [column.key for column in TRANSFER_COLUMNS]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+transfer_rows = metrics.counter("task_transfer_rows_total", "Tasks exported or imported.", ["direction", "format"])
+transfer_duration = metrics.histogram(
+    "task_transfer_duration_seconds", "Duration of task exports and imports.", ["direction", "format"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+
+class TaskImportError(ValueError):
+    """The uploaded file cannot be imported (bad header, malformed line)."""
+
+
+def _log_rate(direction: str, fmt: str, rows: int, seconds: float) -> float:
+    rate = rows / seconds if seconds > 0 else 0.0
+    transfer_rows.inc(rows, direction=direction, format=fmt)
+    transfer_duration.observe(seconds, direction=direction, format=fmt)
+    logger.info(f"{'📤 Exported' if direction == 'export' else '📥 Imported'} {rows} task(s) as {fmt} "
+                f"in {seconds:.2f}s ({rate:.0f} rows/s)")
+    return rate
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+# --- Export ---
+def _encode_ndjson(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(TRANSFER_FIELDS, (_text(v) if isinstance(v, datetime) else v for v in row))),
+                   ensure_ascii=False, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _encode_csv(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(TRANSFER_FIELDS)
+    # None is written as an empty unquoted field, which COPY reads back as NULL
+    writer.writerows([_text(v) for v in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def prepare_export(filters: FilterTasksInput):
+    """Validate the filters before the response starts; returns (filter_dict, conditions, error)."""
+    return _build_task_filters(filters)
+
+
+async def export_tasks(owner_id: str, filter_dict: Optional[dict], conditions: list,
+                       fmt: TransferFormat, include_archived: bool = False) -> AsyncIterator[bytes]:
+    """
+    Every matching task of the owner in id order, one encoded chunk per cursor batch. Opens its own session:
+    the stream outlives the request handler that returns it.
+    """
+    model, crud, _, _ = _task_source(include_archived)
+    columns = [getattr(model, column.key) for column in TRANSFER_COLUMNS]
+    started = time.perf_counter()
+    rows = 0
+    try:
+        async with async_session_scope() as db:
+            # The whole export is one statement; a role-level statement_timeout must not cut it short
+            await db.execute(text("SET LOCAL statement_timeout = 0"))
+            if fmt == "csv":
+                yield _encode_csv([], header=True)
+            async for batch in crud.scoped(owner_id=owner_id).stream(db, filter_dict or None, conditions, columns=columns,
+                                                                     batch_size=config_env.task_export_batch_size):
+                rows += len(batch)
+                yield _encode_csv(batch) if fmt == "csv" else _encode_ndjson(batch)
+    finally:
+        # Also reached when the client disconnects mid-download
+        _log_rate("export", fmt, rows, time.perf_counter() - started)
+
+
+# --- Import ---
+# Rows land in a temporary staging table (all text, nothing rejected by COPY itself), then one
+# INSERT ... ON CONFLICT (owner_id, id) DO UPDATE validates, converts and upserts them into the
+# importing owner's tasks. Rows without an id become new tasks; when an id appears more than once
+# the last row wins; ids of another owner's tasks (live or archived) are skipped; an id of one of the
+# owner's archived tasks brings it back into `tasks` with the imported values. Status values are
+# normalized like _normalize_status; rows without a title or with an unknown status, a non-numeric
+# id or a malformed or nonexistent date (e.g. 2024-02-30) are counted as rejected. Dates are checked
+# with pg_input_is_valid (Postgres 16+) so a bad one rejects its row instead of failing the cast below.
+STAGING_TABLE = "task_import"
+
+CREATE_STAGING_SQL = f"""
+CREATE TEMPORARY TABLE {STAGING_TABLE} (
+    line bigserial,
+    {", ".join(f"{field} text" for field in TRANSFER_FIELDS)}
+) ON COMMIT DROP
+"""
+
+_TIMESTAMP = r"'^\d{4}-\d{2}-\d{2}([ T][0-9:.]+)?$'"
+
+
+def _valid_timestamp(column: str) -> str:
+    return f"({column} IS NULL OR ({column} ~ {_TIMESTAMP} AND pg_input_is_valid({column}, 'timestamp')))"
+
+
+UPSERT_SQL = f"""
+WITH checked AS (
+    SELECT line,
+           nullif(btrim(id), '') AS id,
+           nullif(title, '') AS title,
+           description,
+           lower(coalesce(nullif(btrim(priority), ''), 'medium')) AS priority,
+           CASE lower(coalesce(nullif(btrim(status), ''), 'pending'))
+               WHEN 'done' THEN 'done' WHEN 'completed' THEN 'done' WHEN 'complete' THEN 'done'
+               WHEN 'pending' THEN 'pending' WHEN 'todo' THEN 'pending' WHEN 'to-do' THEN 'pending'
+               WHEN 'not done' THEN 'pending'
+           END AS status,
+           nullif(btrim(due_date), '') AS due_date,
+           nullif(btrim(created_at), '') AS created_at,
+           nullif(btrim(updated_at), '') AS updated_at
+    FROM {STAGING_TABLE}
+),
+valid AS (
+    SELECT DISTINCT ON (coalesce(id::bigint, -line)) *
+    FROM checked
+    WHERE title IS NOT NULL AND status IS NOT NULL
+      AND (id IS NULL OR id ~ '^[0-9]{{1,9}}$')
+      AND {_valid_timestamp("due_date")}
+      AND {_valid_timestamp("created_at")}
+      AND {_valid_timestamp("updated_at")}
+    ORDER BY coalesce(id::bigint, -line), line DESC
+),
+restored AS (
+    DELETE FROM tasks_archive archived USING valid
+    WHERE archived.id = valid.id::int AND archived.owner_id = CAST(:owner_id AS text)
+),
+upserted AS (
+    INSERT INTO tasks (id, owner_id, title, description, priority, status, due_date, created_at, updated_at)
+    SELECT coalesce(id::int, nextval(pg_get_serial_sequence('tasks', 'id'))), CAST(:owner_id AS text), title, description,
+           priority, status, due_date::timestamp,
+           coalesce(created_at::timestamp, now() AT TIME ZONE 'utc'),
+           coalesce(updated_at::timestamp, now() AT TIME ZONE 'utc')
+    FROM valid
+    WHERE id IS NULL OR (
+        NOT EXISTS (SELECT 1 FROM tasks other WHERE other.id = valid.id::int AND other.owner_id <> CAST(:owner_id AS text))
+        AND NOT EXISTS (SELECT 1 FROM tasks_archive other WHERE other.id = valid.id::int AND other.owner_id <> CAST(:owner_id AS text))
+    )
+    ON CONFLICT (owner_id, id) DO UPDATE SET
+        title = excluded.title, description = excluded.description, priority = excluded.priority,
+        status = excluded.status, due_date = excluded.due_date, updated_at = excluded.updated_at,
+        version = tasks.version + 1
+    -- New rows start at version 1, updated ones are bumped past it (xmax is not available on partitioned tables)
+    RETURNING (version = 1) AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted) AS created, count(*) FILTER (WHERE NOT inserted) AS updated
+FROM upserted
+"""
+
+# Imported ids may run ahead of the id sequence; move it past them before the upsert so rows
+# without an id never draw one that is also imported (nextval in the check costs one id, harmless)
+SYNC_SEQUENCE_SQL = f"""
+SELECT setval(pg_get_serial_sequence('tasks', 'id'), top)
+FROM (
+    SELECT greatest(
+        (SELECT max(id) FROM tasks),
+        (SELECT max(btrim(id)::int) FROM {STAGING_TABLE} WHERE btrim(id) ~ '^[0-9]{{1,9}}$')
+    ) AS top
+) ids
+WHERE top >= nextval(pg_get_serial_sequence('tasks', 'id'))
+"""
+
+
+async def _split_header(chunks: AsyncIterator[bytes]):
+    """Read the CSV header line; returns (column names, iterator over the rest of the body)."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" in buffer:
+            break
+    line, _, rest = buffer.partition(b"\n")
+    header = [name.strip().lower() for name in next(csv.reader([line.decode("utf-8-sig")]), [])]
+
+    async def body():
+        if rest:
+            yield rest
+        async for chunk in chunks:
+            yield chunk
+
+    return header, body()
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]):
+    buffer = b""
+    number = 0
+
+    def parse(line: bytes):
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise TaskImportError(f"Line {number} is not valid JSON.")
+        if not isinstance(item, dict):
+            raise TaskImportError(f"Line {number} is not a JSON object.")
+        return tuple(_text(item.get(field)) for field in TRANSFER_FIELDS)
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield parse(line)
+    if buffer.strip():
+        number += 1
+        yield parse(buffer)
+
+
+async def _copy_into_staging(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: TransferFormat) -> int:
+    # COPY goes through the asyncpg connection under the session, inside the session's transaction
+    connection = await db.connection()
+    driver = (await connection.get_raw_connection()).driver_connection
+
+    if fmt == "csv":
+        header, body = await _split_header(chunks)
+        unknown = [name for name in header if name not in TRANSFER_FIELDS]
+        if not header or unknown or "title" not in header:
+            raise TaskImportError(
+                f"The CSV header must name the columns, including title, from: {', '.join(TRANSFER_FIELDS)}."
+                + (f" Unknown: {', '.join(unknown)}." if unknown else "")
+            )
+        status = await driver.copy_to_table(STAGING_TABLE, source=body, columns=header, format="csv")
+    else:
+        status = await driver.copy_records_to_table(STAGING_TABLE, records=_ndjson_records(chunks), columns=TRANSFER_FIELDS)
+    # asyncpg returns the command tag, e.g. "COPY 1000000"
+    return int(status.split()[-1])
+
+
+async def import_tasks(db: AsyncSession, owner_id: str, chunks: AsyncIterator[bytes], fmt: TransferFormat):
+    started = time.perf_counter()
+    try:
+        await db.execute(text("SET LOCAL statement_timeout = 0"))
+        await db.execute(text(CREATE_STAGING_SQL))
+        staged = await _copy_into_staging(db, chunks, fmt)
+        await db.execute(text(SYNC_SEQUENCE_SQL))
+        counts = (await db.execute(text(UPSERT_SQL), {"owner_id": owner_id})).one()
+        await db.commit()
+    except TaskImportError as e:
+        await db.rollback()
+        return {"error": f"❌ {e}"}
+    except (DBAPIError, PostgresError) as e:
+        await db.rollback()
+        logger.warning(f"Task import failed: {e}")
+        return {"error": f"❌ Import failed: {getattr(e, 'orig', e)}"}
+
+    await task_query_cache.invalidate()
+    # Far too many rows for a delta; connected clients reload instead
+    await task_event_hub.publish("resync", owner_id)
+
+    seconds = time.perf_counter() - started
+    # Invalid rows, earlier rows of a repeated id and ids owned by someone else
+    rejected = staged - counts.created - counts.updated
+    rate = _log_rate("import", fmt, staged, seconds)
+    return {
+        "message": f"✅ Imported {counts.created + counts.updated} task(s): {counts.created} created, {counts.updated} updated"
+                   + (f", {rejected} skipped." if rejected else "."),
+        "rows": staged,
+        "created": counts.created,
+        "updated": counts.updated,
+        "rejected": rejected,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rate),
+    }
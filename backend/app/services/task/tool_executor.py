@@ -0,0 +1,116 @@
+import asyncio
+import time
+from typing import Any, Optional
+from langchain_core.messages import ToolCall
+from langgraph.prebuilt import ToolNode
+from utils.config_env import config_env
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Runs all the tool calls of one agent step (e.g. five update_task calls) concurrently, each with
+# its own session from the pool, at most AGENT_TOOL_CONCURRENCY at a time. Calls that write the
+# same task run one after another, in the order the model gave them. The ToolMessages always come
+# back in call order, however the calls finish, so the history and the tool_end frames are stable.
+# Imported when the agent is built: langgraph.prebuilt is not needed to serve the REST API.
+
+# Tools that never write; any other tool is assumed to write the task IDs in its arguments
+READ_ONLY_TOOLS = {"list_tasks", "filter_tasks", "search_tasks", "task_stats"}
+
+STEP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+tool_step_duration = metrics.histogram(
+    "agent_tool_step_duration_seconds", "Wall time of the tool calls of one agent step.", ["mode"], buckets=STEP_BUCKETS,
+)
+tool_step_work = metrics.histogram(
+    "agent_tool_step_work_seconds", "Summed run time of the tool calls of one agent step (their time one after another).",
+    ["mode"], buckets=STEP_BUCKETS,
+)
+tool_step_calls = metrics.histogram(
+    "agent_tool_step_calls", "Tool calls per agent step.", buckets=(1, 2, 3, 5, 8, 13, 21),
+)
+
+# Totals since startup, for the benchmark report
+_totals = {"steps": 0, "calls": 0, "wall_seconds": 0.0, "work_seconds": 0.0}
+
+
+def written_task_ids(call: ToolCall) -> set[int]:
+    """IDs of the tasks a call may write: task_id, task_ids and task_id of each item in tasks."""
+    if call["name"] in READ_ONLY_TOOLS:
+        return set()
+    args = call.get("args") or {}
+    ids = set()
+    if isinstance(args.get("task_id"), int):
+        ids.add(args["task_id"])
+    ids.update(task_id for task_id in args.get("task_ids") or [] if isinstance(task_id, int))
+    for item in args.get("tasks") or []:
+        if isinstance(item, dict) and isinstance(item.get("task_id"), int):
+            ids.add(item["task_id"])
+    return ids
+
+
+def step_stats() -> dict:
+    steps = _totals["steps"]
+    return {
+        **_totals,
+        "calls_per_step": round(_totals["calls"] / steps, 2) if steps else 0,
+        # Calls in flight on average; compare wall_seconds across AGENT_TOOL_CONCURRENCY settings for the gain
+        "overlap": round(_totals["work_seconds"] / _totals["wall_seconds"], 2) if _totals["wall_seconds"] else None,
+    }
+
+
+class TaskToolNode(ToolNode):
+    """
+    ToolNode that runs a step's independent tool calls concurrently (see above).
+    Overrides ToolNode._afunc and uses its private _parse_input, _arun_one and _combine_tool_outputs as
+    of langgraph-prebuilt 0.6.5, which requirements.txt pins for that reason.
+    """
+
+    def __init__(self, tools: list, max_concurrency: Optional[int] = None, **kwargs: Any):
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max(1, max_concurrency or config_env.agent_tool_concurrency)
+
+    async def _afunc(self, input: Any, config: Any, *, store: Any) -> Any:
+        tool_calls, input_type = self._parse_input(input, store)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        durations = [0.0] * len(tool_calls)
+
+        async def run(index: int, call: ToolCall, after: set[asyncio.Future]):
+            # Earlier calls writing the same task finish first (errors come back as ToolMessages)
+            if after:
+                await asyncio.wait(after)
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    return await self._arun_one(call, input_type, config)
+                finally:
+                    durations[index] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        runs: list[asyncio.Future] = []
+        last_writer: dict[int, asyncio.Future] = {}
+        for index, call in enumerate(tool_calls):
+            task_ids = written_task_ids(call)
+            after = {last_writer[task_id] for task_id in task_ids if task_id in last_writer}
+            # Tasks copy the current context, so the tools still see the connection's owner
+            future = asyncio.ensure_future(run(index, call, after))
+            runs.append(future)
+            last_writer.update(dict.fromkeys(task_ids, future))
+        try:
+            outputs = await asyncio.gather(*runs)
+        except BaseException:
+            for future in runs:
+                future.cancel()
+            raise
+        self._record_step(len(tool_calls), time.perf_counter() - started, sum(durations))
+        return self._combine_tool_outputs(outputs, input_type)
+
+    def _record_step(self, calls: int, wall: float, work: float):
+        mode = "single" if calls == 1 else "sequential" if self.max_concurrency == 1 else "parallel"
+        tool_step_duration.observe(wall, mode=mode)
+        tool_step_work.observe(work, mode=mode)
+        tool_step_calls.observe(calls)
+        _totals["steps"] += 1
+        _totals["calls"] += calls
+        _totals["wall_seconds"] += wall
+        _totals["work_seconds"] += work
+        if calls > 1:
+            logger.debug(f"🛠️ {calls} tool calls in {wall * 1000:.0f} ms ({work * 1000:.0f} ms of tool time, {mode})")
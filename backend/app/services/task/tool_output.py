@@ -0,0 +1,74 @@
+import json
+from typing import Awaitable, Callable, Optional
+from utils.config_env import config_env
+
+# Tool results are serialized into the model context and stay in the thread for the rest of
+# the conversation, so list/filter tools return a compact projection of each task, cut to a
+# token budget, with a summary of the whole result set when it spans more than one page.
+
+# "archived" is only present (true) on archived tasks returned by include_archived calls
+DEFAULT_TOOL_FIELDS = ("id", "title", "description", "priority", "status", "due_date", "version", "archived")
+TITLE_MAX_CHARS = 120
+SUMMARY_RESERVE_TOKENS = 60
+
+
+def estimate_tokens(value) -> int:
+    # Same ~4 characters per token estimate used when trimming chat history
+    return len(json.dumps(value, default=str, ensure_ascii=False)) // 4 + 1
+
+
+def compact_task(task: dict, fields: Optional[list[str]] = None) -> dict:
+    limit = config_env.tool_description_chars
+    compact = {}
+    for field in fields or DEFAULT_TOOL_FIELDS:
+        value = task.get(field)
+        if value is None or value == "":
+            continue
+        if field == "description" and limit and len(value) > limit:
+            value = value[:limit].rstrip() + "…"
+        elif field == "title" and len(value) > TITLE_MAX_CHARS:
+            value = value[:TITLE_MAX_CHARS].rstrip() + "…"
+        elif field == "due_date":
+            value = value.date().isoformat() if hasattr(value, "date") else str(value)[:10]
+        compact[field] = value
+    return compact
+
+
+async def compact_page(fetch: Callable[[int], Awaitable[dict]], page_size: int, fields: Optional[list[str]] = None,
+                       summarize: Optional[Callable[[], Awaitable[dict]]] = None, first_page: bool = True) -> dict:
+    """
+    Fetch one page via fetch(page_size) and return it compacted. If the page is over the token
+    budget, it is fetched again with fewer items so next_cursor still continues right after the
+    last task returned.
+    """
+    budget = config_env.tool_result_max_tokens
+    result = await fetch(page_size)
+    if "error" in result:
+        return result
+
+    def build(page: dict) -> dict:
+        return {
+            "items": [compact_task(t, fields) for t in page["items"]],
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"],
+        }
+
+    out = build(result)
+    if budget and estimate_tokens(out) > budget and len(out["items"]) > 1:
+        # Keep the longest prefix of the page that fits (leaving room for the summary), then fetch
+        # exactly that many again so next_cursor points just after the last task returned
+        room = budget - estimate_tokens({**out, "items": []}) - SUMMARY_RESERVE_TOKENS
+        fits, used = 0, 0
+        for item in out["items"]:
+            used += estimate_tokens(item)
+            if used > room:
+                break
+            fits += 1
+        out = build(await fetch(max(fits, 1)))
+        out["note"] = f"Page cut to {len(out['items'])} tasks to fit the result size limit. Use next_cursor for more."
+
+    if summarize and first_page and out["has_more"]:
+        summary = await summarize()
+        if "error" not in summary:
+            out["summary"] = summary
+    return out
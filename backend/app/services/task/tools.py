@@ -1,70 +1,48 @@
-from models.task import Task
-from utils.db_connection import SessionLocal as get_db
-from utils.crud import CRUDBase
-from schemas.task import CreateTaskInput, UpdateTaskInput, DeleteTaskInput, FilterTasksInput
-from datetime import datetime
-
-crud_task = CRUDBase(Task)
+from services.task import task_crud
+from services.task.tool_output import compact_page
+from utils.db_connection import async_session_scope
+from utils.auth import current_owner
+from schemas.task import (
+    CreateTaskInput, UpdateTaskInput, DeleteTaskInput, FilterTasksInput, TaskSortBy, TaskField, SearchMatch,
+    BulkCreateTasksInput, BulkUpdateTasksInput, BulkDeleteTasksInput,
+)
+
+# Agent tools are thin async wrappers over the task services, so the agent and
+# the REST API share validation and never run blocking DB calls on the event loop.
+# Each tool call owns one session scope, returned to the pool when the call ends.
+# Tools act for the owner of the chat connection (see utils/auth.py); the model never picks it.
 
 # --- CREATE TASK ---
-def create_task(title: str, description: str, priority: str = "medium", due_date: str | None = None):
-    db = get_db()
-
-    # Parse due_date safely
-    parsed_due_date = None
-    if due_date:
-        try:
-            parsed_due_date = datetime.strptime(due_date, "%Y-%m-%d")
-        except ValueError:
-            return {"error": f"❌ Invalid date format '{due_date}'. Use YYYY-MM-DD."}
-
-    # Create ORM object
-    task_dict = {
-        "title": title,
-        "description": description,
-        "priority": priority,
-        "due_date": parsed_due_date,
-    }
-
-    # Use CRUDBase create
-    db_obj = crud_task.create(db, obj_in=CreateTaskInput(**{
-        "title": title,
-        "description": description,
-        "priority": priority,
-        "due_date": due_date,
-    }))
-
-    # After insert, update due_date (since schema takes string)
-    db_obj.due_date = parsed_due_date
-    db.commit()
-    db.refresh(db_obj)
-
-    return {"message": f"✅ Task '{db_obj.title}' created.", "task_id": db_obj.id}
+async def create_task(title: str, description: str, priority: str = "medium", due_date: str | None = None):
+    async with async_session_scope() as db:
+        result = await task_crud.create_task(db, current_owner(), CreateTaskInput(
+            title=title,
+            description=description,
+            priority=priority,
+            due_date=due_date,
+        ))
+    if "error" in result:
+        return result
+    return {"message": f"✅ Task '{title}' created.", "task_id": result["task_id"]}
 
 
 # --- LIST TASKS ---
-def list_tasks():
-    db = get_db()
-    tasks = crud_task.get_all(db)
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "priority": t.priority,
-            "status": t.status,
-            "due_date": t.due_date,
-        }
-        for t in tasks
-    ]
+# List/filter results are compacted and cut to the tool result budget (see tool_output.py)
+async def list_tasks(cursor: str | None = None, sort_by: TaskSortBy = "id", descending: bool = False, page_size: int = 20,
+                     fields: list[TaskField] | None = None):
+    owner_id = current_owner()
+    async with async_session_scope() as db:
+        return await compact_page(
+            lambda size: task_crud.list_tasks(db, owner_id, page_size=size, cursor=cursor, sort_by=sort_by, descending=descending),
+            page_size, fields, summarize=lambda: task_crud.summarize_tasks(db, owner_id), first_page=cursor is None,
+        )
 
 
 # --- UPDATE TASK ---
-def update_task(task_id: int, title: str | None = None, description: str | None = None,
-                priority: str | None = None, due_date: str | None = None, status: str | None = None):
-    db = get_db()
-
-    update_data = {}
+async def update_task(task_id: int, title: str | None = None, description: str | None = None,
+                      priority: str | None = None, due_date: str | None = None, status: str | None = None,
+                      version: int | None = None):
+    update_data = {"task_id": task_id, "version": version}
     if title is not None:
         update_data["title"] = title
     if description is not None:
@@ -74,60 +52,79 @@ def update_task(task_id: int, title: str | None = None, description: str | None
     if status is not None:
         update_data["status"] = status
     if due_date:
-        try:
-            update_data["due_date"] = datetime.strptime(due_date, "%Y-%m-%d")
-        except ValueError:
-            return {"error": f"❌ Invalid date format '{due_date}'. Use YYYY-MM-DD."}
-
-    updated_task = crud_task.update(db, id=task_id, obj_in=UpdateTaskInput(**{
-        "title": title,
-        "description": description,
-        "priority": priority,
-        "due_date": due_date,
-        "task_id": task_id,
-        "status": status
-    }))
-
-    if not updated_task:
-        return {"error": "❌ Task not found."}
+        update_data["due_date"] = due_date
 
-    return {"message": f"✅ Task '{updated_task.title}' updated."}
+    async with async_session_scope() as db:
+        return await task_crud.update_task(db, current_owner(), UpdateTaskInput(**update_data))
 
 
 # --- DELETE TASK ---
-def delete_task(task_id: int):
-    db = get_db()
-    deleted_task = crud_task.delete(db, id=task_id)
-    if not deleted_task:
-        return {"error": "❌ Task not found."}
-    return {"message": f"🗑️ Task '{deleted_task.title}' deleted."}
+async def delete_task(task_id: int):
+    async with async_session_scope() as db:
+        return await task_crud.delete_task(db, current_owner(), DeleteTaskInput(task_id=task_id))
 
 
 # --- FILTER TASKS ---
-def filter_tasks(status: str | None = None, priority: str | None = None, due_date: str | None = None):
-    db = get_db()
-    filters = FilterTasksInput(status=status, priority=priority, due_date=due_date)
-    # Reuse CRUD directly for tools to keep symmetry with API
-    filter_dict = {}
-    if filters.status:
-        filter_dict["status"] = filters.status
-    if filters.priority:
-        filter_dict["priority"] = filters.priority
-    if filters.due_date:
-        try:
-            datetime.strptime(filters.due_date, "%Y-%m-%d")
-            filter_dict["due_date"] = filters.due_date
-        except ValueError:
-            return {"error": f"❌ Invalid date format '{filters.due_date}'. Use YYYY-MM-DD."}
-    tasks = crud_task.get_all(db, filters=filter_dict or None)
-    return [
-        {
-            "id": t.id,
-            "title": t.title,
-            "description": t.description,
-            "priority": t.priority,
-            "status": t.status,
-            "due_date": t.due_date,
-        }
-        for t in tasks
-    ]
+async def filter_tasks(status: str | None = None, priority: str | None = None, due_date: str | None = None,
+                       statuses: list[str] | None = None, priorities: list[str] | None = None,
+                       due_after: str | None = None, due_before: str | None = None, overdue: bool | None = None,
+                       created_since: str | None = None, updated_since: str | None = None, include_archived: bool = False,
+                       cursor: str | None = None, sort_by: TaskSortBy = "id", descending: bool = False,
+                       page_size: int = 20, fields: list[TaskField] | None = None):
+    filters = FilterTasksInput(
+        status=status, priority=priority, due_date=due_date, statuses=statuses, priorities=priorities,
+        due_after=due_after, due_before=due_before, overdue=overdue,
+        created_since=created_since, updated_since=updated_since, include_archived=include_archived,
+    )
+    owner_id = current_owner()
+    async with async_session_scope() as db:
+        return await compact_page(
+            lambda size: task_crud.filter_tasks(db, owner_id, filters, page_size=size, cursor=cursor,
+                                                sort_by=sort_by, descending=descending),
+            page_size, fields, summarize=lambda: task_crud.summarize_tasks(db, owner_id, filters), first_page=cursor is None,
+        )
+
+
+# --- SEARCH TASKS ---
+async def search_tasks(query: str, status: str | None = None, priority: str | None = None, include_archived: bool = False,
+                       match: SearchMatch = "auto", cursor: str | None = None, page_size: int = 10,
+                       fields: list[TaskField] | None = None):
+    filters = (FilterTasksInput(status=status, priority=priority, include_archived=include_archived)
+               if status or priority or include_archived else None)
+    owner_id = current_owner()
+    async with async_session_scope() as db:
+        return await compact_page(
+            lambda size: task_crud.search_tasks(db, owner_id, query, filters, cursor=cursor, page_size=size, match=match),
+            page_size, fields,
+        )
+
+
+# --- TASK STATS ---
+async def task_stats():
+    async with async_session_scope() as db:
+        stats = await task_crud.task_stats(db, current_owner())
+    return {key: value for key, value in stats.items() if key != "source"}
+
+
+# --- BULK CREATE TASKS ---
+async def bulk_create_tasks(tasks: list[CreateTaskInput]):
+    async with async_session_scope() as db:
+        return await task_crud.bulk_create_tasks(db, current_owner(), BulkCreateTasksInput(tasks=tasks))
+
+
+# --- BULK UPDATE TASKS ---
+async def bulk_update_tasks(task_ids: list[int] | None = None, title: str | None = None, description: str | None = None,
+                            priority: str | None = None, due_date: str | None = None, status: str | None = None,
+                            tasks: list[UpdateTaskInput] | None = None):
+    data = BulkUpdateTasksInput(
+        task_ids=task_ids or [], title=title, description=description, priority=priority,
+        due_date=due_date, status=status, tasks=tasks or [],
+    )
+    async with async_session_scope() as db:
+        return await task_crud.bulk_update_tasks(db, current_owner(), data)
+
+
+# --- BULK DELETE TASKS ---
+async def bulk_delete_tasks(task_ids: list[int]):
+    async with async_session_scope() as db:
+        return await task_crud.bulk_delete_tasks(db, current_owner(), BulkDeleteTasksInput(task_ids=task_ids))
@@ -0,0 +1,125 @@
+import argparse
+import base64
+import contextvars
+import hashlib
+import hmac
+import re
+import time
+from contextlib import contextmanager
+from typing import Mapping, Optional
+from fastapi import HTTPException, Request
+from utils.config_env import config_env
+
+# --- Task owner resolution ---
+# Every task belongs to an owner (a user ID string). Each REST request and each WebSocket connection
+# resolves its owner once:
+#   - with AUTH_TOKEN_SECRET set, from a bearer token only (Authorization header, or ?token= on
+#     WebSockets, whose browsers cannot set headers): "<owner, base64url>.<expiry or 0>.<HMAC-SHA256>".
+#     Without a valid token the request is rejected; the owner header is never consulted, since any
+#     client can send it.
+#   - otherwise from the AUTH_OWNER_HEADER header when AUTH_TRUST_HEADER (off by default; turn it on
+#     only behind a proxy that strips and sets the header itself), else AUTH_DEFAULT_OWNER unless
+#     AUTH_REQUIRED
+# Routes pass the owner to the task services explicitly; chat connections put it in owner_var so
+# the agent tools and the fast path pick it up without the model ever seeing it.
+
+OWNER_PATTERN = re.compile(r"^[A-Za-z0-9_.@:-]{1,128}$")
+
+owner_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("owner_id", default=None)
+
+
+class AuthError(Exception):
+    pass
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: str) -> str:
+    return _b64(hmac.new(config_env.auth_token_secret.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(owner_id: str, ttl: Optional[int] = None) -> str:
+    if not config_env.auth_token_secret:
+        raise AuthError("AUTH_TOKEN_SECRET is not set")
+    if not OWNER_PATTERN.match(owner_id):
+        raise AuthError(f"Invalid owner ID: {owner_id!r}")
+    payload = f"{_b64(owner_id.encode())}.{int(time.time()) + ttl if ttl else 0}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def verify_token(token: str) -> str:
+    """The owner a token was issued for; raises AuthError if it is malformed, forged or expired."""
+    try:
+        owner_part, expires, signature = token.split(".")
+        owner_id = _unb64(owner_part).decode()
+        expires_at = int(expires)
+    except ValueError:
+        raise AuthError("Malformed token")
+    if not hmac.compare_digest(signature, _signature(f"{owner_part}.{expires}")):
+        raise AuthError("Invalid token")
+    if expires_at and expires_at < time.time():
+        raise AuthError("Token expired")
+    return owner_id
+
+
+def resolve_owner(headers: Mapping[str, str], query_params: Optional[Mapping[str, str]] = None) -> str:
+    authorization = headers.get("authorization", "")
+    token = authorization[7:].strip() if authorization.lower().startswith("bearer ") else None
+    if token is None and query_params is not None:
+        token = query_params.get("token")
+    if config_env.auth_token_secret:
+        if not token:
+            raise AuthError("Authentication required")
+        return verify_token(token)
+
+    if config_env.auth_trust_header:
+        owner_id = headers.get(config_env.auth_owner_header.lower())
+        if owner_id:
+            if not OWNER_PATTERN.match(owner_id):
+                raise AuthError(f"Invalid {config_env.auth_owner_header} header")
+            return owner_id
+
+    if config_env.auth_required:
+        raise AuthError("Authentication required")
+    return config_env.auth_default_owner
+
+
+# FastAPI dependency for REST routes
+async def get_owner(request: Request) -> str:
+    try:
+        return resolve_owner(request.headers)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+
+@contextmanager
+def owner_context(owner_id: str):
+    """Run the block (and the tasks it starts) on behalf of `owner_id`."""
+    token = owner_var.set(owner_id)
+    try:
+        yield
+    finally:
+        owner_var.reset(token)
+
+
+def current_owner() -> str:
+    """The owner of the current chat connection; tools must never run without one."""
+    owner_id = owner_var.get()
+    if owner_id is None:
+        raise LookupError("No task owner in context")
+    return owner_id
+
+
+if __name__ == "__main__":
+    # Issue a token for a user:  python -m utils.auth alice --ttl 86400
+    parser = argparse.ArgumentParser(description="Issue a signed owner token (needs AUTH_TOKEN_SECRET).")
+    parser.add_argument("owner_id")
+    parser.add_argument("--ttl", type=int, help="seconds until the token expires (default: never)")
+    args = parser.parse_args()
+    print(issue_token(args.owner_id, args.ttl))
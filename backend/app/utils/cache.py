@@ -0,0 +1,174 @@
+import functools
+import hashlib
+from abc import ABC, abstractmethod
+import inspect
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from pydantic import BaseModel
+from .config_env import config_env
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    Storage used by QueryCache. The in-process backend is the default; a shared backend
+    (e.g. Redis) only needs to implement the abstract methods so all workers see the same versions.
+    A backend missing one of them cannot be instantiated.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the cached value, or MISSING."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment a counter (used for namespace versions) and return the new value."""
+
+    @abstractmethod
+    async def get_counter(self, key: str) -> int:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Bounded LRU with per-entry TTL, local to this worker process."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def _normalize(value: Any) -> Any:
+    # Pydantic inputs become dicts without unset/None fields; multi-value filters are order-insensitive
+    if isinstance(value, BaseModel):
+        value = value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in sorted(value.items()) if v is not None}
+    if isinstance(value, (list, tuple, set)):
+        return sorted((_normalize(v) for v in value), key=str)
+    return value
+
+
+class QueryCache:
+    """
+    Read-through cache for query results in one namespace. Writers call invalidate(), which
+    bumps the namespace version; keys embed the version, so stale entries are never read
+    again and simply age out of the LRU.
+    """
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    async def get_or_load(self, name: str, params: dict, loader: Callable[[], Awaitable[Any]],
+                          should_cache: Callable[[Any], bool] = lambda result: True) -> Any:
+        if not self.enabled:
+            return await loader()
+        # Read the version before loading: a write that lands mid-load bumps it, so the
+        # (possibly stale) result is stored under a key nobody will ask for again
+        version = await self.backend.get_counter(self._version_key)
+        raw = json.dumps(_normalize(params), sort_keys=True, default=str)
+        key = f"{self.namespace}:v{version}:{name}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+        value = await self.backend.get(key)
+        if value is not MISSING:
+            return value
+        value = await loader()
+        if should_cache(value):
+            await self.backend.set(key, value, self.ttl)
+        return value
+
+    async def invalidate(self) -> int:
+        return await self.backend.incr(self._version_key)
+
+    @property
+    def _version_key(self) -> str:
+        return f"{self.namespace}:version"
+
+    def stats(self) -> dict:
+        return {"namespace": self.namespace, "enabled": self.enabled, "ttl": self.ttl, **self.backend.stats()}
+
+
+def cached(cache: QueryCache, exclude: tuple = ("db",), should_cache: Callable[[Any], bool] = lambda result: True):
+    """Cache an async query function on its normalized arguments (except those in `exclude`)."""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {name: value for name, value in bound.arguments.items() if name not in exclude}
+            return await cache.get_or_load(func.__name__, params, lambda: func(*args, **kwargs), should_cache)
+
+        return wrapper
+    return decorator
+
+
+# Backends by name; register a shared implementation here to use it across workers
+CACHE_BACKENDS: dict[str, Callable[[], CacheBackend]] = {
+    "memory": lambda: InMemoryCacheBackend(max_entries=config_env.query_cache_max_entries),
+}
+
+
+def make_query_cache(namespace: str, backend: Optional[CacheBackend] = None) -> QueryCache:
+    backend = backend or CACHE_BACKENDS[config_env.query_cache_backend]()
+    return QueryCache(namespace, backend, ttl=config_env.query_cache_ttl, enabled=config_env.query_cache_enabled)
@@ -1,6 +1,10 @@
 from pydantic import Field, ConfigDict
 from pydantic_settings import BaseSettings
 from typing import Optional
+import re
+
+# Settings whose values never go to the logs
+SECRET_FIELD = re.compile(r"password|secret|api_key|dsn|credential|(^|_)token$", re.IGNORECASE)
 
 class ConfigEnv(BaseSettings):
     # PostgreSQL Configuration
@@ -9,9 +13,94 @@ class ConfigEnv(BaseSettings):
     postgres_password: Optional[str] = Field(None, json_schema_extra={"env": "POSTGRES_PASSWORD"})
     postgres_port: Optional[str] = Field(None, json_schema_extra={"env": "POSTGRES_PORT"})
     postgres_db: Optional[str] = Field(None, json_schema_extra={"env": "POSTGRES_DB"})
+    # Connection pool settings (applied to both the sync and async engines)
+    db_pool_size: int = Field(5, json_schema_extra={"env": "DB_POOL_SIZE"})
+    db_max_overflow: int = Field(10, json_schema_extra={"env": "DB_MAX_OVERFLOW"})
+    db_pool_recycle: int = Field(1800, json_schema_extra={"env": "DB_POOL_RECYCLE"})
+    db_pool_pre_ping: bool = Field(True, json_schema_extra={"env": "DB_POOL_PRE_PING"})
+    db_pool_timeout: int = Field(30, json_schema_extra={"env": "DB_POOL_TIMEOUT"})
+    # A checkout held longer than this (seconds) is reported as a leak; with DB_POOL_TRACK_STACKS
+    # (a per-checkout cost, for debugging) the report includes the stack that took it
+    db_pool_leak_threshold: int = Field(60, json_schema_extra={"env": "DB_POOL_LEAK_THRESHOLD"})
+    db_pool_track_stacks: bool = Field(False, json_schema_extra={"env": "DB_POOL_TRACK_STACKS"})
+    # Read-through cache for task list/filter queries. Other workers' writes reach this cache through
+    # the task event broker; with the "local" broker the TTL bounds staleness across workers.
+    query_cache_enabled: bool = Field(True, json_schema_extra={"env": "QUERY_CACHE_ENABLED"})
+    query_cache_backend: str = Field("memory", json_schema_extra={"env": "QUERY_CACHE_BACKEND"})
+    query_cache_max_entries: int = Field(512, json_schema_extra={"env": "QUERY_CACHE_MAX_ENTRIES"})
+    query_cache_ttl: float = Field(10.0, json_schema_extra={"env": "QUERY_CACHE_TTL"})
+    # How long deleted/updated task entries stay in the change log used by /tasks/changes
+    task_change_retention_days: int = Field(7, json_schema_extra={"env": "TASK_CHANGE_RETENTION_DAYS"})
+    # Task change feed (/tasks/stream): "postgres" (LISTEN/NOTIFY, fans out across workers) or "local"
+    task_events_broker: str = Field("postgres", json_schema_extra={"env": "TASK_EVENTS_BROKER"})
+    task_events_coalesce_ms: int = Field(100, json_schema_extra={"env": "TASK_EVENTS_COALESCE_MS"})
+    task_events_queue_size: int = Field(100, json_schema_extra={"env": "TASK_EVENTS_QUEUE_SIZE"})
+    # Rows per server-side cursor batch for /tasks/export (one batch is held in memory at a time)
+    task_export_batch_size: int = Field(2000, json_schema_extra={"env": "TASK_EXPORT_BATCH_SIZE"})
+    # Chat conversation memory: "memory" (per worker, evicted when idle) or "postgres" (durable, resumable anywhere)
+    chat_checkpointer: str = Field("memory", json_schema_extra={"env": "CHAT_CHECKPOINTER"})
+    chat_max_threads: int = Field(1000, json_schema_extra={"env": "CHAT_MAX_THREADS"})
+    chat_thread_idle_ttl: float = Field(1800.0, json_schema_extra={"env": "CHAT_THREAD_IDLE_TTL"})
+    chat_max_checkpoints: int = Field(10, json_schema_extra={"env": "CHAT_MAX_CHECKPOINTS"})
+    # History sent to the model each turn (0 disables the limit); the stored thread is not trimmed
+    chat_history_max_messages: int = Field(40, json_schema_extra={"env": "CHAT_HISTORY_MAX_MESSAGES"})
+    chat_history_max_tokens: int = Field(6000, json_schema_extra={"env": "CHAT_HISTORY_MAX_TOKENS"})
+    # Answer simple, unambiguous commands ("mark task 3 done") without calling the model
+    chat_fast_path_enabled: bool = Field(True, json_schema_extra={"env": "CHAT_FAST_PATH_ENABLED"})
+    # Agent turns run at once per worker; extra turns wait in a bounded queue, then get a "busy" reply
+    chat_llm_max_concurrency: int = Field(8, json_schema_extra={"env": "CHAT_LLM_MAX_CONCURRENCY"})
+    chat_llm_max_waiting: int = Field(32, json_schema_extra={"env": "CHAT_LLM_MAX_WAITING"})
+    chat_llm_wait_timeout: float = Field(15.0, json_schema_extra={"env": "CHAT_LLM_WAIT_TIMEOUT"})
+    # Messages a connection may queue behind the reply in progress; "latest message wins" cancels it instead
+    chat_max_pending_messages: int = Field(3, json_schema_extra={"env": "CHAT_MAX_PENDING_MESSAGES"})
+    chat_latest_message_wins: bool = Field(False, json_schema_extra={"env": "CHAT_LATEST_MESSAGE_WINS"})
+    # Size limits for list/filter results returned to the agent (descriptions cut to N chars; ~tokens per result)
+    tool_description_chars: int = Field(80, json_schema_extra={"env": "TOOL_DESCRIPTION_CHARS"})
+    tool_result_max_tokens: int = Field(1500, json_schema_extra={"env": "TOOL_RESULT_MAX_TOKENS"})
+    # Startup: apply migrations in the app lifespan (disable when they run as a separate step), and
+    # build the agent "background" (after startup; /ready waits for it), "eager" (before serving)
+    # or "lazy" (on the first agent turn)
+    db_migrate_on_startup: bool = Field(True, json_schema_extra={"env": "DB_MIGRATE_ON_STARTUP"})
+    chat_agent_startup: str = Field("background", json_schema_extra={"env": "CHAT_AGENT_STARTUP"})
+    # Prometheus metrics at /metrics; optional OpenTelemetry spans (needs opentelemetry-api and a configured provider)
+    metrics_enabled: bool = Field(True, json_schema_extra={"env": "METRICS_ENABLED"})
+    tracing_enabled: bool = Field(False, json_schema_extra={"env": "TRACING_ENABLED"})
+    # Logging: "text" (colored) or "json" lines; LOG_QUEUE writes from a background thread so callers
+    # never block on stdout. LOG_SAMPLE_RATES keeps a fraction of sub-WARNING records per logger,
+    # e.g. "uvicorn.access=0.1,httpx=0.05"
+    log_level: str = Field("INFO", json_schema_extra={"env": "LOG_LEVEL"})
+    log_format: str = Field("text", json_schema_extra={"env": "LOG_FORMAT"})
+    log_queue: bool = Field(True, json_schema_extra={"env": "LOG_QUEUE"})
+    log_sample_rates: str = Field("", json_schema_extra={"env": "LOG_SAMPLE_RATES"})
+    # Task ownership: each request acts for one owner. With AUTH_TOKEN_SECRET set, only a signed bearer
+    # token counts (no token: 401). Otherwise AUTH_OWNER_HEADER when AUTH_TRUST_HEADER (only behind an
+    # authenticating proxy that sets it), else AUTH_DEFAULT_OWNER unless AUTH_REQUIRED.
+    # Tasks created before ownership belong to "default".
+    auth_token_secret: Optional[str] = Field(None, json_schema_extra={"env": "AUTH_TOKEN_SECRET"})
+    auth_owner_header: str = Field("X-User-ID", json_schema_extra={"env": "AUTH_OWNER_HEADER"})
+    auth_trust_header: bool = Field(False, json_schema_extra={"env": "AUTH_TRUST_HEADER"})
+    auth_required: bool = Field(False, json_schema_extra={"env": "AUTH_REQUIRED"})
+    auth_default_owner: str = Field("default", json_schema_extra={"env": "AUTH_DEFAULT_OWNER"})
+    # Tool calls of one agent step that run at once, each with its own pooled connection (1 runs them in turn)
+    agent_tool_concurrency: int = Field(4, json_schema_extra={"env": "AGENT_TOOL_CONCURRENCY"})
+    # Done tasks untouched for this many days move to tasks_archive (0 disables the archiver)
+    task_archive_after_days: int = Field(90, json_schema_extra={"env": "TASK_ARCHIVE_AFTER_DAYS"})
+    # Archiver throttling: tasks moved per transaction, pause between batches, seconds between runs
+    task_archive_batch_size: int = Field(500, json_schema_extra={"env": "TASK_ARCHIVE_BATCH_SIZE"})
+    task_archive_batch_pause: float = Field(1.0, json_schema_extra={"env": "TASK_ARCHIVE_BATCH_PAUSE"})
+    task_archive_interval: float = Field(3600.0, json_schema_extra={"env": "TASK_ARCHIVE_INTERVAL"})
+    # Deleting a task moves it to tasks_archive (kept, never listed) instead of removing it
+    task_soft_delete: bool = Field(False, json_schema_extra={"env": "TASK_SOFT_DELETE"})
     # Google API Key
     google_api_key: Optional[str] = Field(None, json_schema_extra={"env": "GOOGLE_API_KEY"})
     
     model_config = ConfigDict(env_file=".env", extra="allow")  # ✅ Updated
 
+    def safe_dump(self) -> dict:
+        """Settings with passwords, keys, tokens and secrets masked, safe to log."""
+        return {
+            name: "***" if value and SECRET_FIELD.search(name) else value
+            for name, value in self.model_dump().items()
+        }
+
 config_env = ConfigEnv()
\ No newline at end of file
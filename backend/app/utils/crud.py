@@ -1,11 +1,15 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Type, List, Optional,Dict,Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, insert, update, delete, tuple_, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Type, List, Optional,Dict,Any,Union,Tuple,AsyncIterator
 from pydantic import UUID4, BaseModel
 from sqlalchemy.orm import validates
 from sqlalchemy import asc
+from .db_metrics import tag_db_operations
 
+@tag_db_operations
 class  CRUDBase:
     def __init__(self, model: Type[BaseModel]):
         self.model = model
@@ -91,4 +95,363 @@ class  CRUDBase:
         # Convert the result into a dictionary
         result = {status: count for status, count in status_counts}
     
-        return result
\ No newline at end of file
+        return result
+
+
+class VersionConflict(Exception):
+    """An update named a version the record no longer has: someone else changed it first."""
+
+    def __init__(self, id: Any, current_version: int):
+        super().__init__(f"{id} is at version {current_version}")
+        self.id = id
+        self.current_version = current_version
+
+
+@tag_db_operations
+class AsyncCRUDBase:
+    """
+    Async counterpart of CRUDBase, mirroring its methods on an AsyncSession.
+    `scoped(owner_id=...)` returns a copy whose every query is limited to that owner's rows.
+    With an `archive_model` (same columns plus optional archived_at/deleted_at), deletes can be
+    soft and `archive` moves rows there in batches.
+    """
+
+    def __init__(self, model: Type[BaseModel], scope: Optional[Dict[str, Any]] = None,
+                 archive_model: Optional[Type[BaseModel]] = None):
+        self.model = model
+        self.scope = scope or {}
+        self.archive_model = archive_model
+
+    def scoped(self, **scope: Any) -> "AsyncCRUDBase":
+        """Reads, updates and deletes only see rows matching `scope`; inserts set those values."""
+        return type(self)(self.model, {**self.scope, **scope}, self.archive_model)
+
+    # Create a new record
+    async def create(self, db: AsyncSession, obj_in: Union[BaseModel, Dict[str, Any]],
+                     returning: Optional[List[Any]] = None) -> Any:
+        """
+        The new instance, refreshed after the commit. With `returning`, one INSERT ... RETURNING
+        those columns instead: a plain row, no instance to refresh.
+        """
+        obj_data = {**(obj_in if isinstance(obj_in, dict) else obj_in.model_dump()), **self.scope}
+        if returning:
+            row = (await db.execute(insert(self.model).values(**obj_data).returning(*returning))).one()
+            await db.commit()
+            return row
+        db_obj = self.model(**obj_data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    # Get a record by ID
+    async def get(self, db: AsyncSession, id: UUID4) -> Optional[BaseModel]:
+        result = await db.execute(select(self.model).where(self.model.id == id, *self._scope_conditions()))
+        return result.scalars().first()
+
+    # Get a record by field name
+    async def get_by_field(self, db: AsyncSession, field: str, value: any) -> Optional[BaseModel]:
+        result = await db.execute(select(self.model).where(getattr(self.model, field) == value, *self._scope_conditions()))
+        return result.scalars().first()
+
+    # Get all records
+    async def get_all(
+        self, db: AsyncSession, page: int = 1, pagesize: int = 100, filters: Optional[Dict[str, Any]] = None,
+        conditions: Optional[List[Any]] = None, columns: Optional[List[Any]] = None,
+    ) -> List[Any]:
+        """Model instances, or plain rows of `columns` when given (no ORM identity-map overhead)."""
+        skip = (page - 1) * pagesize
+        query = self._apply_filters(select(*(columns or [self.model])), filters, conditions)
+
+        result = await db.execute(query.offset(skip).limit(pagesize))
+        return result.all() if columns else result.scalars().all()
+
+    # Get one page of records with keyset (cursor) pagination
+    async def get_page(
+        self,
+        db: AsyncSession,
+        sort_column: Any = None,
+        after: Optional[Tuple[Any, Any]] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        descending: bool = False,
+        conditions: Optional[List[Any]] = None,
+        columns: Optional[List[Any]] = None,
+    ) -> Tuple[List[Any], Optional[Tuple[Any, Any]]]:
+        """
+        Rows ordered by (sort_column, id), starting after the `after` (sort key, id) pair.
+        Returns the rows and the (sort key, id) of the last one, or None when there are no more.
+        NULL sort keys are ordered last in both directions. With `columns` (which must include id)
+        the rows are plain tuples of those columns instead of model instances.
+        """
+        id_column = self.model.id
+        sort_column = id_column if sort_column is None else sort_column
+        query = self._apply_filters(select(*(columns or [self.model]), sort_column.label("_sort_key")), filters, conditions)
+
+        if after is not None:
+            query = query.where(self._keyset_after(sort_column, id_column, after, descending))
+
+        if descending:
+            query = query.order_by(sort_column.desc().nulls_last(), id_column.desc())
+        else:
+            query = query.order_by(sort_column.asc().nulls_last(), id_column.asc())
+
+        # Fetch one extra row to learn whether another page exists without a COUNT
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = rows if columns else [row[0] for row in rows]
+        last = (rows[-1]._sort_key, items[-1].id) if has_more and rows else None
+        return items, last
+
+    # Every matching row in id order, in batches, through a server-side cursor
+    async def stream(
+        self,
+        db: AsyncSession,
+        filters: Optional[Dict[str, Any]] = None,
+        conditions: Optional[List[Any]] = None,
+        columns: Optional[List[Any]] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Yield lists of at most `batch_size` rows; only one batch is held in memory at a time.
+        The session's connection stays checked out until the iteration ends.
+        """
+        query = self._apply_filters(select(*(columns or [self.model])), filters, conditions).order_by(self.model.id)
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows if columns else [row[0] for row in rows]
+
+    # Update a record by ID
+    async def update(self, db: AsyncSession, id: UUID4, obj_in: Union[BaseModel, Dict[str, Any]],
+                     returning: Optional[List[Any]] = None, expected_version: Optional[int] = None) -> Any:
+        """
+        The updated instance (None if there is no such record), refreshed after the commit.
+        With `returning`, one UPDATE ... WHERE id = :id RETURNING those columns instead.
+        `expected_version` (models with a version column) makes the update conditional on it and
+        raises VersionConflict when the record has moved on.
+        """
+        if isinstance(obj_in, dict):
+            update_data = {key: value for key, value in obj_in.items() if value is not None}
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True, exclude_none=True)
+
+        if returning:
+            stmt = update(self.model).where(self.model.id == id, *self._scope_conditions())
+            if expected_version is not None:
+                stmt = stmt.where(self.model.version == expected_version)
+            stmt = stmt.values(**self._versioned(update_data)).returning(*returning)
+            row = (await db.execute(stmt.execution_options(synchronize_session=False))).first()
+            if row is None and expected_version is not None:
+                # Only on the failure path: tell a stale version apart from a missing record
+                current = (await db.execute(
+                    select(self.model.version).where(self.model.id == id, *self._scope_conditions())
+                )).scalar()
+                if current is not None:
+                    await db.rollback()
+                    raise VersionConflict(id, current)
+            await db.commit()
+            return row
+
+        db_obj = await self.get(db, id)
+        if db_obj:
+            if expected_version is not None and db_obj.version != expected_version:
+                raise VersionConflict(id, db_obj.version)
+            for key, value in update_data.items():
+                setattr(db_obj, key, value)
+            await db.commit()
+            await db.refresh(db_obj)
+        return db_obj
+
+    # Update a record by field
+    async def update_by_filed(self, db: AsyncSession, field: str, value: any, obj_in: BaseModel) -> BaseModel:
+        db_obj = await self.get_by_field(db, field, value)
+        if db_obj:
+            for key, value in obj_in.model_dump(exclude_unset=True, exclude_none=True).items():
+                setattr(db_obj, key, value)
+            await db.commit()
+            await db.refresh(db_obj)
+        return db_obj
+
+    # Delete a record by ID
+    async def delete(self, db: AsyncSession, id: UUID4, returning: Optional[List[Any]] = None, soft: bool = False) -> Any:
+        """
+        The deleted instance, or with `returning` a row from one DELETE ... RETURNING; None if not found.
+        `soft` moves the record to archive_model with deleted_at set instead (returns a row of `returning`).
+        """
+        if soft:
+            stmt = self._archive_statement([self.model.id == id, *self._scope_conditions()], returning or [self.model.id],
+                                           deleted_at=func.now())
+            row = (await db.execute(stmt)).first()
+            await db.commit()
+            return row
+        if returning:
+            stmt = delete(self.model).where(self.model.id == id, *self._scope_conditions()).returning(*returning)
+            row = (await db.execute(stmt.execution_options(synchronize_session=False))).first()
+            await db.commit()
+            return row
+        db_obj = await self.get(db, id)
+        if db_obj:
+            await db.delete(db_obj)
+            await db.commit()
+        return db_obj
+
+    # Delete a record by FieldName
+    async def delete_by_field(self, db: AsyncSession, field: str, value: any) -> Optional[BaseModel]:
+        db_obj = await self.get_by_field(db, field, value)
+        if db_obj:
+            await db.delete(db_obj)
+            await db.commit()
+        return db_obj
+
+    # Insert many records with one multi-row INSERT ... RETURNING, in a single transaction
+    async def bulk_create(self, db: AsyncSession, objs_in: List[Dict[str, Any]], returning: Optional[List[Any]] = None) -> List[Any]:
+        """Rows for `returning` columns (default: id), in the same order as `objs_in`."""
+        if not objs_in:
+            return []
+        columns = returning or [self.model.id]
+        stmt = insert(self.model).returning(*columns, sort_by_parameter_order=True)
+        rows = (await db.execute(stmt, [{**obj, **self.scope} for obj in objs_in])).all()
+        await db.commit()
+        return rows
+
+    # Apply several UPDATE ... WHERE id IN (...) RETURNING statements in a single transaction
+    async def bulk_update(
+        self, db: AsyncSession, changes: List[Tuple[List[Any], Dict[str, Any], Optional[int]]],
+        returning: Optional[List[Any]] = None,
+    ) -> List[List[Any]]:
+        """
+        `changes` is a list of (ids, values, expected_version) groups; a group with an expected
+        version only updates the records still at that version. Returns, per group, the rows it
+        actually updated.
+        """
+        columns = returning or [self.model.id]
+        rows = []
+        for ids, values, expected_version in changes:
+            if not ids or not values:
+                rows.append([])
+                continue
+            stmt = update(self.model).where(self.model.id.in_(ids), *self._scope_conditions())
+            if expected_version is not None:
+                stmt = stmt.where(self.model.version == expected_version)
+            stmt = stmt.values(**self._versioned(values)).returning(*columns).execution_options(synchronize_session=False)
+            rows.append((await db.execute(stmt)).all())
+        await db.commit()
+        return rows
+
+    # Delete many records by ID with one DELETE ... RETURNING (`soft`: moved to archive_model, as in delete)
+    async def bulk_delete(self, db: AsyncSession, ids: List[Any], returning: Optional[List[Any]] = None,
+                          soft: bool = False) -> List[Any]:
+        if not ids:
+            return []
+        columns = returning or [self.model.id]
+        if soft:
+            stmt = self._archive_statement([self.model.id.in_(ids), *self._scope_conditions()], columns, deleted_at=func.now())
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+            return rows
+        stmt = (
+            delete(self.model).where(self.model.id.in_(ids), *self._scope_conditions())
+            .returning(*columns).execution_options(synchronize_session=False)
+        )
+        rows = (await db.execute(stmt)).all()
+        await db.commit()
+        return rows
+
+    # Move a batch of records to archive_model in one short transaction
+    async def archive(self, db: AsyncSession, conditions: List[Any], limit: int, order_by: Any = None,
+                      keys: Optional[List[Any]] = None, returning: Optional[List[Any]] = None) -> List[Any]:
+        """
+        Move at most `limit` records matching `conditions` (oldest `order_by` first) to archive_model.
+        Records locked by other transactions are skipped, never waited for. `keys` (default: id)
+        identify a record; pass the partition key too on a partitioned table. Returns rows of
+        `returning` (default: id) for the records moved.
+        """
+        keys = keys or [self.model.id]
+        batch = select(*keys).where(*self._scope_conditions(), *conditions)
+        if order_by is not None:
+            batch = batch.order_by(order_by)
+        batch = batch.limit(limit).with_for_update(skip_locked=True)
+        stmt = self._archive_statement([tuple_(*keys).in_(batch)], returning or [self.model.id])
+        rows = (await db.execute(stmt)).all()
+        await db.commit()
+        return rows
+
+    # Get a count from fields
+    async def get_count(self, db: AsyncSession, field: str, value: any, group_field: str) -> BaseModel:
+        group_column = getattr(self.model, group_field)
+        result = await db.execute(
+            select(group_column, func.count().label("count"))
+            .where(getattr(self.model, field) == value, *self._scope_conditions())
+            .group_by(group_column)
+        )
+        return {status: count for status, count in result.all()}
+
+    # Row counts per combination of the group_fields values, over the rows matching filters/conditions
+    async def get_grouped_counts(self, db: AsyncSession, group_fields: List[str],
+                                 filters: Optional[Dict[str, Any]] = None, conditions: Optional[List[Any]] = None):
+        group_columns = [getattr(self.model, field) for field in group_fields]
+        query = select(*group_columns, func.count().label("count")).group_by(*group_columns)
+        query = self._apply_filters(query, filters, conditions)
+        result = await db.execute(query)
+        return result.all()
+
+    # Core UPDATEs bypass the ORM version counter, so they bump the version column themselves
+    def _versioned(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        if hasattr(self.model, "version"):
+            return {**values, "version": self.model.version + 1}
+        return values
+
+    # WITH moved AS (DELETE ... RETURNING *) INSERT INTO archive SELECT * FROM moved: the row leaves
+    # the table as a real DELETE (so delete triggers fire) and lands in the archive atomically. A record
+    # archived again (e.g. re-imported with the same id) replaces its earlier archived copy.
+    def _archive_statement(self, conditions: List[Any], returning: List[Any], **values: Any):
+        if self.archive_model is None:
+            raise TypeError(f"{self.model.__name__} has no archive model")
+        table, archive = self.model.__table__, self.archive_model.__table__
+        copied = [column.key for column in archive.columns if column.key in table.columns and column.computed is None]
+        moved = delete(self.model).where(*conditions).returning(*[table.c[key] for key in copied]).cte("moved")
+        stmt = pg_insert(self.archive_model).from_select(
+            copied + list(values), select(*[moved.c[key] for key in copied], *values.values())
+        ).add_cte(moved)
+        replaced = [column.key for column in archive.columns if column.computed is None and not column.primary_key]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.key for column in archive.primary_key.columns],
+            set_={key: stmt.excluded[key] for key in replaced},
+        )
+        return stmt.returning(*[archive.c[column.key] for column in returning])
+
+    def _scope_conditions(self) -> List[Any]:
+        return [getattr(self.model, field) == value for field, value in self.scope.items()]
+
+    # `filters` maps field -> value (a list/tuple/set becomes IN); `conditions` are extra SQL expressions.
+    # The scope is always applied.
+    def _apply_filters(self, query, filters: Optional[Dict[str, Any]], conditions: Optional[List[Any]] = None):
+        if self.scope:
+            query = query.where(*self._scope_conditions())
+        if filters:
+            for field, value in filters.items():
+                if value is None:
+                    continue
+                column = getattr(self.model, field)
+                if isinstance(value, (list, tuple, set)):
+                    query = query.where(column.in_(list(value)))
+                else:
+                    query = query.where(column == value)
+        if conditions:
+            query = query.where(*conditions)
+        return query
+
+    @staticmethod
+    def _keyset_after(sort_column, id_column, after: Tuple[Any, Any], descending: bool):
+        sort_value, last_id = after
+        nullable = getattr(getattr(sort_column, "expression", sort_column), "nullable", False)
+        if sort_value is None:
+            # Already inside the trailing NULL block: only the id decides
+            return and_(sort_column.is_(None), id_column < last_id if descending else id_column > last_id)
+        # Row-value comparison lets Postgres seek on a (sort_column, id) index
+        if descending:
+            condition = tuple_(sort_column, id_column) < tuple_(sort_value, last_id)
+        else:
+            condition = tuple_(sort_column, id_column) > tuple_(sort_value, last_id)
+        return or_(condition, sort_column.is_(None)) if nullable else condition
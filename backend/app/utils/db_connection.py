@@ -1,6 +1,11 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker,declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from contextlib import asynccontextmanager, contextmanager
 from .config_env import config_env
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from .db_pool import track_pool
+from .db_metrics import instrument_engine, timed_pool_class
 
 POSTGRES_USER = config_env.postgres_user
 POSTGRES_PASSWORD =config_env.postgres_password
@@ -8,11 +13,32 @@ POSTGRES_HOST = config_env.postgres_host
 POSTGRES_PORT = config_env.postgres_port
 POSTGRES_DB = config_env.postgres_db
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": config_env.db_pool_size,
+    "max_overflow": config_env.db_max_overflow,
+    "pool_recycle": config_env.db_pool_recycle,
+    "pool_pre_ping": config_env.db_pool_pre_ping,
+    "pool_timeout": config_env.db_pool_timeout,
+}
+
+# Sync engine: used for schema creation and any blocking scripts/jobs
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=timed_pool_class(QueuePool, "sync"), **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: used by the REST routes and the agent tools so queries never block the event loop
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=timed_pool_class(AsyncAdaptedQueuePool, "async"), **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+track_pool(engine, "sync")
+track_pool(async_engine.sync_engine, "async")
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 Base = declarative_base()
 
 # Reusable DB session dependency
@@ -21,4 +47,32 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Reusable async DB session dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Session scope for code that is not behind a FastAPI dependency (agent tools, jobs):
+# rolls back on error and always returns the connection to the pool.
+@contextmanager
+def session_scope():
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_session_scope():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
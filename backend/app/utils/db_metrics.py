@@ -0,0 +1,103 @@
+import contextvars
+import functools
+import inspect
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .metrics import metrics
+
+# Query count/duration per engine, tagged with the CRUDBase method that issued the query
+# (e.g. "Task.get_page"; anything else is "other"), and time spent waiting for a pooled connection.
+
+db_query_duration = metrics.histogram(
+    "db_query_duration_seconds", "Duration of SQL statements.", ["engine", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+db_query_errors = metrics.counter("db_query_errors_total", "SQL statements that raised an error.", ["engine", "operation"])
+db_pool_checkout_wait = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent getting a connection from the pool (waiting or connecting).", ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+db_operation: contextvars.ContextVar[str] = contextvars.ContextVar("db_operation", default="other")
+
+
+def instrument_engine(engine: Engine, name: str):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, engine=name, operation=db_operation.get())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+        db_query_errors.inc(engine=name, operation=db_operation.get())
+
+
+def timed_pool_class(pool_class: type, name: str) -> type:
+    """Subclass of a SQLAlchemy pool class that records how long each checkout takes."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return pool_class._do_get(self)
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - started, pool=name)
+
+    # Same name and module as the wrapped class, so SQLAlchemy's pool logger name is unchanged
+    return type(pool_class.__name__, (pool_class,), {"_do_get": _do_get, "__module__": pool_class.__module__})
+
+
+def tag_db_operations(cls):
+    """Class decorator: queries run inside a public method are tagged '<Model>.<method>'."""
+    for attr, method in list(vars(cls).items()):
+        if attr.startswith("_") or not inspect.isfunction(method):
+            continue
+        setattr(cls, attr, _tagged(attr, method))
+    return cls
+
+
+def _tagged(attr: str, method):
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            token = db_operation.set(f"{self.model.__name__}.{attr}")
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                db_operation.reset(token)
+        return async_wrapper
+
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def async_gen_wrapper(self, *args, **kwargs):
+            # Tag only while the generator runs: the caller's own queries between batches stay untagged
+            generator = method(self, *args, **kwargs)
+            try:
+                while True:
+                    token = db_operation.set(f"{self.model.__name__}.{attr}")
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        db_operation.reset(token)
+                    yield item
+            finally:
+                await generator.aclose()
+        return async_gen_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        token = db_operation.set(f"{self.model.__name__}.{attr}")
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            db_operation.reset(token)
+    return wrapper
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sys
+import time
+import traceback
+from typing import Optional
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config_env import config_env
+from .logger import logger
+
+# Open checkouts per pool: connection record id -> (checkout time, raw stack that took it or None).
+# Stacks are only recorded with DB_POOL_TRACK_STACKS, as (code, line) pairs: walking the frames is
+# cheap, and file/line text is only looked up for the checkouts that are reported.
+_checkouts: dict[str, dict[int, tuple[float, Optional[list]]]] = {}
+_engines: dict[str, Engine] = {}
+# Checkouts that were already reported, so each leak is logged once
+_reported: set[int] = set()
+STACK_LIMIT = 60
+# Frames that never hold the connection themselves
+_INTERNAL_PATHS = ("sqlalchemy", "greenlet", os.sep + "asyncio" + os.sep)
+
+
+def _raw_stack() -> list:
+    """
+    (code, line) of the frames that led to this checkout, innermost first. Async engine checkouts
+    run in a greenlet started by SQLAlchemy's greenlet_spawn, whose own stack ends there; the
+    awaiting code is on the parent greenlet's stack, so the walk continues there.
+    """
+    stack = []
+    frame = sys._getframe(2)
+    current = greenlet.getcurrent()
+    while len(stack) < STACK_LIMIT:
+        if frame is None:
+            current = current.parent
+            if current is None:
+                break
+            frame = current.gr_frame
+            continue
+        stack.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return stack
+
+
+def track_pool(engine: Engine, name: str):
+    """Register checkout/checkin listeners so pool usage and leaks can be reported."""
+    checkouts = _checkouts.setdefault(name, {})
+    _engines[name] = engine
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts[id(connection_record)] = (time.monotonic(), _raw_stack() if config_env.db_pool_track_stacks else None)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checkouts.pop(id(connection_record), None)
+        _reported.discard(id(connection_record))
+
+
+def _caller_frames(stack: list) -> traceback.StackSummary:
+    # Drop SQLAlchemy/greenlet/asyncio internals and this module so the log points at the code
+    # holding the connection; outermost first, like a traceback
+    return traceback.StackSummary.from_list([
+        (code.co_filename, line, code.co_name, None) for code, line in reversed(stack)
+        if code.co_filename != __file__ and not any(path in code.co_filename for path in _INTERNAL_PATHS)
+    ])
+
+
+def pool_stats() -> dict:
+    """Current size/usage of every tracked pool."""
+    stats = {}
+    now = time.monotonic()
+    for name, engine in _engines.items():
+        pool = engine.pool
+        held = [now - started for started, _ in _checkouts.get(name, {}).values()]
+        stats[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "timeout": pool.timeout(),
+            "longest_checkout_seconds": round(max(held), 3) if held else 0.0,
+        }
+    return stats
+
+
+def log_leaked_checkouts(threshold: float | None = None) -> int:
+    """Log the checkout stack of every connection held longer than `threshold` seconds."""
+    threshold = config_env.db_pool_leak_threshold if threshold is None else threshold
+    now = time.monotonic()
+    leaked = 0
+    for name, checkouts in _checkouts.items():
+        for key, (started, stack) in list(checkouts.items()):
+            held = now - started
+            if held < threshold:
+                continue
+            leaked += 1
+            if key in _reported:
+                continue
+            _reported.add(key)
+            where = ("at\n" + "".join(_caller_frames(stack).format())) if stack else "(set DB_POOL_TRACK_STACKS=true to see where)"
+            logger.warning(f"Possible connection leak on '{name}' pool: checked out {held:.1f}s ago {where}")
+    return leaked
+
+
+async def pool_leak_monitor(interval: float | None = None):
+    """Background task that periodically reports connections that were never returned."""
+    interval = interval or max(config_env.db_pool_leak_threshold / 2, 1)
+    while True:
+        await asyncio.sleep(interval)
+        log_leaked_checkouts()
@@ -1,6 +1,100 @@
+import atexit
+import contextvars
+import json
 import logging
+import queue
+import random
+import uuid
+from contextlib import contextmanager
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from utils.config_env import config_env
 
+# --- Correlation fields ---
+# Set per HTTP request (RequestContextMiddleware) and per chat connection (thread_id);
+# every record logged inside that context carries them.
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+thread_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("thread_id", default=None)
+
+
+@contextmanager
+def log_context(request_id: str | None = None, thread_id: str | None = None):
+    """Attach request/thread IDs to every record logged inside the block."""
+    tokens = []
+    if request_id is not None:
+        tokens.append((request_id_var, request_id_var.set(request_id)))
+    if thread_id is not None:
+        tokens.append((thread_id_var, thread_id_var.set(thread_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class RequestContextMiddleware:
+    """Gives each HTTP request/WebSocket a request ID (client's X-Request-ID or a new one) and echoes it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        with log_context(request_id=request_id):
+            await self.app(scope, receive, send_wrapper)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the correlation fields onto the record (runs in the logging caller's context)."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.thread_id = thread_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records below WARNING for the configured loggers (and their children)."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """Parse LOG_SAMPLE_RATES, e.g. 'uvicorn.access=0.1,httpx=0' (logger name=fraction kept)."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+# --- Formatters ---
 # ANSI color codes for log levels
 class CustomFormatter(logging.Formatter):
     """Custom formatter to color only the log level text."""
@@ -13,10 +107,31 @@ class CustomFormatter(logging.Formatter):
     }
     RESET = "\033[0m"
 
-    def format(self, record):
+    def formatMessage(self, record):
+        # Color a copy of the level name; the record is shared with every other handler
         log_color = self.COLORS.get(record.levelname, self.RESET)
-        record.levelname = f"{log_color}{record.levelname}{self.RESET}"  # Color only log level
-        return super().format(record)
+        fields = {**record.__dict__, "levelname": f"{log_color}{record.levelname}{self.RESET}"}
+        return self._style._fmt % fields
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("request_id", "thread_id"):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
 
 # Define the logging configuration
 LOGGING_CONFIG = {
@@ -30,25 +145,32 @@ LOGGING_CONFIG = {
         "default": {
             "format": "%(levelname)s:     %(asctime)s - %(message)s",
         },
+        "json": {
+            "()": JSONFormatter,
+        },
     },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
-            "formatter": "colored",  
+            "formatter": "json" if config_env.log_format == "json" else "colored",
         },
         # "file": {
         #     "class": "logging.FileHandler",
         #     "filename": "../app.log",
-        #     "formatter": "default",  
+        #     "formatter": "default",
         # },
     },
     "root": {
-        "level": "INFO",
+        "level": config_env.log_level,
         "handlers": ["console"],
     },
     "loggers": {
         "uvicorn": {
-            "level": "INFO",
+            "level": config_env.log_level,
+            "handlers": ["console"],
+            "propagate": False,
+        },
+        "uvicorn.access": {
             "handlers": ["console"],
             "propagate": False,
         },
@@ -58,6 +180,44 @@ LOGGING_CONFIG = {
 # Apply logging configuration
 dictConfig(LOGGING_CONFIG)
 
+_listener: QueueListener | None = None
+
+
+def _install_filters_and_queue():
+    """Add the correlation/sampling filters and, with LOG_QUEUE, move output to a background thread.
+
+    Filters sit on the handler the caller's thread writes to, so context variables are read
+    before the record crosses the queue.
+    """
+    global _listener
+    context_filter = ContextFilter()
+    sampling = SamplingFilter(parse_sample_rates(config_env.log_sample_rates))
+    configured = [logging.getLogger(), logging.getLogger("uvicorn"), logging.getLogger("uvicorn.access")]
+    console = next(h for h in logging.getLogger().handlers if isinstance(h, logging.StreamHandler))
+
+    front = console
+    if config_env.log_queue:
+        # Unbounded: a full queue would block (or drop) in the caller, which is what the queue avoids
+        front = QueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(front.queue, console, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        for target in configured:
+            target.handlers = [front if h is console else h for h in target.handlers]
+    front.addFilter(context_filter)
+    front.addFilter(sampling)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+_install_filters_and_queue()
+
 # Create logger
 logger = logging.getLogger(__name__)
-logger.info("Logger has been configured.")
\ No newline at end of file
+logger.info("Logger has been configured.")
@@ -0,0 +1,19 @@
+import os
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+# Upgrade the database schema to the latest migration
+def run_migrations(revision: str = "head"):
+    # Imported here: the app only needs Alembic when it migrates, not on every import of main
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(ALEMBIC_INI), revision)
+
+
+# Run as a separate deploy step (`python -m utils.migrations`) when DB_MIGRATE_ON_STARTUP=false
+if __name__ == "__main__":
+    import sys
+
+    run_migrations(sys.argv[1] if len(sys.argv) > 1 else "head")
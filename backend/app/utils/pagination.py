@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(sort_by: str, descending: bool, last: tuple) -> str:
+    """Build an opaque cursor from the (sort key, id) of the last row on a page."""
+    sort_value, last_id = last
+    payload = {"s": sort_by, "d": descending, "k": _encode_value(sort_value), "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, bool, tuple]:
+    """Return the (sort_by, descending, (sort key, id)) a cursor was issued for."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(payload["s"]), bool(payload["d"]), (_decode_value(payload["k"]), payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("malformed cursor") from e
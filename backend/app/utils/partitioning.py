@@ -0,0 +1,88 @@
+import argparse
+import re
+from sqlalchemy import text
+from utils.db_connection import engine
+from utils.logger import logger
+
+# Optional: hash-partition `tasks` by owner_id, for deployments with many owners and many tasks.
+# Every task query is scoped to one owner, so each one is pruned to a single partition, and each
+# partition's indexes (and its vacuum and cache footprint) only cover the owners hashed into it.
+# Run once, after the migrations, during a maintenance window (the table is locked while rows copy):
+#
+#   python -m utils.partitioning --partitions 16
+#
+# The primary key becomes (owner_id, id); ids still come from the one sequence and stay unique.
+# Indexes and triggers are carried over from the existing table, so later migrations that add an
+# index to `tasks` keep working (Postgres creates it on every partition).
+
+TABLE = "tasks"
+OLD_TABLE = "tasks_unpartitioned"
+# Covered by the new primary key
+SKIP_INDEXES = {"ix_tasks_owner_id"}
+
+IS_PARTITIONED_SQL = "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+INDEX_DEFINITIONS_SQL = """
+SELECT i.indexdef
+FROM pg_indexes i
+WHERE i.tablename = :table AND i.schemaname = current_schema()
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = to_regclass(quote_ident(i.indexname)))
+  AND i.indexname <> ALL(:skip)
+"""
+TRIGGER_DEFINITIONS_SQL = """
+SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = to_regclass(:table) AND NOT tgisinternal
+"""
+# Everything but generated columns, which the new table computes itself
+COPY_COLUMNS_SQL = """
+SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+FROM pg_attribute
+WHERE attrelid = to_regclass(:table) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+"""
+
+
+def _retarget(definition: str) -> str:
+    # "... ON public.tasks_unpartitioned ..." -> "... ON public.tasks ..."
+    return re.sub(rf"\bON (ONLY )?((\w+)\.)?{OLD_TABLE}\b", lambda m: f"ON {m.group(2) or ''}{TABLE}", definition)
+
+
+def partition_tasks(partitions: int):
+    with engine.begin() as conn:
+        if conn.execute(text(IS_PARTITIONED_SQL), {"table": TABLE}).first():
+            logger.info(f"'{TABLE}' is already partitioned; nothing to do.")
+            return
+
+        conn.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}"))
+        indexes = conn.execute(text(INDEX_DEFINITIONS_SQL), {"table": OLD_TABLE, "skip": list(SKIP_INDEXES)}).scalars().all()
+        triggers = conn.execute(text(TRIGGER_DEFINITIONS_SQL), {"table": OLD_TABLE}).scalars().all()
+        columns = conn.execute(text(COPY_COLUMNS_SQL), {"table": OLD_TABLE}).scalar_one()
+
+        conn.execute(text(
+            f"CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING GENERATED) "
+            f"PARTITION BY HASH (owner_id)"
+        ))
+        for remainder in range(partitions):
+            conn.execute(text(
+                f"CREATE TABLE {TABLE}_p{remainder} PARTITION OF {TABLE} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            ))
+        # Copied before the triggers exist: moving rows is not a change to log or count
+        copied = conn.execute(text(f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {OLD_TABLE}")).rowcount
+        # The id sequence would otherwise be dropped with the old table
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": OLD_TABLE}).scalar_one()
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+        conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+
+        conn.execute(text(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (owner_id, id)"))
+        for definition in indexes + triggers:
+            conn.execute(text(_retarget(definition)))
+    logger.info(f"✅ Partitioned '{TABLE}' into {partitions} partitions by owner_id ({copied} tasks, "
+                f"{len(indexes)} indexes and {len(triggers)} triggers recreated).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash-partition the tasks table by owner_id.")
+    parser.add_argument("--partitions", type=int, default=8, help="number of hash partitions (default: 8)")
+    args = parser.parse_args()
+    if args.partitions < 2:
+        parser.error("--partitions must be at least 2")
+    partition_tasks(args.partitions)
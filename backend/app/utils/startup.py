@@ -0,0 +1,44 @@
+import time
+from contextlib import contextmanager
+from utils.logger import logger
+
+# Startup phases (import, migrations, checkpointer, agent build, ...) with their duration and
+# outcome. /ready reports them, and the service is ready once every required phase is done.
+
+
+class StartupState:
+    def __init__(self):
+        self.phases: dict[str, dict] = {}
+
+    def pending(self, name: str, required: bool = True):
+        self.phases[name] = {"status": "pending", "required": required, "seconds": None}
+
+    def done(self, name: str, seconds: float | None = None, required: bool = True):
+        self.phases[name] = {
+            "status": "done", "required": required,
+            "seconds": round(seconds, 3) if seconds is not None else None,
+        }
+
+    def failed(self, name: str, error: Exception, required: bool = True):
+        self.phases[name] = {"status": "failed", "required": required, "seconds": None, "error": str(error)}
+
+    @contextmanager
+    def phase(self, name: str, required: bool = True):
+        self.pending(name, required)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.failed(name, e, required)
+            raise
+        self.done(name, time.perf_counter() - started, required)
+        logger.info(f"🚀 Startup: {name} took {self.phases[name]['seconds']:.3f}s")
+
+    def ready(self) -> bool:
+        return all(p["status"] == "done" for p in self.phases.values() if p["required"])
+
+    def report(self) -> dict:
+        return {"ready": self.ready(), "phases": self.phases}
+
+
+startup = StartupState()
@@ -0,0 +1,51 @@
+from contextlib import contextmanager, nullcontext
+from utils.config_env import config_env
+from utils.logger import logger
+
+# Optional tracing spans (TRACING_ENABLED=true). Spans go to the globally configured OpenTelemetry
+# tracer provider, e.g. when the app runs under `opentelemetry-instrument` with an exporter set up
+# through OTEL_* variables. Without opentelemetry installed, or when disabled, spans are no-ops.
+
+_tracer = None
+
+
+def get_tracer():
+    global _tracer
+    if _tracer is None and config_env.tracing_enabled:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("TRACING_ENABLED is set but opentelemetry-api is not installed; spans are disabled.")
+            config_env.tracing_enabled = False
+            return None
+        _tracer = trace.get_tracer("taskapp")
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Context manager for a span around a block (a no-op when tracing is off)."""
+    tracer = get_tracer()
+    if tracer is None:
+        return nullcontext()
+    return _span(tracer, name, attributes)
+
+
+@contextmanager
+def _span(tracer, name: str, attributes: dict):
+    with tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, value)
+        yield current
+
+
+def start_span(name: str, **attributes):
+    """Span started and ended in different callbacks (e.g. LLM start/end); returns None when off."""
+    tracer = get_tracer()
+    if tracer is None:
+        return None
+    current = tracer.start_span(name)
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+    return current
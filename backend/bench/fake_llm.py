@@ -0,0 +1,88 @@
+import asyncio
+import json
+import re
+import uuid
+from typing import Any, AsyncIterator, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# Deterministic stand-in for ChatGoogleGenerativeAI: no network, fixed latency per call, and the
+# same plan/tool-call/answer shape a real ReAct turn has, so the agent path costs what it would
+# minus the model itself.
+
+
+class BenchChatModel(BaseChatModel):
+    latency: float = 0.02  # seconds per model call
+    tokens_per_chunk: int = 4  # words per streamed chunk
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-fake"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        usage = {
+            "input_tokens": count_tokens_approximately(messages),
+            "output_tokens": 0,
+            "total_tokens": 0,
+        }
+        if isinstance(last, ToolMessage):
+            text = f"Done. The {last.name} tool returned {len(str(last.content))} characters of results for you."
+            return self._with_usage(AIMessage(content=text), usage)
+
+        prompt = last.content.lower() if isinstance(last, HumanMessage) and isinstance(last.content, str) else ""
+        if "tick off" in prompt:
+            # Several tool calls in one step, as Gemini emits for "mark 3, 5 and 9 done"
+            calls = [
+                {"name": "update_task", "args": {"task_id": int(task_id), "status": "done"}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                for task_id in re.findall(r"\d+", prompt)
+            ]
+            return self._with_usage(AIMessage(content="", tool_calls=calls), usage)
+        call = None
+        if "pending" in prompt or "overdue" in prompt:
+            call = {"name": "filter_tasks", "args": {"status": "pending", "page_size": 10}}
+        elif "list" in prompt or "show" in prompt or "tasks" in prompt:
+            call = {"name": "list_tasks", "args": {"page_size": 10}}
+        else:
+            match = re.search(r"task (\d+)", prompt)
+            if match and "done" in prompt:
+                call = {"name": "update_task", "args": {"task_id": int(match.group(1)), "status": "done"}}
+        if call:
+            call["id"] = f"call_{uuid.uuid4().hex[:12]}"
+            return self._with_usage(AIMessage(content="", tool_calls=[call]), usage)
+        return self._with_usage(AIMessage(content="I can help you create, list, update or delete your tasks."), usage)
+
+    @staticmethod
+    def _with_usage(message: AIMessage, usage: dict) -> AIMessage:
+        output = count_tokens_approximately([message]) if message.content else 8
+        message.usage_metadata = {**usage, "output_tokens": output, "total_tokens": usage["input_tokens"] + output}
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("BenchChatModel is async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            chunks = [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(reply.tool_calls)
+            ], usage_metadata=reply.usage_metadata)]
+        else:
+            words = reply.content.split(" ")
+            parts = [" ".join(words[i:i + self.tokens_per_chunk]) + " " for i in range(0, len(words), self.tokens_per_chunk)]
+            chunks = [AIMessageChunk(content=part) for part in parts]
+            chunks[-1].usage_metadata = reply.usage_metadata
+        for chunk in chunks:
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,125 @@
+"""
+Import-time profile of the app: how long `import main` takes and which modules cost the most.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter (the cost a worker pays on
+every cold start or rolling restart), then aggregates the per-module timings by top-level package:
+
+    cd backend
+    python bench/import_profile.py --top 15 --output imports-new.json --compare imports-old.json
+
+Importing main does not touch the database (migrations and the agent build run in the lifespan),
+but the POSTGRES_* settings must still be present; placeholders are used when they are unset.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Profile the import time of the task service.")
+    parser.add_argument("--module", default="main", help="module to import")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to time (the fastest run is reported)")
+    parser.add_argument("--top", type=int, default=20, help="modules/packages to list")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PCT",
+                        help="exit 1 if the total import time grew by more than PCT percent")
+    return parser.parse_args()
+
+
+def import_times(module: str) -> list[tuple[int, int, int, str]]:
+    """(self µs, cumulative µs, nesting depth, module) for every module the import loaded."""
+    env = {
+        "POSTGRES_HOST": "localhost", "POSTGRES_PORT": "5432", "POSTGRES_USER": "postgres",
+        "POSTGRES_PASSWORD": "postgres", "POSTGRES_DB": "postgres",
+        **os.environ,
+        "PYTHONPATH": str(APP_DIR),
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2, name.strip()))
+    return rows
+
+
+def profile(module: str, runs: int, top: int) -> dict:
+    # The fastest run is the least disturbed by the rest of the machine
+    rows = min((import_times(module) for _ in range(max(runs, 1))),
+               key=lambda r: next(c for _, c, _, name in r if name == module))
+    total = next(c for _, c, _, name in rows if name == module)
+
+    packages = defaultdict(int)
+    for self_us, _, _, name in rows:
+        packages[name.split(".")[0]] += self_us
+    app_modules = [(name, c) for _, c, _, name in rows
+                   if (APP_DIR / (name.replace(".", "/") + ".py")).exists()]
+    return {
+        "meta": {
+            "module": module,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "runs": runs,
+        },
+        "total_ms": round(total / 1000, 1),
+        "modules_loaded": len(rows),
+        # Self time summed per top-level package: what each dependency costs overall
+        "packages": [{"package": name, "self_ms": round(us / 1000, 1)}
+                     for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]],
+        # Cumulative time of this repo's modules: which of our imports pull the cost in
+        "app_modules": [{"module": name, "cumulative_ms": round(us / 1000, 1)}
+                        for name, us in sorted(app_modules, key=lambda kv: -kv[1])[:top]],
+    }
+
+
+def compare(current: dict, previous: dict) -> dict:
+    before = {p["package"]: p["self_ms"] for p in previous["packages"]}
+    after = {p["package"]: p["self_ms"] for p in current["packages"]}
+    total_pct = (current["total_ms"] - previous["total_ms"]) / previous["total_ms"] * 100 if previous["total_ms"] else None
+    return {
+        "total_ms": {"before": previous["total_ms"], "after": current["total_ms"],
+                     "pct": round(total_pct, 1) if total_pct is not None else None},
+        "packages": {name: {"before": before.get(name, 0.0), "after": after.get(name, 0.0)}
+                     for name in sorted(set(before) | set(after), key=lambda n: -abs(after.get(n, 0) - before.get(n, 0)))},
+    }
+
+
+def main():
+    args = parse_args()
+    report = profile(args.module, args.runs, args.top)
+    exit_code = 0
+    if args.compare:
+        report["comparison"] = compare(report, json.loads(Path(args.compare).read_text()))
+        pct = report["comparison"]["total_ms"]["pct"]
+        if args.fail_on_regression is not None and pct is not None and pct > args.fail_on_regression:
+            print(f"❌ import time grew {pct}% (over {args.fail_on_regression}%)", file=sys.stderr)
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    print(f"import {args.module}: {report['total_ms']} ms, {report['modules_loaded']} modules", file=sys.stderr)
+    for p in report["packages"][:10]:
+        print(f"  {p['package']:>28}: {p['self_ms']:>8} ms", file=sys.stderr)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Offline load/latency benchmark for the REST and WebSocket paths.
+
+Boots main.app under uvicorn on a local port, against the Postgres configured by the usual
+POSTGRES_* variables, with BenchChatModel in place of Gemini (no network). Seeds tasks, drives
+each scenario at the given concurrency and prints (or writes) a JSON report:
+
+    cd backend
+    POSTGRES_HOST=localhost POSTGRES_PORT=5432 POSTGRES_USER=postgres POSTGRES_PASSWORD=postgres \\
+    POSTGRES_DB=tasks_bench python bench/run.py --tasks 5000 --requests 2000 --concurrency 16 \\
+        --output bench-$(git rev-parse --short HEAD).json --compare bench-main.json
+
+Use a dedicated database: --reset truncates the tasks tables. Without it, the seeded tasks are
+deleted again when the run ends (--keep leaves them).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+sys.path[:0] = [str(APP_DIR), str(BENCH_DIR)]
+
+API = "/api/v1"
+SCENARIOS = ("list", "filter", "update", "chat_fast", "chat_agent", "chat_agent_multi")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the task service REST and chat endpoints.")
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks to seed")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {SCENARIOS}")
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0, help="simulated latency of each model call")
+    parser.add_argument("--no-cache", action="store_true", help="disable the task query cache")
+    parser.add_argument("--tool-concurrency", type=int,
+                        help="AGENT_TOOL_CONCURRENCY for the run (1 runs a step's tool calls one after another)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE the tasks tables before seeding")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded tasks after the run")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PCT",
+                        help="exit 1 if any scenario's p95 latency grew by more than PCT percent")
+    return parser.parse_args()
+
+
+# --- Measurements ---
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # Peak rather than current RSS where /proc is unavailable (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class QueryCounter:
+    """Counts statements sent by the app's SQLAlchemy engines."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def attach(self, *engines):
+        from sqlalchemy import event
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies: list, errors: int, busy: int, elapsed: float, queries: int, rss_before: float) -> dict:
+    ordered = sorted(latencies)
+    done = len(latencies) + errors + busy
+    return {
+        "scenario": name,
+        "requests": done,
+        "ok": len(latencies),
+        "errors": errors,
+        "busy": busy,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 2),
+            "p95": round(percentile(ordered, 95) * 1000, 2),
+            "p99": round(percentile(ordered, 99) * 1000, 2),
+            "mean": round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+        "db_queries_per_request": round(queries / done, 2) if done else 0.0,
+        "rss_growth_mb": round(rss_mb() - rss_before, 2),
+    }
+
+
+# --- Server ---
+def start_server(app):
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("❌ Benchmark server failed to start")
+        time.sleep(0.05)
+    return server, thread, port
+
+
+# --- Seeding ---
+async def seed_tasks(client, count: int, rng: random.Random) -> list[int]:
+    ids = []
+    today = datetime.now(timezone.utc).date()
+    for start in range(0, count, 1000):
+        batch = [
+            {
+                "title": f"bench-{i}",
+                "description": "Benchmark task " + "lorem ipsum " * rng.randint(1, 20),
+                "priority": rng.choice(["high", "medium", "low"]),
+                "due_date": (today + timedelta(days=rng.randint(-30, 60))).isoformat() if rng.random() < 0.8 else None,
+            }
+            for i in range(start, min(start + 1000, count))
+        ]
+        response = await client.post(f"{API}/tasks/bulk_create", json={"tasks": batch})
+        response.raise_for_status()
+        ids.extend(r["task_id"] for r in response.json()["results"] if "task_id" in r)
+
+    done = [task_id for task_id in ids if rng.random() < 0.3]
+    for start in range(0, len(done), 1000):
+        response = await client.put(f"{API}/tasks/bulk_update", json={"task_ids": done[start:start + 1000], "status": "done"})
+        response.raise_for_status()
+    return ids
+
+
+async def delete_tasks(client, ids: list[int]):
+    for start in range(0, len(ids), 1000):
+        await client.request("DELETE", f"{API}/tasks/bulk_delete", json={"task_ids": ids[start:start + 1000]})
+
+
+def reset_tables():
+    from sqlalchemy import text
+    from utils.db_connection import engine
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE tasks, task_changes RESTART IDENTITY"))
+
+
+# --- Scenarios ---
+# Each scenario is a factory for per-client callables: call(i) -> "ok" | "busy" | "error"
+
+def http_scenario(client, build):
+    async def open_client(worker: int):
+        async def call(i: int) -> str:
+            method, url, kwargs = build(i)
+            response = await client.request(method, url, **kwargs)
+            return "ok" if response.status_code < 400 else "error"
+        return call, None
+    return open_client
+
+
+def chat_scenario(ws_url: str, build):
+    import websockets
+
+    async def open_client(worker: int):
+        ws = await websockets.connect(f"{ws_url}?stream=tokens", max_size=None)
+        # session + greeting
+        await ws.recv()
+        await ws.recv()
+
+        async def call(i: int) -> str:
+            await ws.send(build(i))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["type"] == "final":
+                    return "ok"
+                if frame["type"] == "busy":
+                    return "busy"
+                if frame["type"] == "error":
+                    return "error"
+        return call, ws.close
+    return open_client
+
+
+async def run_scenario(name: str, open_client, total: int, concurrency: int, queries: QueryCounter) -> dict:
+    from services.task.tool_executor import step_stats
+
+    latencies, outcome = [], {"error": 0, "busy": 0}
+    next_index = iter(range(total))
+    rss_before, queries_before, steps_before = rss_mb(), queries.count, step_stats()
+
+    async def client_loop(worker: int):
+        call, close = await open_client(worker)
+        try:
+            for i in next_index:
+                started = time.perf_counter()
+                try:
+                    result = await call(i)
+                except Exception:
+                    result = "error"
+                if result == "ok":
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    outcome[result] += 1
+        finally:
+            if close:
+                await close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = summarize(name, latencies, outcome["error"], outcome["busy"], elapsed,
+                       queries.count - queries_before, rss_before)
+    tool_steps = tool_step_summary(steps_before, step_stats())
+    if tool_steps:
+        result["tool_steps"] = tool_steps
+    return result
+
+
+def tool_step_summary(before: dict, after: dict) -> dict | None:
+    """
+    Agent tool steps of one scenario: wall time per step, the summed time of its calls, and their
+    overlap (calls in flight on average). Compare wall_ms_per_step between --tool-concurrency 1 and N.
+    """
+    steps = after["steps"] - before["steps"]
+    if not steps:
+        return None
+    wall = after["wall_seconds"] - before["wall_seconds"]
+    work = after["work_seconds"] - before["work_seconds"]
+    return {
+        "steps": steps,
+        "calls_per_step": round((after["calls"] - before["calls"]) / steps, 2),
+        "wall_ms_per_step": round(wall / steps * 1000, 2),
+        "work_ms_per_step": round(work / steps * 1000, 2),
+        "overlap": round(work / wall, 2) if wall else None,
+    }
+
+
+def build_scenarios(client, ws_url: str, ids: list[int], rng: random.Random) -> dict:
+    sorts = ["id", "due_date", "priority", "created_at"]
+
+    def list_request(i):
+        return "GET", f"{API}/tasks/list", {"params": {"page_size": 20, "sort_by": sorts[i % 4], "descending": str(i % 2 == 0).lower()}}
+
+    def filter_request(i):
+        body = {"status": "pending", "priority": ["high", "medium", "low"][i % 3]}
+        if i % 5 == 0:
+            body = {"overdue": True}
+        return "POST", f"{API}/tasks/filter", {"params": {"page_size": 20, "sort_by": "due_date"}, "json": body}
+
+    def update_request(i):
+        return "PUT", f"{API}/tasks/update", {"json": {"task_id": rng.choice(ids), "status": "done" if i % 2 else "pending"}}
+
+    return {
+        "list": http_scenario(client, list_request),
+        "filter": http_scenario(client, filter_request),
+        "update": http_scenario(client, update_request),
+        # Matches a fast-path rule: answered without the model
+        "chat_fast": chat_scenario(ws_url, lambda i: f"mark task {rng.choice(ids)} done"),
+        # Goes through the agent: plan call, list_tasks tool, answer call
+        "chat_agent": chat_scenario(ws_url, lambda i: "Could you show me what is on my list and what to do first?"),
+        # One agent step with five update_task calls
+        "chat_agent_multi": chat_scenario(
+            ws_url, lambda i: f"Please tick off {', '.join(str(task_id) for task_id in rng.sample(ids, 5))}, they are finished."
+        ),
+    }
+
+
+# --- Reporting ---
+def compare(report: dict, baseline: dict) -> dict:
+    previous = {s["scenario"]: s for s in baseline.get("scenarios", [])}
+    deltas = {}
+    for current in report["scenarios"]:
+        before = previous.get(current["scenario"])
+        if not before:
+            continue
+
+        def change(new, old):
+            return round((new - old) / old * 100, 1) if old else None
+
+        deltas[current["scenario"]] = {
+            "throughput_pct": change(current["throughput_rps"], before["throughput_rps"]),
+            "p50_pct": change(current["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            "p95_pct": change(current["latency_ms"]["p95"], before["latency_ms"]["p95"]),
+            "p99_pct": change(current["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+            "db_queries_per_request": round(current["db_queries_per_request"] - before["db_queries_per_request"], 2),
+        }
+    return {"baseline": baseline.get("meta", {}).get("git_commit"), "scenarios": deltas}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main_async(args) -> dict:
+    import logging
+    import httpx
+    import main as app_main
+    from services.task import agent
+    from utils.db_connection import engine, async_engine
+    from fake_llm import BenchChatModel
+
+    # Per-request client logging would be measured along with the server
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # The agent is built from agent.llm on startup (in the background), so swapping it here is enough
+    agent.llm = BenchChatModel(latency=args.llm_latency_ms / 1000)
+    queries = QueryCounter()
+    queries.attach(engine, async_engine.sync_engine)
+    if args.reset:
+        reset_tables()
+
+    rng = random.Random(args.seed)
+    rss_start = rss_mb()
+    server, thread, port = start_server(app_main.app)
+    base_url, ws_url = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}{API}/chat"
+    limits = httpx.Limits(max_connections=args.concurrency + 2, max_keepalive_connections=args.concurrency + 2)
+    results, ids = [], []
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            seed_started = time.perf_counter()
+            ids = await seed_tasks(client, args.tasks, rng)
+            seed_seconds = time.perf_counter() - seed_started
+            scenarios = build_scenarios(client, ws_url, ids, rng)
+            for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+                if name not in scenarios:
+                    raise SystemExit(f"❌ Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+                print(f"… {name}", file=sys.stderr)
+                results.append(await run_scenario(name, scenarios[name], args.requests, args.concurrency, queries))
+            if not args.keep:
+                await delete_tasks(client, ids)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+
+    return {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "fail_on_regression")},
+            "seeded_tasks": len(ids),
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "scenarios": results,
+        "memory": {"rss_start_mb": round(rss_start, 2), "rss_end_mb": round(rss_mb(), 2),
+                   "rss_growth_mb": round(rss_mb() - rss_start, 2)},
+    }
+
+
+def main():
+    args = parse_args()
+    # Defaults that keep the run offline and self-contained; explicit environment settings win
+    os.environ.setdefault("GOOGLE_API_KEY", "bench-offline")
+    if args.no_cache:
+        os.environ["QUERY_CACHE_ENABLED"] = "false"
+    if args.tool_concurrency is not None:
+        os.environ["AGENT_TOOL_CONCURRENCY"] = str(args.tool_concurrency)
+
+    report = asyncio.run(main_async(args))
+    exit_code = 0
+    if args.compare:
+        report["comparison"] = compare(report, json.loads(Path(args.compare).read_text()))
+        if args.fail_on_regression is not None:
+            regressed = [name for name, d in report["comparison"]["scenarios"].items()
+                         if d["p95_pct"] is not None and d["p95_pct"] > args.fail_on_regression]
+            if regressed:
+                print(f"❌ p95 regression over {args.fail_on_regression}% in: {', '.join(regressed)}", file=sys.stderr)
+                exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    for s in report["scenarios"]:
+        print(f"{s['scenario']:>11}: {s['throughput_rps']:>8} req/s  p50 {s['latency_ms']['p50']:>7} ms  "
+              f"p95 {s['latency_ms']['p95']:>7} ms  p99 {s['latency_ms']['p99']:>7} ms  "
+              f"{s['db_queries_per_request']} queries/req  errors {s['errors']}  busy {s['busy']}", file=sys.stderr)
+        if "tool_steps" in s:
+            steps = s["tool_steps"]
+            print(f"{'':>11}  tool steps: {steps['calls_per_step']} calls, {steps['wall_ms_per_step']} ms wall / "
+                  f"{steps['work_ms_per_step']} ms of calls ({steps['overlap']}x overlap)", file=sys.stderr)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
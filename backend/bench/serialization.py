@@ -0,0 +1,173 @@
+"""
+Micro-benchmark of the list-response path: fetching a page of tasks and turning it into JSON bytes.
+
+Compares, per page size, the cost per row of
+  orm         select(Task) -> ORM instances -> dict -> jsonable_encoder -> json.dumps
+              (what /tasks/list did before it had a response model)
+  projection  select(<list columns>) -> rows -> dict -> response model -> pydantic-core JSON
+              (what /tasks/list, /tasks/filter and /tasks/search do now)
+and reports orjson on the same dicts as a reference point:
+
+    cd backend
+    POSTGRES_HOST=localhost POSTGRES_PORT=5432 POSTGRES_USER=postgres POSTGRES_PASSWORD=postgres \\
+    POSTGRES_DB=tasks_bench python bench/serialization.py --page-sizes 100,1000 --output ser-new.json
+
+Seeds tasks (titled "bench-ser ...") when fewer than the largest page exist and deletes them again at the end.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+sys.path[:0] = [str(APP_DIR), str(BENCH_DIR)]
+
+SEED_PREFIX = "bench-ser"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark fetching and serializing task list pages.")
+    parser.add_argument("--page-sizes", default="100,1000", help="comma-separated page sizes")
+    parser.add_argument("--repeat", type=int, default=50, help="timed rounds per page size (the median is reported)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+
+def median(values: list[float]) -> float:
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+async def seed(db, count: int) -> bool:
+    from sqlalchemy import func, insert, select
+    from models.task import Task
+
+    have = (await db.execute(select(func.count()).select_from(Task))).scalar_one()
+    if have >= count:
+        return False
+    due = datetime.now(timezone.utc).date()
+    await db.execute(insert(Task), [
+        {"owner_id": "default", "title": f"{SEED_PREFIX} {i}", "description": f"Benchmark task {i} " + "lorem ipsum " * 8,
+         "priority": ("low", "medium", "high")[i % 3], "status": "pending",
+         "due_date": due + timedelta(days=i % 60)}
+        for i in range(count - have)
+    ])
+    await db.commit()
+    return True
+
+
+async def measure(db, page_size: int, repeat: int) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from models.task import Task
+    from schemas.task import TaskPageOut
+    from services.task.task_crud import TASK_DICT_COLUMNS, _task_to_dict
+
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    page_adapter = TypeAdapter(TaskPageOut)
+
+    def page(rows):
+        return {"items": [_task_to_dict(t) for t in rows], "next_cursor": None, "has_more": True}
+
+    async def orm():
+        rows = (await db.execute(select(Task).order_by(Task.id).limit(page_size))).scalars().all()
+        fetched = time.perf_counter()
+        body = json.dumps(jsonable_encoder(page(rows))).encode()
+        db.expunge_all()
+        return fetched, body, None
+
+    async def projection():
+        rows = (await db.execute(select(*TASK_DICT_COLUMNS).order_by(Task.id).limit(page_size))).all()
+        fetched = time.perf_counter()
+        data = page(rows)
+        body = page_adapter.dump_json(page_adapter.validate_python(data))
+        return fetched, body, data
+
+    report = {}
+    reference = []
+    for name, run in (("orm", orm), ("projection", projection)):
+        await run()  # warm up statement caches and the pool
+        fetch_us, serialize_us = [], []
+        size = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fetched, body, data = await run()
+            done = time.perf_counter()
+            fetch_us.append((fetched - started) * 1e6)
+            serialize_us.append((done - fetched) * 1e6)
+            size = len(body)
+            if data is not None and not reference:
+                reference.append(data)
+        rows = min(page_size, body.count(b'"id":')) or 1
+        report[name] = {
+            "rows": rows,
+            "bytes": size,
+            "fetch_us_per_row": round(median(fetch_us) / rows, 2),
+            "serialize_us_per_row": round(median(serialize_us) / rows, 2),
+            "total_us_per_row": round((median(fetch_us) + median(serialize_us)) / rows, 2),
+        }
+
+    if orjson is not None and reference:
+        data = reference[0]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            orjson.dumps(data)
+            timings.append((time.perf_counter() - started) * 1e6)
+        report["orjson_serialize_us_per_row"] = round(median(timings) / report["projection"]["rows"], 2)
+    before, after = report["orm"]["total_us_per_row"], report["projection"]["total_us_per_row"]
+    report["speedup"] = round(before / after, 2) if after else None
+    return report
+
+
+async def run(args) -> dict:
+    from sqlalchemy import delete
+    from models.task import Task
+    from utils.db_connection import AsyncSessionLocal, async_engine
+
+    page_sizes = [int(size) for size in args.page_sizes.split(",") if size.strip()]
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "repeat": args.repeat,
+        },
+        "page_sizes": {},
+    }
+    async with AsyncSessionLocal() as db:
+        seeded = await seed(db, max(page_sizes))
+        try:
+            for page_size in page_sizes:
+                report["page_sizes"][str(page_size)] = await measure(db, page_size, args.repeat)
+        finally:
+            if seeded:
+                await db.execute(delete(Task).where(Task.title.startswith(SEED_PREFIX)))
+                await db.commit()
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    for page_size, result in report["page_sizes"].items():
+        print(f"page_size={page_size}: orm {result['orm']['total_us_per_row']} µs/row, "
+              f"projection {result['projection']['total_us_per_row']} µs/row ({result['speedup']}x)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
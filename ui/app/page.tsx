@@ -8,6 +8,7 @@ type Task = {
   status: string;
   priority: string;
   due_date: string | null;
+  version: number;
 };
 
 type ChatMessage = {
@@ -17,6 +18,25 @@ type ChatMessage = {
 
 const BACKEND_HTTP = process.env.NEXT_PUBLIC_API_BASE || "http://localhost:8000/api/v1";
 const BACKEND_WS = process.env.NEXT_PUBLIC_WS_BASE || "ws://localhost:8000/api/v1/chat";
+const BACKEND_STREAM = process.env.NEXT_PUBLIC_STREAM_BASE || BACKEND_WS.replace(/\/chat$/, "/tasks/stream");
+
+// Typed frames sent by /chat?stream=tokens
+type ChatFrame =
+  | { type: "session"; thread_id: string }
+  | { type: "token"; text: string }
+  | { type: "tool_start"; id: string; name: string }
+  | { type: "tool_end"; id: string; name: string; status: string }
+  | { type: "final"; text: string }
+  | { type: "error"; message: string }
+  | { type: "busy"; message: string; retry_after: number }
+  | { type: "cancelled"; reason?: string };
+
+type TaskDelta = {
+  type: "task_delta";
+  created: Partial<Task>[];
+  updated: Partial<Task>[];
+  deleted: number[];
+};
 
 export default function Home() {
   const [messages, setMessages] = useState<ChatMessage[]>([]);
@@ -24,11 +44,19 @@ export default function Home() {
   const [tasks, setTasks] = useState<Task[]>([]);
   const [connected, setConnected] = useState(false);
   const [agentTyping, setAgentTyping] = useState(false);
+  const [toolStatus, setToolStatus] = useState<string | null>(null);
   const wsRef = useRef<WebSocket | null>(null);
+  // True while the task change feed is connected; the list is then kept fresh by pushed deltas
+  const streamingRef = useRef(false);
+  // True while tokens of the current agent reply are being appended to the last message
+  const replyOpenRef = useRef(false);
 
   // Open WebSocket for chat
   useEffect(() => {
-    const ws = new WebSocket(BACKEND_WS);
+    // Resume this tab's conversation after a reload or reconnect
+    const threadId = sessionStorage.getItem("chatThreadId");
+    const resume = threadId ? `&thread_id=${encodeURIComponent(threadId)}` : "";
+    const ws = new WebSocket(`${BACKEND_WS}?stream=tokens${resume}`);
     wsRef.current = ws;
     ws.onopen = () => {
       setConnected(true);
@@ -36,11 +64,44 @@ export default function Home() {
       void fetchTasks();
     };
     ws.onmessage = (event) => {
-      const text = String(event.data);
-      setMessages((prev) => [...prev, { role: "agent", content: text }]);
-      setAgentTyping(false);
-      // Trigger a refresh of tasks after agent replies (likely state changed)
-      void fetchTasks();
+      const frame = JSON.parse(String(event.data)) as ChatFrame;
+      if (frame.type === "session") {
+        sessionStorage.setItem("chatThreadId", frame.thread_id);
+      } else if (frame.type === "token") {
+        // Render tokens as they arrive instead of waiting for the whole reply
+        setAgentTyping(false);
+        setMessages((prev) => {
+          if (replyOpenRef.current && prev.length > 0) {
+            const last = prev[prev.length - 1];
+            return [...prev.slice(0, -1), { ...last, content: last.content + frame.text }];
+          }
+          return [...prev, { role: "agent", content: frame.text }];
+        });
+        replyOpenRef.current = true;
+      } else if (frame.type === "tool_start") {
+        setAgentTyping(true);
+        setToolStatus(`Running ${frame.name}…`);
+      } else if (frame.type === "tool_end") {
+        setToolStatus(null);
+        // Without the change feed, refresh after tool calls (likely state changed)
+        if (!streamingRef.current) void fetchTasks();
+      } else if (frame.type === "cancelled") {
+        replyOpenRef.current = false;
+        setAgentTyping(false);
+        setToolStatus(null);
+      } else if (frame.type === "final" || frame.type === "error" || frame.type === "busy") {
+        const text = frame.type === "final" ? frame.text : frame.type === "busy" ? `⏳ ${frame.message}` : `⚠️ ${frame.message}`;
+        setMessages((prev) => {
+          // The final text replaces whatever was streamed for this reply
+          if (replyOpenRef.current && prev.length > 0) {
+            return text ? [...prev.slice(0, -1), { role: "agent", content: text }] : prev;
+          }
+          return text ? [...prev, { role: "agent", content: text }] : prev;
+        });
+        replyOpenRef.current = false;
+        setAgentTyping(false);
+        setToolStatus(null);
+      }
     };
     ws.onerror = () => setConnected(false);
     ws.onclose = () => setConnected(false);
@@ -48,6 +109,40 @@ export default function Home() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Subscribe to task change deltas pushed by the backend
+  useEffect(() => {
+    const ws = new WebSocket(BACKEND_STREAM);
+    ws.onopen = () => {
+      streamingRef.current = true;
+    };
+    ws.onmessage = (event) => {
+      const frame = JSON.parse(String(event.data));
+      if (frame.type === "resync") {
+        void fetchTasks();
+        return;
+      }
+      if (frame.type !== "task_delta") return;
+      const delta = frame as TaskDelta;
+      const changed = [...delta.created, ...delta.updated];
+      // Deltas for large bulk writes carry only IDs; reload the list in that case
+      if (changed.some((t) => t.title === undefined)) {
+        void fetchTasks();
+        return;
+      }
+      setTasks((prev) => {
+        const byId = new Map(prev.map((t) => [t.id, t]));
+        delta.deleted.forEach((id) => byId.delete(id));
+        changed.forEach((t) => byId.set(t.id as number, t as Task));
+        return Array.from(byId.values()).sort((a, b) => a.id - b.id);
+      });
+    };
+    ws.onclose = () => {
+      streamingRef.current = false;
+    };
+    return () => ws.close();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
   const fetchTasks = useMemo(() => {
     return async () => {
       try {
@@ -65,19 +160,26 @@ export default function Home() {
   const sendMessage = () => {
     if (!input.trim()) return;
     setMessages((prev) => [...prev, { role: "user", content: input }]);
+    replyOpenRef.current = false;
     setAgentTyping(true);
     wsRef.current?.send(input);
     setInput("");
   };
 
+  // Cancels the reply being generated; the backend answers with a "cancelled" frame
+  const stopReply = () => {
+    wsRef.current?.send(JSON.stringify({ type: "stop" }));
+  };
+
   const toggleStatus = async (task: Task) => {
     const nextStatus = task.status === "done" ? "pending" : "done";
-    await fetch(`${BACKEND_HTTP}/tasks/update`, {
+    // Sending the version we rendered makes a toggle on a stale row fail (409) instead of overwriting
+    const res = await fetch(`${BACKEND_HTTP}/tasks/update`, {
       method: "PUT",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ task_id: task.id, status: nextStatus }),
+      body: JSON.stringify({ task_id: task.id, status: nextStatus, version: task.version }),
     });
-    await fetchTasks();
+    if (res.status === 409 || !streamingRef.current) await fetchTasks();
   };
 
   return (
@@ -106,6 +208,7 @@ export default function Home() {
                     <span className="h-2 w-2 animate-bounce rounded-full bg-zinc-400 [animation-delay:-0.2s]"></span>
                     <span className="h-2 w-2 animate-bounce rounded-full bg-zinc-400 [animation-delay:-0.1s]"></span>
                     <span className="h-2 w-2 animate-bounce rounded-full bg-zinc-400"></span>
+                    {toolStatus && <span className="text-xs text-zinc-500">{toolStatus}</span>}
                   </span>
                 </div>
               </div>
@@ -121,6 +224,14 @@ export default function Home() {
               placeholder="e.g., Create a high priority task to buy milk tomorrow"
               className="w-full rounded-md border border-zinc-300 bg-white px-3 py-2 text-sm outline-none focus:border-blue-500 dark:border-zinc-700 dark:bg-zinc-950"
             />
+            {agentTyping && (
+              <button
+                onClick={stopReply}
+                className="rounded-md border border-zinc-300 px-3 py-2 text-sm hover:bg-zinc-100 dark:border-zinc-700 dark:hover:bg-zinc-800"
+              >
+                Stop
+              </button>
+            )}
             <button
               onClick={sendMessage}
               className="rounded-md bg-blue-600 px-3 py-2 text-sm text-white hover:bg-blue-700 disabled:opacity-50"